@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+Async git service — the public GitService operations on top of
+``asyncio.create_subprocess_exec``, with cancellation.
+
+* :class:`CancelToken` — handed to an operation; ``cancel()`` (from any
+  thread, e.g. the Cancel button) stops the running git process group,
+  including ssh and remote helpers: SIGTERM first, so git removes its
+  lock files, and SIGKILL after a grace time only for network-only
+  commands (see :func:`git_service.hard_kill_allowed`).
+* :class:`AsyncGitService` — mirrors ``status``, ``fetch``, ``pull``
+  (with the deferred LFS download), ``commit``, ``push`` and
+  ``get_sync_status``. Command preparation and
+  result messages are shared with :class:`git_service.GitService`.
+* :class:`AsyncBridge` — an event loop in a daemon thread; the wx side
+  submits coroutines and gets ``concurrent.futures.Future`` objects it
+  can hand to ``wx.CallAfter`` callbacks.
+"""
+
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from .git_service import (
+    CONFLICTS_ARGS,
+    DIVERGENCE_ARGS,
+    FETCH_ARGS,
+    KILL_GRACE_SEC,
+    LFS_PROGRESS_ENV,
+    MERGED_MESSAGE,
+    PROBE_ARGS,
+    PULL_ARGS,
+    PULL_MERGE_ARGS,
+    PUSH_ARGS,
+    diverged,
+    hard_kill_allowed,
+    kill_process_group,
+    process_group_kwargs,
+    timeout_message,
+)
+from .git_status import STATUS_ARGS, parse_porcelain_v2
+from .progress import LineSplitter, is_progress_line, parse_progress_line
+
+logger = logging.getLogger("kicad_git_plugin.async")
+
+CANCELLED_MESSAGE = "Операция отменена."
+
+
+class GitCancelled(Exception):
+    """Raised inside an operation whose token was cancelled."""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag that kills registered processes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._pids = set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        """Request cancellation and SIGTERM every registered process group."""
+        with self._lock:
+            self._cancelled = True
+            pids = list(self._pids)
+        for pid in pids:
+            _kill_quietly(pid)
+
+    def raise_if_cancelled(self):
+        if self._cancelled:
+            raise GitCancelled()
+
+    def _register(self, pid):
+        with self._lock:
+            self._pids.add(pid)
+            cancelled = self._cancelled
+        if cancelled:
+            _kill_quietly(pid)
+
+    def _unregister(self, pid):
+        with self._lock:
+            self._pids.discard(pid)
+
+
+def _kill_quietly(pid, force=False):
+    try:
+        kill_process_group(pid, force)
+    except (OSError, subprocess.SubprocessError) as exc:
+        logger.debug("Cannot signal process group %d: %s", pid, exc)
+
+
+class AsyncGitService:
+    """Coroutine counterpart of :class:`git_service.GitService`.
+
+    Parameters
+    ----------
+    git : git_service.GitService
+        Supplies configuration, environment and result formatting.
+    """
+
+    def __init__(self, git):
+        self.git = git
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    async def _run_git(self, *args, **options):
+        """Run git; same contract as ``GitService._run_git``.
+
+        Keyword options: ``token`` (CancelToken), ``on_progress`` and
+        ``env`` (extra variables). The timeout counts from the last
+        output of the process.
+        """
+        token = options.pop("token", None) or CancelToken()
+        on_progress = options.pop("on_progress", None)
+        extra_env = options.pop("env", None)
+        if options:
+            raise TypeError("Unknown options: " + ", ".join(sorted(options)))
+
+        token.raise_if_cancelled()
+        error, cmd, repo, env, timeout = self.git._prepare_command(args)
+        if error is not None:
+            return error
+        if extra_env:
+            env.update(extra_env)
+        mux = self.git._mux_begin(args, env)
+
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                cwd=repo,
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                **process_group_kwargs()
+            )
+        except FileNotFoundError:
+            return (-1, "", "Git не найден. Установите git и попробуйте снова.")
+        except Exception as exc:
+            logger.error("git error: %s", exc)
+            return (-1, "", str(exc))
+
+        token._register(proc.pid)
+        last_activity = [time.monotonic()]
+        out_chunks = []
+        err_lines = []
+
+        async def _read_stdout():
+            while True:
+                chunk = await proc.stdout.read(65536)
+                if not chunk:
+                    return
+                last_activity[0] = time.monotonic()
+                out_chunks.append(chunk)
+
+        async def _read_stderr():
+            splitter = LineSplitter()
+            while True:
+                chunk = await proc.stderr.read(4096)
+                if not chunk:
+                    break
+                last_activity[0] = time.monotonic()
+                for text, final in splitter.feed(chunk):
+                    _stderr_line(text, final)
+            for text, final in splitter.flush():
+                _stderr_line(text, final)
+
+        def _stderr_line(text, final):
+            if on_progress is not None:
+                event = parse_progress_line(text)
+                if event is not None:
+                    try:
+                        on_progress(event)
+                    except Exception:
+                        logger.exception("Progress callback failed")
+            if final and not is_progress_line(text):
+                err_lines.append(text)
+
+        pumps = asyncio.gather(_read_stdout(), _read_stderr())
+        waiter = asyncio.ensure_future(proc.wait())
+        hard_kill = hard_kill_allowed(args)
+        timed_out = False
+        stop_deadline = None  # SIGTERM sent; SIGKILL after this time
+        try:
+            while not waiter.done():
+                await asyncio.wait({waiter}, timeout=0.25)
+                if waiter.done():
+                    break
+                now = time.monotonic()
+                if stop_deadline is None:
+                    if token.cancelled:
+                        stop_deadline = now + KILL_GRACE_SEC  # cancel() sent SIGTERM
+                    elif now - last_activity[0] > timeout:
+                        timed_out = True
+                        _kill_quietly(proc.pid)
+                        stop_deadline = now + KILL_GRACE_SEC
+                elif hard_kill and now > stop_deadline:
+                    _kill_quietly(proc.pid, force=True)
+                    stop_deadline = float("inf")
+            await waiter
+            await pumps
+        except asyncio.CancelledError:
+            # The coroutine itself was cancelled (e.g. loop shutdown)
+            _kill_quietly(proc.pid, force=hard_kill)
+            raise
+        finally:
+            token._unregister(proc.pid)
+
+        if token.cancelled:
+            raise GitCancelled()
+        if timed_out:
+            msg = timeout_message(timeout, streaming=True)
+            logger.warning(msg)
+            return (-2, "", msg)
+
+        rc = proc.returncode
+        out = b"".join(out_chunks).decode("utf-8", "replace")
+        err = "\n".join(err_lines) + ("\n" if err_lines else "")
+        if out:
+            logger.debug("stdout: %s", out.strip())
+        if err:
+            logger.debug("stderr: %s", err.strip())
+        self.git._mux_end(mux, repo, rc)
+        return (rc, out, err)
+
+    # ------------------------------------------------------------------
+    # Public API (mirrors GitService)
+    # ------------------------------------------------------------------
+    async def get_status(self, token=None):
+        """Return a :class:`git_status.GitStatus`."""
+        rc, out, err = await self._run_git(*STATUS_ARGS, token=token)
+        if rc != 0:
+            logger.debug("git status failed: %s", err.strip())
+        return parse_porcelain_v2(out if rc == 0 else "")
+
+    async def status(self, token=None):
+        """Return the legacy status dict (see ``GitService.status``)."""
+        st = await self.get_status(token=token)
+        return st.as_dict()
+
+    async def fetch(self, token=None, on_progress=None):
+        """Run ``git fetch``. Returns (success, message)."""
+        if not self.git.has_repo():
+            return self.git._no_repo()
+        try:
+            rc, out, err = await self._run_git(*FETCH_ARGS, token=token, on_progress=on_progress)
+        except GitCancelled:
+            return (False, CANCELLED_MESSAGE)
+        return self.git._fetch_result(rc, out, err)
+
+    async def pull(self, token=None, on_progress=None):
+        """Run ``git pull --ff-only``. Returns (success, message)."""
+        try:
+            st = await self.get_status(token=token) if self.git.has_repo() else None
+            refused = self.git._pull_precheck(st)
+            if refused is not None:
+                return refused
+            loop = asyncio.get_event_loop()
+            lfs_env = await loop.run_in_executor(None, self.git._lfs_pull_env)
+            head = await loop.run_in_executor(None, self.git.rev_parse, "HEAD") if lfs_env else ""
+            rc, out, err = await self._run_git(*PULL_ARGS, token=token, env=lfs_env,
+                                               on_progress=on_progress)
+            if rc != 0 and await self.branches_diverged(token) and await loop.run_in_executor(
+                    None, self.git.merge_driver_installed):
+                rc, out, err = await self._run_git(*PULL_MERGE_ARGS, token=token, env=lfs_env,
+                                                   on_progress=on_progress)
+                if rc != 0:
+                    conflicts = (await self._run_git(*CONFLICTS_ARGS))[1]
+                    await self._run_git("merge", "--abort")
+                    return self.git._merge_failed(conflicts, err)
+                out = out + "\n" + MERGED_MESSAGE
+            result = self.git._pull_result(rc, out, err)
+            # "Already up to date" — nothing new to download
+            if result[0] and lfs_env and await loop.run_in_executor(
+                    None, self.git.rev_parse, "HEAD") != head:
+                result = self.git._with_lfs(result, await self.lfs_pull(token, on_progress))
+        except GitCancelled:
+            return (False, CANCELLED_MESSAGE)
+        return result
+
+    async def branches_diverged(self, token=None):
+        """Async ``GitService.branches_diverged``."""
+        rc, out, _err = await self._run_git(*DIVERGENCE_ARGS, token=token)
+        return diverged(rc, out)
+
+    async def lfs_pull(self, token=None, on_progress=None):
+        """Async ``GitService.lfs_pull`` with the configured filters."""
+        loop = asyncio.get_event_loop()
+        args = await loop.run_in_executor(None, self.git._lfs_args, "pull")
+        try:
+            rc, out, err = await self._run_git(*args, token=token, env=LFS_PROGRESS_ENV,
+                                               on_progress=on_progress)
+        except GitCancelled:
+            return (False, CANCELLED_MESSAGE)
+        return self.git._lfs_result(rc, out, err)
+
+    async def commit(self, message, token=None):
+        """Stage all changes and commit. Returns (success, message)."""
+        try:
+            st = await self.get_status(token=token) if self.git.has_repo() else None
+            refused = self.git._commit_precheck(message, st)
+            if refused is not None:
+                return refused
+            rc, out, err = await self._run_git("add", ".", token=token)
+            if rc != 0:
+                return (False, "git add failed: " + err.strip())
+            rc, out, err = await self._run_git("commit", "-m", message, token=token)
+        except GitCancelled:
+            return (False, CANCELLED_MESSAGE)
+        return self.git._commit_result(rc, out, err)
+
+    async def push(self, token=None, on_progress=None):
+        """Run ``git push``. Returns (success, message)."""
+        if not self.git.has_repo():
+            return self.git._no_repo()
+        try:
+            rc, out, err = await self._run_git(*PUSH_ARGS, token=token, on_progress=on_progress)
+        except GitCancelled:
+            return (False, CANCELLED_MESSAGE)
+        return self.git._push_result(rc, out, err)
+
+    async def probe_remote(self, token=None):
+        """Async ``GitService.probe_remote``."""
+        results = []
+        for remote in self.git._probe_remotes():
+            rc, out, err = await self._run_git(*PROBE_ARGS, remote, token=token)
+            results.append((remote, rc, out, err))
+        return self.git._probe_result(results)
+
+    async def get_sync_status(self, force=False, token=None, on_progress=None):
+        """Async ``GitService.get_sync_status`` (same dict)."""
+        git = self.git
+        try:
+            fingerprint = ""
+            if git.config.get_fetch_probe_enabled() and not force and git.has_repo():
+                verdict, fingerprint, msg = await self.probe_remote(token=token)
+                if verdict == "error":
+                    return git._sync_failed(msg, fetched=False)
+                if verdict == "unchanged":
+                    return git._sync_unchanged(await self.get_status(token=token))
+
+            ok, msg = await self.fetch(token=token, on_progress=on_progress)
+            if not ok:
+                return git._sync_failed(msg, fetched=True)
+            return git._sync_fetched(msg, fingerprint, await self.get_status(token=token))
+        except GitCancelled:
+            return git._sync_failed(CANCELLED_MESSAGE, fetched=False)
+
+
+class AsyncBridge:
+    """Runs an asyncio event loop in a daemon thread for the wx UI.
+
+    ``submit(coro)`` is safe to call from any thread other than the
+    loop's own and returns a ``concurrent.futures.Future``.
+    """
+
+    def __init__(self):
+        if os.name == "nt" and sys.version_info < (3, 8):
+            self.loop = asyncio.ProactorEventLoop()  # subprocess support
+        else:
+            self.loop = asyncio.new_event_loop()
+        if os.name != "nt" and sys.version_info < (3, 8):
+            # Before 3.8 the child watcher must be bound from the main thread
+            asyncio.get_child_watcher().attach_loop(self.loop)
+        self._thread = threading.Thread(
+            target=self._run, name="git-asyncio", daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule ``coro`` on the loop and return a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        """Run ``coro`` on the loop and block until it finishes."""
+        return self.submit(coro).result()
+
+    def close(self):
+        """Cancel pending tasks and stop the loop thread."""
+        if not self.loop.is_running():
+            return
+
+        def _stop():
+            for task in _all_tasks(self.loop):
+                task.cancel()
+            self.loop.stop()
+
+        self.loop.call_soon_threadsafe(_stop)
+        self._thread.join(timeout=5)
+
+
+def _all_tasks(loop):
+    if hasattr(asyncio, "all_tasks"):
+        return asyncio.all_tasks(loop)
+    return asyncio.Task.all_tasks(loop)
@@ -17,9 +17,13 @@ _DEFAULTS = {
     },
     "repository": {
         "path": "",
+        "extra_paths": "",
+        "parallel": "4",
     },
     "ssh": {
         "key_path": "~/.ssh/kicad_forgejo_ed25519",
+        "multiplex": "0",
+        "control_persist_sec": "600",
     },
     "credentials": {
         "username": "",
@@ -28,10 +32,40 @@ _DEFAULTS = {
     "fetch": {
         "interval_sec": "300",
         "timeout_sec": "10",
+        "probe": "1",
+        "jitter_pct": "20",
+        "startup_delay_max_sec": "30",
+        "max_backoff_sec": "3600",
+    },
+    "status": {
+        "watch": "1",
+        "poll_interval_sec": "2",
+    },
+    "performance": {
+        "mode": "ask",
+        "large_repo_files": "5000",
+    },
+    "lfs": {
+        "mode": "auto",
+        "concurrency": "8",
+        "include": "",
+        "exclude": "",
+    },
+    "clone": {
+        "url": "",
+        "filter": "blob:none",
+    },
+    "cache": {
+        "parse_max_files": "20000",
     },
 }
 
 
+def _split_list(value):
+    """Split a comma / newline separated ini value into a list."""
+    return [item.strip() for item in value.replace(",", "\n").splitlines() if item.strip()]
+
+
 class ConfigService:
     """Thin wrapper around configparser with typed accessors."""
 
@@ -108,15 +142,101 @@ class ConfigService:
             return os.path.expanduser(os.path.abspath(raw))
         return ""
 
+    def get_extra_repo_paths(self):
+        """Return the additional library repositories (one per line in the ini)."""
+        paths = []
+        for line in self.get("repository", "extra_paths").splitlines():
+            line = line.strip()
+            if line:
+                paths.append(os.path.abspath(os.path.expanduser(line)))
+        return paths
+
+    def set_extra_repo_paths(self, paths):
+        self.set("repository", "extra_paths",
+                 "\n".join(p.strip() for p in paths if p.strip()))
+
+    def get_repo_paths(self):
+        """Return the primary repository followed by the extra ones, deduplicated."""
+        result = []
+        for path in [self.get_repo_path()] + self.get_extra_repo_paths():
+            if path and path not in result:
+                result.append(path)
+        return result
+
+    def get_repo_parallelism(self):
+        """Maximum number of repositories fetched / read at the same time."""
+        return min(max(self.getint("repository", "parallel", fallback=4), 1), 16)
+
     def get_ssh_key_path(self):
         return self.get("ssh", "key_path", fallback="~/.ssh/kicad_forgejo_ed25519")
 
+    def get_ssh_multiplex_enabled(self):
+        """Return True when SSH connection sharing (ControlMaster) is on."""
+        return self.getint("ssh", "multiplex", fallback=0) != 0
+
+    def get_ssh_control_persist(self):
+        return max(self.getint("ssh", "control_persist_sec", fallback=600), 0)
+
     def get_fetch_interval(self):
         return self.getint("fetch", "interval_sec", fallback=300)
 
     def get_fetch_timeout(self):
         return self.getint("fetch", "timeout_sec", fallback=10)
 
+    def get_status_watch_enabled(self):
+        """Return True when status is refreshed from working-tree events."""
+        return self.getint("status", "watch", fallback=1) != 0
+
+    def get_status_poll_interval(self):
+        return max(self.getint("status", "poll_interval_sec", fallback=2), 1)
+
+    def get_performance_mode(self):
+        """Return 'ask', 'on' or 'off'."""
+        mode = self.get("performance", "mode", fallback="ask").strip().lower()
+        return mode if mode in ("ask", "on", "off") else "ask"
+
+    def get_large_repo_threshold(self):
+        return self.getint("performance", "large_repo_files", fallback=5000)
+
+    def get_fetch_jitter_pct(self):
+        return min(max(self.getint("fetch", "jitter_pct", fallback=20), 0), 90)
+
+    def get_fetch_startup_delay_max(self):
+        return max(self.getint("fetch", "startup_delay_max_sec", fallback=30), 0)
+
+    def get_fetch_max_backoff(self):
+        return max(self.getint("fetch", "max_backoff_sec", fallback=3600), 10)
+
+    def get_fetch_probe_enabled(self):
+        """Return True when fetch is preceded by an ls-remote probe."""
+        return self.getint("fetch", "probe", fallback=1) != 0
+
+    def get_clone_url(self):
+        return self.get("clone", "url").strip()
+
+    def get_clone_filter(self):
+        """Partial-clone filter for new clones ('' = full clone)."""
+        return self.get("clone", "filter", fallback="blob:none").strip()
+
+    def get_lfs_mode(self):
+        """Return 'auto' (manage LFS transfers when the repo uses LFS) or 'off'."""
+        mode = self.get("lfs", "mode", fallback="auto").strip().lower()
+        return mode if mode in ("auto", "off") else "auto"
+
+    def get_lfs_concurrency(self):
+        return min(max(self.getint("lfs", "concurrency", fallback=8), 1), 64)
+
+    def get_lfs_include(self):
+        """LFS paths to download (libraries or patterns); empty = all."""
+        return _split_list(self.get("lfs", "include"))
+
+    def get_lfs_exclude(self):
+        return _split_list(self.get("lfs", "exclude"))
+
+    def get_parse_cache_size(self):
+        """Library blobs whose summaries are kept in the parse cache."""
+        return max(self.getint("cache", "parse_max_files", fallback=20000), 100)
+
     def get_credentials_username(self):
         return self.get("credentials", "username")
 
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Fetch policy — decides when the next background fetch may run.
+
+* Every delay gets random jitter, and the first fetch after the dialog
+  opens is delayed by a random amount, so many KiCad instances opened at
+  the same time do not hit the server together.
+* After a failed fetch (timeout, no network, server error) the interval
+  grows exponentially up to ``max_backoff_sec``.
+* A ``.kicad-git-retry-after`` file in the repository (read from the
+  upstream branch first, so admins can push it) sets a minimum interval
+  in seconds.
+* The backoff state is stored in ``.git/kicad_git_plugin/`` and survives
+  closing the dialog: a reopened dialog waits out a pending backoff.
+"""
+
+import json
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger("kicad_git_plugin.fetch_policy")
+
+RETRY_AFTER_FILE = ".kicad-git-retry-after"
+_STATE_FILE = "fetch_backoff.json"
+
+
+class FetchPolicy:
+    """Jittered, load-aware fetch timer policy.
+
+    Parameters
+    ----------
+    git : git_service.GitService
+    config : config_service.ConfigService
+    rng : random.Random, optional
+    """
+
+    def __init__(self, git, config, rng=None):
+        self.git = git
+        self.config = config
+        self._rng = rng or random.Random()
+        self.failures = 0
+        self.next_allowed = 0.0
+        self.last_error = ""
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def _load(self):
+        path = self.git.state_path(_STATE_FILE)
+        if not path:
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            self.failures = int(data.get("failures", 0))
+            self.next_allowed = float(data.get("next_allowed", 0.0))
+            self.last_error = str(data.get("last_error", ""))
+        except (OSError, ValueError, TypeError):
+            pass
+
+    def _save(self):
+        path = self.git.state_path(_STATE_FILE, create_dir=True)
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as fh:
+                json.dump({
+                    "failures": self.failures,
+                    "next_allowed": self.next_allowed,
+                    "last_error": self.last_error,
+                }, fh)
+        except OSError as exc:
+            logger.debug("Cannot store fetch backoff state: %s", exc)
+
+    # ------------------------------------------------------------------
+    # Inputs
+    # ------------------------------------------------------------------
+    def retry_after_hint(self):
+        """Return the server-provided minimum interval in seconds, or 0."""
+        text = ""
+        obj = self.git.read_object("@{upstream}:" + RETRY_AFTER_FILE)
+        if obj is not None and obj[1] == "blob":
+            text = obj[2].decode("utf-8", "replace")
+        else:
+            path = self.git.get_repo_path()
+            if path:
+                try:
+                    with open(os.path.join(path, RETRY_AFTER_FILE), "r", encoding="utf-8") as fh:
+                        text = fh.read()
+                except OSError:
+                    return 0
+        try:
+            return max(int(text.strip().split()[0]), 0)
+        except (ValueError, IndexError):
+            return 0
+
+    def _jitter(self, seconds):
+        pct = self.config.get_fetch_jitter_pct() / 100.0
+        return seconds * self._rng.uniform(1.0 - pct, 1.0 + pct)
+
+    # ------------------------------------------------------------------
+    # Decisions
+    # ------------------------------------------------------------------
+    def _respect_persisted(self, delay):
+        wait = self.next_allowed - time.time()
+        return max(delay, wait)
+
+    def initial_delay(self):
+        """Seconds to wait before the first fetch after the dialog opens."""
+        spread = min(self.config.get_fetch_startup_delay_max(), self.config.get_fetch_interval())
+        delay = self._rng.uniform(0.0, max(spread, 0))
+        return self._respect_persisted(delay)
+
+    def next_delay(self):
+        """Seconds until the next fetch, including backoff and jitter."""
+        interval = float(self.config.get_fetch_interval())
+        if self.failures:
+            interval = min(interval * (2 ** self.failures), self.config.get_fetch_max_backoff())
+        interval = max(interval, float(self.retry_after_hint()))
+        return self._respect_persisted(self._jitter(interval))
+
+    def record(self, success, message=""):
+        """Update backoff state after a fetch and persist it.
+
+        Returns
+        -------
+        float
+            Delay in seconds until the next fetch.
+        """
+        self.next_allowed = 0.0
+        if success:
+            self.failures = 0
+            self.last_error = ""
+        else:
+            self.failures = min(self.failures + 1, 16)
+            self.last_error = message
+        delay = self.next_delay()
+        # Only a backoff is carried over to the next dialog session
+        if not success:
+            self.next_allowed = time.time() + delay
+        self._save()
+        if not success:
+            logger.info("Fetch failed %d time(s), next attempt in %.0fs", self.failures, delay)
+        return delay
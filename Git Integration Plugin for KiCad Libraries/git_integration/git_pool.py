@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Git process pool — long-lived ``git cat-file --batch`` / ``--batch-check``
+workers per repository for read-only ref and object queries.
+
+A query is one line written to the worker's stdin instead of a fresh
+fork+exec of ``git``. Workers that stay idle are closed by a reaper
+thread; a worker that died (or was killed) is restarted on the next
+request.
+"""
+
+import logging
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger("kicad_git_plugin.pool")
+
+# Close workers unused for this long (seconds)
+DEFAULT_IDLE_TIMEOUT = 120
+
+MODE_BATCH = "--batch"
+MODE_BATCH_CHECK = "--batch-check"
+
+
+class PoolError(Exception):
+    """Raised when a worker cannot serve a request even after a restart."""
+
+
+class _CatFileWorker:
+    """One ``git cat-file`` process speaking the batch protocol."""
+
+    def __init__(self, git, repo, mode, env):
+        self.git = git
+        self.repo = repo
+        self.mode = mode
+        self.env = env
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self._proc = None
+
+    def _start(self):
+        logger.debug("Starting git cat-file %s in %s", self.mode, self.repo)
+        self._proc = subprocess.Popen(
+            [self.git, "cat-file", self.mode],
+            cwd=self.repo,
+            env=self.env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def close(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            proc.wait(timeout=2)
+        except Exception:
+            proc.kill()
+            proc.wait()
+        try:
+            proc.stdout.close()
+        except Exception:
+            pass
+
+    def _exchange(self, name):
+        proc = self._proc
+        proc.stdin.write(name.encode("utf-8") + b"\n")
+        proc.stdin.flush()
+        header = proc.stdout.readline()
+        if not header.endswith(b"\n"):
+            raise EOFError("cat-file closed its output")
+        parsed = _parse_header(header)
+        if parsed is None:
+            return None
+        oid, otype, size = parsed
+        data = None
+        if self.mode == MODE_BATCH:
+            data = _read_exact(proc.stdout, size + 1)[:size]
+        return (oid, otype, size, data)
+
+    def request(self, name):
+        """Send one object name and return (oid, type, size, data) or None.
+
+        ``data`` is None for ``--batch-check`` workers. A dead worker is
+        restarted once before giving up.
+        """
+        with self.lock:
+            self.last_used = time.monotonic()
+            for attempt in (1, 2):
+                if not self.alive():
+                    if self._proc is not None:
+                        logger.warning(
+                            "git cat-file %s in %s exited (rc=%s), restarting",
+                            self.mode, self.repo, self._proc.returncode,
+                        )
+                    self.close()
+                    self._start()
+                try:
+                    return self._exchange(name)
+                except (OSError, EOFError, ValueError) as exc:
+                    logger.warning("git cat-file request failed (%s), attempt %d", exc, attempt)
+                    self.close()
+            raise PoolError("git cat-file {m} is not responding".format(m=self.mode))
+
+
+def _parse_header(header):
+    """Return (oid, type, size) of a cat-file header line, or None for
+    ``<name> missing`` / ``<name> ambiguous`` (the name may contain
+    spaces, so the reply is recognised by its suffix)."""
+    line = header.decode("utf-8", "replace").rstrip("\n")
+    if line.endswith((" missing", " ambiguous")):
+        return None
+    oid, otype, size = line.split(" ")
+    return oid, otype, int(size)
+
+
+def _read_exact(stream, size):
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            raise EOFError("cat-file closed its output")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def stream_objects(git, repo, names, env=None):
+    """Yield ``(name, oid, type, bytes)`` for many objects from one
+    short-lived ``git cat-file --batch``.
+
+    Names are written by a feeder thread while the caller consumes the
+    output, so git inflates the next object while Python handles the
+    current one. Missing objects yield ``(name, None, None, None)``.
+    Use it for bulk reads; the pooled worker is for single lookups.
+    """
+    names = [n for n in names if "\n" not in n]
+    if not names:
+        return
+    proc = subprocess.Popen(
+        [git, "cat-file", MODE_BATCH],
+        cwd=repo,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+
+    def _feed():
+        try:
+            for name in names:
+                proc.stdin.write(name.encode("utf-8") + b"\n")
+        except OSError:
+            pass  # reader gave up
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    feeder = threading.Thread(target=_feed, name="git-cat-file-feed", daemon=True)
+    feeder.start()
+    finished = False
+    try:
+        for name in names:
+            header = proc.stdout.readline()
+            if not header.endswith(b"\n"):
+                raise EOFError("cat-file closed its output")
+            parsed = _parse_header(header)
+            if parsed is None:
+                yield (name, None, None, None)
+                continue
+            oid, otype, size = parsed
+            yield (name, oid, otype, _read_exact(proc.stdout, size + 1)[:size])
+        finished = True
+    finally:
+        if not finished and proc.poll() is None:
+            proc.kill()  # consumer stopped early
+        proc.wait()
+        proc.stdout.close()
+        feeder.join(1)
+
+
+class GitProcessPool:
+    """Keeps one batch and one batch-check worker per repository."""
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._workers = {}  # (repo, mode) -> _CatFileWorker
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _worker(self, git, repo, mode, env):
+        key = (repo, mode)
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None or worker.git != git:
+                worker = _CatFileWorker(git, repo, mode, env)
+                self._workers[key] = worker
+            else:
+                # Keep the newest environment for the next restart
+                worker.env = env
+            if self._reaper is None:
+                self._reaper = threading.Thread(
+                    target=self._reap_loop, name="git-pool-reaper", daemon=True,
+                )
+                self._reaper.start()
+        return worker
+
+    def _reap_loop(self):
+        interval = max(self.idle_timeout / 2.0, 1.0)
+        while not self._stop.wait(interval):
+            self.close_idle()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def object_info(self, git, repo, name, env=None):
+        """Return (oid, type, size) for an object name, or None if missing."""
+        if "\n" in name:
+            return None
+        res = self._worker(git, repo, MODE_BATCH_CHECK, env).request(name)
+        if res is None:
+            return None
+        return res[:3]
+
+    def resolve(self, git, repo, name, env=None):
+        """Return the object id a revision resolves to, or ''."""
+        info = self.object_info(git, repo, name, env)
+        return info[0] if info else ""
+
+    def read_object(self, git, repo, name, env=None):
+        """Return (oid, type, bytes) for an object name, or None if missing."""
+        if "\n" in name:
+            return None
+        res = self._worker(git, repo, MODE_BATCH, env).request(name)
+        if res is None:
+            return None
+        return (res[0], res[1], res[3])
+
+    def close_idle(self):
+        """Close workers that have been idle longer than ``idle_timeout``."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                (key, w) for key, w in self._workers.items()
+                if now - w.last_used > self.idle_timeout
+            ]
+        for key, worker in idle:
+            # Skip workers that are busy right now
+            if not worker.lock.acquire(False):
+                continue
+            try:
+                if now - worker.last_used <= self.idle_timeout:
+                    continue
+                with self._lock:
+                    if self._workers.get(key) is worker:
+                        del self._workers[key]
+                if worker.alive():
+                    logger.debug("Closing idle git cat-file %s in %s", worker.mode, worker.repo)
+                worker.close()
+            finally:
+                worker.lock.release()
+
+    def close_repo(self, repo):
+        """Close all workers of one repository."""
+        with self._lock:
+            keys = [k for k in self._workers if k[0] == repo]
+            workers = [self._workers.pop(k) for k in keys]
+        for worker in workers:
+            with worker.lock:
+                worker.close()
+
+    def close_all(self):
+        """Close every worker (e.g. when the dialog is closed)."""
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            with worker.lock:
+                worker.close()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool():
+    """Return the process-wide pool shared by all GitService instances."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = GitProcessPool()
+        return _default_pool
@@ -4,24 +4,290 @@ Git service — every git operation goes through subprocess with
 GIT_SSH_COMMAND pointing at the configured SSH key.
 """
 
+import hashlib
+import json
 import logging
 import os
+import re
 import subprocess
 import shutil
+import signal
+import struct
+import sys
+import threading
+import time
+
+from .git_pool import PoolError, default_pool, stream_objects
+from .kicad_merge import handles as merge_driver_handles
+from .git_status import (
+    _LIBRARY_DIR_SUFFIXES,
+    STATUS_ARGS,
+    GitStatus,
+    library_of,
+    parse_porcelain_v2,
+)
+from .progress import LineSplitter, is_progress_line, parse_progress_line
+from .ssh_service import ensure_control_dir, live_control_sockets, multiplex_options
 
 logger = logging.getLogger("kicad_git_plugin.git")
 
+# git config keys managed by the "performance mode" setting
+_PERFORMANCE_KEYS = (
+    ("feature.manyFiles", "true"),
+    ("core.untrackedCache", "true"),
+    ("index.version", "4"),
+)
+_FSMONITOR_KEY = ("core.fsmonitor", "true")
+# State file recording what enable_performance_mode changed (see state_path)
+_PERFORMANCE_STATE_FILE = "performance_mode.json"
+
+# Network commands (streamed with --progress)
+FETCH_ARGS = ("fetch", "--all", "--progress")
+PULL_ARGS = ("pull", "--ff-only", "--progress")
+# Fallback when branches diverged and the library merge driver is set up
+PULL_MERGE_ARGS = ("pull", "--no-rebase", "--no-edit", "--progress")
+CONFLICTS_ARGS = ("diff", "--name-only", "--diff-filter=U", "-z")
+# Commits only on our side / only upstream, after pull's fetch
+DIVERGENCE_ARGS = ("rev-list", "--left-right", "--count", "HEAD...@{upstream}")
+MERGE_DRIVER = "kicad"
+MERGE_PATTERNS = ("*.kicad_sym", "sym-lib-table", "fp-lib-table")
+PUSH_ARGS = ("push", "--progress")
+# Probe of everything FETCH_ARGS would update, run per remote
+PROBE_ARGS = ("ls-remote", "--heads", "--tags")
+
+# Per-repository remote URL / GIT_SSH_COMMAND cache, shared by all
+# GitService instances: {repo_path: _RemoteInfo}
+_remote_cache = {}
+_remote_cache_lock = threading.Lock()
+
+# Duration of network operations that had to open a fresh SSH connection:
+# {(repo, op): seconds}. Used to estimate the handshake time saved when a
+# later operation reuses a ControlMaster connection.
+_cold_durations = {}
+
+
+def _classify_remote(url):
+    """Return 'ssh', 'https', or 'unknown' for a remote URL."""
+    if url.startswith("https://") or url.startswith("http://"):
+        return "https"
+    if url.startswith("git@") or url.startswith("ssh://"):
+        return "ssh"
+    if url:
+        return "ssh"  # e.g. user@host:path
+    return "unknown"
+
+
+def process_group_kwargs():
+    """Popen arguments that put the child in its own process group."""
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+# Seconds between SIGTERM and SIGKILL for commands that may be hard-killed
+KILL_GRACE_SEC = 5
+# Commands that only talk to the remote (and write no lock git cannot
+# recover from). Everything else — add, commit, the merge/checkout of
+# pull, lfs pull — is only ever asked to stop, so git removes its
+# index.lock / ref locks itself.
+_HARD_KILL_COMMANDS = ("fetch", "ls-remote", "push", "clone")
+
+
+def hard_kill_allowed(args):
+    """Return True when git ``args`` may be SIGKILLed after the grace time."""
+    name = _command_name(args)
+    if name == "lfs":
+        i = list(args).index("lfs")
+        return tuple(args[i + 1:i + 2]) == ("fetch",)
+    return name in _HARD_KILL_COMMANDS
+
+
+def kill_process_group(pid, force=False):
+    """Stop process ``pid`` and everything it spawned (ssh, remote helpers).
+
+    Sends SIGTERM (``taskkill /T`` on Windows), which git answers by
+    removing its lock files; ``force`` sends SIGKILL (``taskkill /F``).
+    The child must have been started with :func:`process_group_kwargs`.
+    Raises OSError / SubprocessError when the group cannot be signalled.
+    """
+    if os.name == "nt":
+        subprocess.run(
+            ["taskkill"] + (["/F"] if force else []) + ["/T", "/PID", str(pid)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10,
+        )
+    else:
+        os.killpg(pid, signal.SIGKILL if force else signal.SIGTERM)
+
+
+def kill_process_tree(proc, hard_kill=True):
+    """Stop a ``subprocess.Popen`` child together with its descendants.
+
+    The group gets SIGTERM first; SIGKILL follows after
+    :data:`KILL_GRACE_SEC` only when ``hard_kill`` is set, otherwise the
+    child is waited for.
+    """
+    if proc.poll() is not None:
+        return
+    try:
+        kill_process_group(proc.pid)
+    except (OSError, subprocess.SubprocessError) as exc:
+        logger.debug("Process group signal failed (%s), stopping git only", exc)
+        proc.terminate()
+    try:
+        proc.wait(timeout=KILL_GRACE_SEC)
+        return
+    except subprocess.TimeoutExpired:
+        pass
+    if not hard_kill:
+        logger.warning("git (pid %d) still running after SIGTERM, waiting for it", proc.pid)
+        proc.wait()
+        return
+    try:
+        kill_process_group(proc.pid, force=True)
+    except (OSError, subprocess.SubprocessError) as exc:
+        logger.debug("Process group kill failed (%s), killing git only", exc)
+        proc.kill()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        logger.warning("git (pid %d) did not exit after kill", proc.pid)
+
+
+def _is_network(args):
+    return any(a in args for a in ("fetch", "pull", "push", "ls-remote", "clone"))
+
+
+def timeout_message(timeout, streaming=False):
+    """User-facing text for a git command that ran out of time."""
+    if streaming:
+        return "Сервер не отвечает {t} сек, операция прервана".format(t=timeout)
+    return "Сервер недоступен (таймаут {t} сек)".format(t=timeout)
+
+
+LFS_MISSING_MESSAGE = "Git LFS не установлен (https://git-lfs.com)."
+# git-lfs only draws progress on a terminal unless forced
+LFS_PROGRESS_ENV = {"GIT_LFS_FORCE_PROGRESS": "1"}
+_LFS_FILTER_RE = re.compile(r"(?:^|\s)filter=lfs(?:\s|$)")
+
+
+def lfs_patterns_from_attributes(text):
+    """Return the patterns with ``filter=lfs`` in ``.gitattributes`` text."""
+    patterns = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split(None, 1)
+        if len(parts) == 2 and _LFS_FILTER_RE.search(parts[1]):
+            patterns.append(parts[0])
+    return patterns
+
+
+_FILTER_RE = re.compile(r"^blob:(?:none|limit=\d+[kmg]?)$")
+
+
+def normalize_filter(spec):
+    """Validate a partial-clone filter ('' means no filter).
+
+    Accepts ``blob:none`` and ``blob:limit=<n>[k|m|g]``; raises ValueError.
+    """
+    spec = (spec or "").strip().lower()
+    if spec and not _FILTER_RE.match(spec):
+        raise ValueError("Неверный фильтр: {s} (нужно blob:none или blob:limit=1m)".format(s=spec))
+    return spec
+
+
+MERGED_MESSAGE = "Ветки объединены: библиотеки слиты по символам."
+
+
+def diverged(rc, out):
+    """Return True when ``git rev-list`` with :data:`DIVERGENCE_ARGS`
+    reports commits on both sides.
+
+    Decided from refs, not from ``pull --ff-only`` messages, which git
+    translates to the user's language.
+    """
+    counts = out.split()
+    if rc != 0 or len(counts) != 2 or not all(c.isdigit() for c in counts):
+        return False
+    return int(counts[0]) > 0 and int(counts[1]) > 0
+
+
+def python_executable():
+    """Return a Python interpreter that can run the merge driver script.
+
+    Inside KiCad ``sys.executable`` may be KiCad itself; the bundled
+    interpreter is then looked up next to it and in ``sys.prefix``.
+    """
+    exe = sys.executable or ""
+    if os.path.basename(exe).lower().startswith("python"):
+        return exe
+    for folder in (os.path.dirname(exe), os.path.join(sys.prefix, "bin"), sys.prefix):
+        for name in ("python3", "python", "python.exe"):
+            candidate = os.path.join(folder, name)
+            if os.path.isfile(candidate):
+                return candidate
+    return shutil.which("python3") or shutil.which("python") or ""
+
+
+def merge_driver_command():
+    """Return the ``merge.kicad.driver`` command line for this installation."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kicad_merge.py")
+    # Forward slashes survive the shell git runs the driver through
+    return '"{py}" "{script}" %O %A %B %P'.format(
+        py=python_executable().replace("\\", "/"), script=script.replace("\\", "/"))
+
+
+def _command_name(args):
+    """Return the git subcommand of ``args`` (skips leading ``-c key=value``)."""
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        i += 2 if args[i] == "-c" else 1
+    return args[i] if i < len(args) else ""
+
+
+def _progress_sink(on_progress):
+    """Network commands always stream so the idle timeout applies."""
+    if on_progress is None:
+        return lambda event: None
+    return on_progress
+
+
+class _RemoteInfo:
+    """Remote URL, remote type and GIT_SSH_COMMAND for one repository."""
+
+    __slots__ = ("signature", "url", "remote_type", "ssh_command")
+
+    def __init__(self, signature, url, ssh_command):
+        self.signature = signature
+        self.url = url
+        self.remote_type = _classify_remote(url)
+        self.ssh_command = ssh_command
+
 
 class GitService:
     """High-level wrapper around the ``git`` CLI."""
 
-    def __init__(self, config):
+    def __init__(self, config, repo_path=None):
         """
         Parameters
         ----------
         config : config_service.ConfigService
+        repo_path : str, optional
+            Repository to work on; defaults to ``[repository] path``.
+            Used for the extra library repositories.
         """
         self.config = config
+        self._repo_path = repo_path
+        self._pool = default_pool()
+        # Remote-change probe statistics for this session
+        self.probe_count = 0
+        self.fetch_count = 0
+        # ControlMaster reuse statistics for this session
+        self.ssh_reused = 0
+        self.ssh_saved_sec = 0.0
+        self.last_ssh_note = ""
+        self._lfs_version = None
 
     # ------------------------------------------------------------------
     # Internals
@@ -35,19 +301,69 @@ class GitService:
     def _build_env(self):
         env = os.environ.copy()
         # Only set GIT_SSH_COMMAND for SSH remotes
-        if self._is_ssh_remote():
-            key_path = os.path.expanduser(self.config.get_ssh_key_path())
-            if os.path.exists(key_path):
-                env["GIT_SSH_COMMAND"] = (
-                    'ssh -i "{key}" -o StrictHostKeyChecking=accept-new'.format(key=key_path)
-                )
+        ssh_command = self._remote_info().ssh_command
+        if ssh_command:
+            env["GIT_SSH_COMMAND"] = ssh_command
         return env
 
-    def _get_remote_url(self):
-        """Return the URL of the 'origin' remote, or ''."""
-        repo = self.config.get_repo_path()
+    def _remote_signature(self, repo):
+        """Return a tuple that changes whenever the cached remote info may be stale.
+
+        Built from the mtime/inode/size of ``.git/config`` and the
+        configured SSH key path (plus whether that key exists).
+        """
+        try:
+            cst = os.stat(os.path.join(repo, ".git", "config"))
+            config_sig = (cst.st_mtime_ns, cst.st_ino, cst.st_size)
+        except OSError:
+            config_sig = None
+        key_path = os.path.expanduser(self.config.get_ssh_key_path())
+        return (config_sig, key_path, os.path.exists(key_path),
+                tuple(multiplex_options(self.config)))
+
+    def _remote_info(self):
+        """Return cached :class:`_RemoteInfo` for the configured repository."""
+        repo = self.get_repo_path()
         if not repo:
-            return ""
+            return _RemoteInfo(None, "", None)
+
+        sig = self._remote_signature(repo)
+        with _remote_cache_lock:
+            info = _remote_cache.get(repo)
+        if info is not None and info.signature == sig:
+            return info
+
+        url = self._query_remote_url(repo)
+        ssh_command = None
+        if not url or _classify_remote(url) == "ssh":  # assume SSH if unknown
+            key_path, key_exists, mux = sig[1], sig[2], sig[3]
+            if key_exists:
+                ssh_command = (
+                    'ssh -i "{key}" -o StrictHostKeyChecking=accept-new'.format(key=key_path)
+                )
+                if mux:
+                    try:
+                        ensure_control_dir()
+                        ssh_command += "".join(
+                            ' {o} "{v}"'.format(o=mux[i], v=mux[i + 1])
+                            for i in range(0, len(mux), 2)
+                        )
+                    except OSError as exc:
+                        logger.warning("SSH multiplexing disabled: %s", exc)
+        info = _RemoteInfo(sig, url, ssh_command)
+        with _remote_cache_lock:
+            _remote_cache[repo] = info
+        logger.debug("Remote info refreshed for %s: %s", repo, info.remote_type)
+        return info
+
+    def invalidate_remote_cache(self):
+        """Drop the cached remote URL/environment for the configured repository."""
+        repo = self.get_repo_path()
+        with _remote_cache_lock:
+            _remote_cache.pop(repo, None)
+
+    def _query_remote_url(self, repo):
+        """Ask git for the URL of the 'origin' remote, or ''."""
         git = self._git_executable()
         if not git:
             return ""
@@ -66,12 +382,16 @@ class GitService:
             pass
         return ""
 
+    def _get_remote_url(self):
+        """Return the URL of the 'origin' remote, or ''."""
+        return self._remote_info().url
+
     def _is_ssh_remote(self):
         """Return True if origin remote uses SSH (not HTTPS)."""
         url = self._get_remote_url()
         if not url:
             return True  # assume SSH if we can't determine
-        return not url.startswith("http://") and not url.startswith("https://")
+        return _classify_remote(url) == "ssh"
 
     def get_remote_url(self):
         """Public: return remote URL."""
@@ -79,14 +399,7 @@ class GitService:
 
     def get_remote_type(self):
         """Return 'ssh', 'https', or 'unknown'."""
-        url = self._get_remote_url()
-        if url.startswith("https://") or url.startswith("http://"):
-            return "https"
-        if url.startswith("git@") or url.startswith("ssh://"):
-            return "ssh"
-        if url:
-            return "ssh"  # e.g. user@host:path
-        return "unknown"
+        return self._remote_info().remote_type
 
     def apply_credentials(self):
         """Embed username:token into the HTTPS remote URL.
@@ -119,6 +432,7 @@ class GitService:
         new_url = "{s}{u}:{t}@{r}".format(s=scheme, u=username, t=token, r=rest)
 
         rc, out, err = self._run_git("remote", "set-url", "origin", new_url)
+        self.invalidate_remote_cache()
         if rc == 0:
             logger.info("Credentials applied to remote URL")
             return (True, "Токен применён к remote URL.")
@@ -142,33 +456,40 @@ class GitService:
         if clean_url == url:
             return (True, "URL уже без credentials.")
         rc, out, err = self._run_git("remote", "set-url", "origin", clean_url)
+        self.invalidate_remote_cache()
         if rc == 0:
             return (True, "Credentials удалены из URL.")
         return (False, "Ошибка: " + err.strip())
 
-    def _run_git(self, *args):
-        """Run a git command inside the repository directory.
+    def _prepare_command(self, args, cwd=None, network=False):
+        """Resolve executable, cwd, environment and timeout for ``git args``.
+
+        ``cwd`` overrides the repository directory (e.g. for clone);
+        ``network`` forces the long timeout of transfer commands (e.g.
+        a checkout that downloads missing blobs of a partial clone).
 
         Returns
         -------
-        tuple(int, str, str)
-            (returncode, stdout, stderr)
+        tuple
+            (error, cmd, repo, env, timeout) — ``error`` is a ready
+            (returncode, stdout, stderr) tuple when git cannot run.
         """
         git = self._git_executable()
         if git is None:
-            return (-1, "", "Git не найден. Установите git и попробуйте снова.")
+            return ((-1, "", "Git не найден. Установите git и попробуйте снова."),
+                    None, None, None, 0)
 
-        repo = self.config.get_repo_path()
+        repo = cwd or self.get_repo_path()
         if not repo:
-            return (-1, "", "Путь к репозиторию не задан в настройках.")
+            return ((-1, "", "Путь к репозиторию не задан в настройках."),
+                    None, None, None, 0)
 
         cmd = [git] + list(args)
         fetch_timeout = self.config.get_fetch_timeout()
 
         # Network ops get longer timeout; push/pull need more than fetch
-        is_network = any(a in args for a in ("fetch", "pull", "push", "ls-remote"))
-        if is_network:
-            if any(a in args for a in ("push", "pull")):
+        if network or _is_network(args):
+            if network or any(a in args for a in ("push", "pull", "clone")):
                 timeout = max(fetch_timeout * 3, 30)  # min 30 sec for push/pull
             else:
                 timeout = fetch_timeout  # fetch/ls-remote: use config value
@@ -176,24 +497,73 @@ class GitService:
             timeout = 60  # local ops
 
         logger.debug("git %s  (cwd=%s, timeout=%s)", " ".join(args), repo, timeout)
+        return (None, cmd, repo, self._build_env(), timeout)
+
+    def _mux_begin(self, args, env):
+        """Note whether a network op can reuse a ControlMaster connection."""
+        if not _is_network(args):
+            return None
+        self.last_ssh_note = ""
+        if "ControlMaster=auto" not in env.get("GIT_SSH_COMMAND", ""):
+            return None
+        return (_command_name(args), bool(live_control_sockets()), time.monotonic())
+
+    def _mux_end(self, mux, repo, rc):
+        if mux is not None and rc == 0:
+            op, warm, started = mux
+            self._record_mux(repo, op, warm, time.monotonic() - started)
 
+    def _run_git(self, *args, **options):
+        """Run a git command inside the repository directory.
+
+        Keyword options
+        ---------------
+        on_progress : callable, optional
+            Stream the output instead of buffering it: called with a
+            :class:`progress.ProgressEvent` for every ``--progress``
+            update. The timeout then counts from the last output, so a
+            long transfer that keeps moving is never killed.
+        cwd : str, optional
+            Run outside the repository (clone).
+        network : bool
+            Use the transfer timeout for a command that may download.
+        env : dict, optional
+            Extra environment variables for this command.
+
+        Returns
+        -------
+        tuple(int, str, str)
+            (returncode, stdout, stderr)
+        """
+        on_progress = options.pop("on_progress", None)
+        cwd = options.pop("cwd", None)
+        network = options.pop("network", False)
+        extra_env = options.pop("env", None)
+        if options:
+            raise TypeError("Unknown options: " + ", ".join(sorted(options)))
+
+        error, cmd, repo, env, timeout = self._prepare_command(args, cwd, network)
+        if error is not None:
+            return error
+        if extra_env:
+            env.update(extra_env)
+        mux = self._mux_begin(args, env)
+
+        hard_kill = hard_kill_allowed(args)
         try:
-            proc = subprocess.run(
-                cmd,
-                cwd=repo,
-                env=self._build_env(),
-                capture_output=True,
-                encoding="utf-8",
-                errors="replace",
-                timeout=timeout,
-            )
-            if proc.stdout:
-                logger.debug("stdout: %s", proc.stdout.strip())
-            if proc.stderr:
-                logger.debug("stderr: %s", proc.stderr.strip())
-            return (proc.returncode, proc.stdout, proc.stderr)
+            if on_progress is not None:
+                rc, out, err = self._run_streaming(cmd, repo, env, timeout, on_progress,
+                                                   hard_kill)
+            else:
+                rc, out, err = self._run_buffered(cmd, repo, env, timeout, hard_kill)
+            if out:
+                logger.debug("stdout: %s", out.strip())
+            if err:
+                logger.debug("stderr: %s", err.strip())
+            self._mux_end(mux, repo, rc)
+            return (rc, out, err)
         except subprocess.TimeoutExpired:
-            msg = "Сервер недоступен (таймаут {t} сек)".format(t=timeout)
+            msg = timeout_message(timeout, streaming=on_progress is not None)
             logger.warning(msg)
             return (-2, "", msg)
         except FileNotFoundError:
@@ -202,12 +572,141 @@ class GitService:
             logger.error("git error: %s", exc)
             return (-1, "", str(exc))
 
+    @staticmethod
+    def _run_buffered(cmd, repo, env, timeout, hard_kill):
+        """Run ``cmd`` and return (rc, stdout, stderr) once it exits.
+
+        Raises ``subprocess.TimeoutExpired`` after ``timeout`` seconds;
+        the process group is stopped first (see :func:`kill_process_tree`).
+        """
+        proc = subprocess.Popen(
+            cmd,
+            cwd=repo,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding="utf-8",
+            errors="replace",
+            **process_group_kwargs()
+        )
+        try:
+            out, err = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process_tree(proc, hard_kill)
+            proc.communicate()
+            raise
+        return (proc.returncode, out, err)
+
+    def _run_streaming(self, cmd, repo, env, idle_timeout, on_progress, hard_kill=True):
+        """Run ``cmd`` reading stdout/stderr as they arrive.
+
+        Raises ``subprocess.TimeoutExpired`` after ``idle_timeout``
+        seconds without any output; the process group is stopped first
+        (see :func:`kill_process_tree`).
+        """
+        proc = subprocess.Popen(
+            cmd,
+            cwd=repo,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **process_group_kwargs()
+        )
+        last_activity = [time.monotonic()]
+        out_chunks = []
+        err_lines = []
+
+        def _read_stdout():
+            for chunk in iter(lambda: proc.stdout.read1(65536), b""):
+                last_activity[0] = time.monotonic()
+                out_chunks.append(chunk)
+
+        def _read_stderr():
+            splitter = LineSplitter()
+            for chunk in iter(lambda: proc.stderr.read1(4096), b""):
+                last_activity[0] = time.monotonic()
+                for text, final in splitter.feed(chunk):
+                    _stderr_line(text, final)
+            for text, final in splitter.flush():
+                _stderr_line(text, final)
+
+        def _stderr_line(text, final):
+            event = parse_progress_line(text)
+            if event is not None:
+                try:
+                    on_progress(event)
+                except Exception:
+                    logger.exception("Progress callback failed")
+            # Keep messages only — progress redraws would bloat the log
+            if final and not is_progress_line(text):
+                err_lines.append(text)
+
+        readers = [
+            threading.Thread(target=_read_stdout, name="git-stdout", daemon=True),
+            threading.Thread(target=_read_stderr, name="git-stderr", daemon=True),
+        ]
+        for t in readers:
+            t.start()
+        try:
+            while True:
+                try:
+                    proc.wait(timeout=0.25)
+                    break
+                except subprocess.TimeoutExpired:
+                    idle = time.monotonic() - last_activity[0]
+                    if idle > idle_timeout:
+                        logger.warning("git idle for %.0fs, stopping", idle)
+                        kill_process_tree(proc, hard_kill)
+                        raise subprocess.TimeoutExpired(cmd, idle_timeout)
+        finally:
+            for t in readers:
+                t.join(timeout=2)
+            proc.stdout.close()
+            proc.stderr.close()
+        out = b"".join(out_chunks).decode("utf-8", "replace")
+        return (proc.returncode, out, "\n".join(err_lines) + ("\n" if err_lines else ""))
+
+    def _record_mux(self, repo, op, warm, elapsed):
+        """Log how much an SSH ControlMaster reuse saved for one operation.
+
+        A cold run (no live master) stores its duration; a warm run of
+        the same operation reports the difference as handshake time saved.
+        """
+        key = (repo, op)
+        if not warm:
+            _cold_durations[key] = elapsed
+            self.last_ssh_note = ""
+            logger.info("SSH %s: new connection, %.2fs", op, elapsed)
+            return
+        cold = _cold_durations.get(key)
+        self.ssh_reused += 1
+        if cold is None or cold <= elapsed:
+            self.last_ssh_note = "SSH: соединение переиспользовано."
+            logger.info("SSH %s: reused connection, %.2fs", op, elapsed)
+            return
+        saved = cold - elapsed
+        self.ssh_saved_sec += saved
+        self.last_ssh_note = (
+            "SSH: соединение переиспользовано, сэкономлено ~{s:.2f} с "
+            "(всего {n} раз, ~{t:.1f} с)."
+        ).format(s=saved, n=self.ssh_reused, t=self.ssh_saved_sec)
+        logger.info("SSH %s: reused connection, %.2fs (cold %.2fs, saved %.2fs)",
+                    op, elapsed, cold, saved)
+
     # ------------------------------------------------------------------
     # Public API — Phase 0
     # ------------------------------------------------------------------
+    def get_repo_path(self):
+        """Return the repository this service works on ('' when unset)."""
+        if self._repo_path is not None:
+            return self._repo_path
+        return self.config.get_repo_path()
+
     def has_repo(self):
         """Return True if the configured path contains a .git directory."""
-        repo = self.config.get_repo_path()
+        repo = self.get_repo_path()
         if not repo:
             return False
         return os.path.isdir(os.path.join(repo, ".git"))
@@ -216,11 +715,42 @@ class GitService:
         """Return True if the git executable is found on PATH."""
         return self._git_executable() is not None
 
+    def state_path(self, name, create_dir=False):
+        """Return the path of a plugin state file kept inside ``.git``.
+
+        Per-repository state (probe fingerprint, caches) lives in
+        ``.git/kicad_git_plugin/`` so it follows the clone and never
+        shows up in ``git status``.
+        """
+        repo = self.get_repo_path()
+        if not repo:
+            return ""
+        state_dir = os.path.join(repo, ".git", "kicad_git_plugin")
+        if create_dir and not os.path.isdir(state_dir):
+            try:
+                os.makedirs(state_dir, exist_ok=True)
+            except OSError as exc:
+                logger.warning("Cannot create %s: %s", state_dir, exc)
+        return os.path.join(state_dir, name)
+
     # ------------------------------------------------------------------
     # Public API — Phase 1
     # ------------------------------------------------------------------
     def get_branch(self):
         """Return the name of the current branch or '' (detached HEAD)."""
+        repo = self.get_repo_path()
+        if repo:
+            # Read HEAD directly — no process needed for the common case
+            try:
+                with open(os.path.join(repo, ".git", "HEAD"), "r", encoding="utf-8") as fh:
+                    head = fh.read().strip()
+                if head.startswith("ref: refs/heads/"):
+                    return head[len("ref: refs/heads/"):]
+                if not head.startswith("ref: "):
+                    return ""  # detached HEAD
+            except OSError:
+                pass
+
         rc, out, err = self._run_git("rev-parse", "--abbrev-ref", "HEAD")
         if rc == 0:
             branch = out.strip()
@@ -229,86 +759,283 @@ class GitService:
             return branch
         return ""
 
+    def rev_parse(self, rev):
+        """Return the object id ``rev`` resolves to, or ''.
+
+        Served by the pooled ``git cat-file --batch-check`` worker; falls
+        back to ``git rev-parse`` when the pool is unavailable.
+        """
+        repo = self.get_repo_path()
+        git = self._git_executable()
+        if not repo or not git or not self.has_repo():
+            return ""
+        try:
+            return self._pool.resolve(git, repo, rev, env=self._build_env())
+        except (PoolError, OSError) as exc:
+            logger.warning("Pool resolve failed, using rev-parse: %s", exc)
+        rc, out, err = self._run_git("rev-parse", "--verify", "-q", rev)
+        return out.strip() if rc == 0 else ""
+
+    def read_object(self, rev):
+        """Return (oid, type, bytes) for an object name such as
+        ``HEAD:Lib.kicad_sym``, or None when it does not exist.
+        """
+        repo = self.get_repo_path()
+        git = self._git_executable()
+        if not repo or not git or not self.has_repo():
+            return None
+        try:
+            return self._pool.read_object(git, repo, rev, env=self._build_env())
+        except (PoolError, OSError) as exc:
+            logger.warning("Pool read failed for %s: %s", rev, exc)
+            return None
+
+    def iter_objects(self, names):
+        """Yield ``(name, oid, type, bytes)`` for many object names.
+
+        One ``git cat-file --batch`` streams them all (see
+        :func:`git_pool.stream_objects`); missing objects come back with
+        None fields. Nothing is yielded without a repository.
+        """
+        repo = self.get_repo_path()
+        git = self._git_executable()
+        if not repo or not git or not self.has_repo():
+            return iter(())
+        return stream_objects(git, repo, names, env=self._build_env())
+
+    def close(self):
+        """Stop the pooled git workers of the configured repository."""
+        repo = self.get_repo_path()
+        if repo:
+            self._pool.close_repo(repo)
+
+    def get_status(self, paths=None):
+        """Return a :class:`GitStatus` for the working tree.
+
+        Branch, upstream, ahead/behind and all entries come from a single
+        ``git status --porcelain=v2 --branch -z`` call.
+
+        Parameters
+        ----------
+        paths : list of str, optional
+            Limit the entries to these repository-relative paths (used for
+            incremental refreshes); branch headers are always included.
+        """
+        if not self.has_repo():
+            return GitStatus()
+
+        if paths:
+            args = ("--literal-pathspecs",) + STATUS_ARGS + ("--",) + tuple(paths)
+        else:
+            args = STATUS_ARGS
+        rc, out, err = self._run_git(*args)
+        if rc != 0:
+            return GitStatus()
+        return parse_porcelain_v2(out)
+
     def status(self):
         """Return a dict describing the working-tree state.
 
-        Keys: branch, modified, untracked, staged, ahead, behind.
+        Keys: branch, modified, untracked, staged, unmerged, ahead, behind.
         """
-        result = {
-            "branch": "",
-            "modified": [],
-            "untracked": [],
-            "staged": [],
-            "ahead": 0,
-            "behind": 0,
-        }
+        return self.get_status().as_dict()
+
+    def fetch(self, on_progress=None):
+        """Run ``git fetch``. Returns (success, message).
 
+        ``on_progress`` receives :class:`progress.ProgressEvent` updates.
+        """
         if not self.has_repo():
-            return result
+            return self._no_repo()
+
+        rc, out, err = self._run_git(*FETCH_ARGS, on_progress=_progress_sink(on_progress))
+        return self._fetch_result(rc, out, err)
 
-        result["branch"] = self.get_branch()
+    def _no_repo(self):
+        repo = self.get_repo_path()
+        return (False, "Репозиторий не найден в {p}".format(p=repo))
 
-        # porcelain v1 status
-        rc, out, err = self._run_git("status", "--porcelain")
+    def _fetch_result(self, rc, out, err):
+        self.fetch_count += 1
         if rc == 0:
+            return (True, self._with_ssh_note("Fetch выполнен успешно."))
+        return (False, self._network_error(rc, out, err))
+
+    def _with_ssh_note(self, msg):
+        if self.last_ssh_note:
+            return msg + "\n" + self.last_ssh_note
+        return msg
+
+    def _network_error(self, rc, out, err):
+        combined = (out + "\n" + err).lower()
+        if "could not resolve" in combined or "name or service not known" in combined:
+            return "Нет подключения к серверу. Проверьте сетевое соединение."
+        return self._format_error(rc, err)
+
+    def _probe_remotes(self):
+        """Return the configured remotes — ``fetch --all`` updates each of them."""
+        rc, out, err = self._run_git("remote")
+        if rc != 0:
+            return []
+        return [r for r in out.split() if r]
+
+    def _local_probe_refs(self):
+        """Return {ref: sha} for the remote-tracking refs and tags."""
+        rc, out, err = self._run_git(
+            "for-each-ref", "--format=%(objectname) %(refname)", "refs/remotes", "refs/tags")
+        refs = {}
+        if rc != 0:
+            return refs
+        for line in out.splitlines():
+            sha, _, ref = line.partition(" ")
+            if ref:
+                refs[ref] = sha
+        return refs
+
+    def _read_probe_fingerprint(self):
+        path = self.state_path("probe_fingerprint")
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                return fh.read().strip()
+        except (OSError, TypeError):
+            return ""
+
+    def _write_probe_fingerprint(self, fingerprint):
+        path = self.state_path("probe_fingerprint", create_dir=True)
+        try:
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write(fingerprint + "\n")
+        except OSError as exc:
+            logger.debug("Cannot store probe fingerprint: %s", exc)
+
+    def probe_remote(self):
+        """Check with ``git ls-remote`` whether anything a fetch would get moved.
+
+        Every head and tag of every remote is compared with
+        ``refs/remotes/<remote>/*`` and ``refs/tags/*``, so 'unchanged'
+        really means that ``git fetch --all`` has nothing to download.
+
+        Returns
+        -------
+        tuple(str, str, str)
+            (verdict, fingerprint, message) — verdict is 'unchanged',
+            'changed', 'unknown' (probe not possible → fetch) or 'error'
+            (network failure; a fetch would fail too).
+        """
+        results = []
+        for remote in self._probe_remotes():
+            rc, out, err = self._run_git(*PROBE_ARGS, remote)
+            results.append((remote, rc, out, err))
+        return self._probe_result(results)
+
+    def _probe_result(self, results):
+        """Turn per-remote ``git ls-remote`` output into a verdict (see probe_remote).
+
+        ``results`` is a list of (remote, rc, stdout, stderr).
+        """
+        self.probe_count += 1
+        if not results:
+            return ("unknown", "", "")
+        remote_shas = {}
+        for remote, rc, out, err in results:
+            if rc != 0:
+                if rc == -2:
+                    return ("error", "", self._network_error(rc, out, err))
+                combined = (out + "\n" + err).lower()
+                if "could not resolve" in combined or "connection" in combined:
+                    return ("error", "", self._network_error(rc, out, err))
+                return ("unknown", "", "")
+            heads_prefix = "refs/remotes/{r}/".format(r=remote)
             for line in out.splitlines():
-                if len(line) < 3:
+                parts = line.split("\t")
+                if len(parts) != 2:
                     continue
-                x = line[0]  # index
-                y = line[1]  # worktree
-                path = line[3:]
-                if x == "?" and y == "?":
-                    result["untracked"].append(path)
-                elif x in ("M", "A", "D", "R", "C"):
-                    result["staged"].append(path)
-                if y in ("M", "D"):
-                    if path not in result["modified"]:
-                        result["modified"].append(path)
-
-        # ahead / behind
-        rc, out, err = self._run_git(
-            "rev-list", "--left-right", "--count", "HEAD...@{upstream}"
-        )
-        if rc == 0:
-            parts = out.strip().split()
-            if len(parts) == 2:
-                try:
-                    result["ahead"] = int(parts[0])
-                    result["behind"] = int(parts[1])
-                except ValueError:
-                    pass
+                sha, ref = parts[0].strip(), parts[1].strip()
+                if ref.endswith("^{}"):
+                    continue  # peeled tag, the tag object itself is listed too
+                if ref.startswith("refs/heads/"):
+                    remote_shas[heads_prefix + ref[len("refs/heads/"):]] = sha
+                elif ref.startswith("refs/tags/"):
+                    remote_shas[ref] = sha
+        fingerprint = hashlib.sha1(
+            "\n".join("{r} {s}".format(r=r, s=s) for r, s in sorted(remote_shas.items()))
+            .encode("utf-8")
+        ).hexdigest()
+
+        if fingerprint == self._read_probe_fingerprint():
+            return ("unchanged", fingerprint, "")
+        local = self._local_probe_refs()
+        for ref, sha in remote_shas.items():
+            if local.get(ref) != sha:
+                return ("changed", fingerprint, "")
+        return ("unchanged", fingerprint, "")
 
+    def pull(self, on_progress=None):
+        """Run ``git pull --ff-only``. Returns (success, message)."""
+        refused = self._pull_precheck()
+        if refused is not None:
+            return refused
+
+        lfs_env = self._lfs_pull_env()
+        head = self.rev_parse("HEAD") if lfs_env else ""
+        rc, out, err = self._run_git(*PULL_ARGS, env=lfs_env,
+                                     on_progress=_progress_sink(on_progress))
+        if rc != 0 and self.branches_diverged() and self.merge_driver_installed():
+            rc, out, err = self._run_git(*PULL_MERGE_ARGS, env=lfs_env,
+                                         on_progress=_progress_sink(on_progress))
+            if rc != 0:
+                conflicts = self._run_git(*CONFLICTS_ARGS)[1]
+                self._run_git("merge", "--abort")
+                return self._merge_failed(conflicts, err)
+            out = out + "\n" + MERGED_MESSAGE
+        result = self._pull_result(rc, out, err)
+        # "Already up to date" — nothing new to download
+        if result[0] and lfs_env and self.rev_parse("HEAD") != head:
+            result = self._with_lfs(result, self.lfs_pull(on_progress=on_progress))
         return result
 
-    def fetch(self):
-        """Run ``git fetch``. Returns (success, message)."""
-        if not self.has_repo():
-            repo = self.config.get_repo_path()
-            return (False, "Репозиторий не найден в {p}".format(p=repo))
+    def branches_diverged(self):
+        """Return True when HEAD and its upstream both have own commits."""
+        rc, out, _err = self._run_git(*DIVERGENCE_ARGS)
+        return diverged(rc, out)
 
-        rc, out, err = self._run_git("fetch", "--all")
-        if rc == 0:
-            return (True, "Fetch выполнен успешно.")
-        combined = (out + "\n" + err).lower()
-        if "could not resolve" in combined or "name or service not known" in combined:
-            return (False, "Нет подключения к серверу. Проверьте сетевое соединение.")
-        return (False, self._format_error(rc, err))
+    @staticmethod
+    def _merge_failed(conflicts, err):
+        """Message for a merge fallback that was aborted.
 
-    def pull(self):
-        """Run ``git pull --ff-only``. Returns (success, message)."""
+        Same-symbol conflicts are only claimed when the merge driver
+        handled every conflicted file and reported a symbol conflict in
+        it; ordinary files and libraries it could not parse get the
+        generic message.
+        """
+        paths = [p for p in conflicts.split("\0") if p]
+        if not paths:
+            return (False, GitService._format_error(1, err))
+        if all(merge_driver_handles(p) and
+               "kicad merge: {p}: conflicting changes".format(p=p) in err for p in paths):
+            reason = "изменены одни и те же символы"
+        else:
+            reason = "конфликтующие изменения в файлах"
+        return (False,
+                "Ветки разошлись, автоматическое слияние не удалось "
+                "({r}): {p}. Pull отменён.".format(r=reason, p=", ".join(paths)))
+
+    def _pull_precheck(self, st=None):
+        """Return (False, message) when pull must not run, else None."""
         if not self.has_repo():
-            repo = self.config.get_repo_path()
-            return (False, "Репозиторий не найден в {p}".format(p=repo))
+            return self._no_repo()
 
         # Check for uncommitted changes before pull
-        st = self.status()
-        if st["modified"] or st["staged"]:
+        if st is None:
+            st = self.get_status()
+        if st.counts.modified or st.counts.staged:
             return (False, "Есть незакоммиченные изменения. Сделайте Commit перед Pull.")
+        return None
 
-        rc, out, err = self._run_git("pull", "--ff-only")
+    def _pull_result(self, rc, out, err):
         if rc == 0:
             msg = out.strip() if out.strip() else "Pull выполнен успешно."
-            return (True, msg)
+            return (True, self._with_ssh_note(msg))
 
         combined = (out + "\n" + err).lower()
         if "conflict" in combined or "merge" in combined:
@@ -321,17 +1048,9 @@ class GitService:
 
     def commit(self, message):
         """Stage all changes and commit. Returns (success, message)."""
-        if not self.has_repo():
-            repo = self.config.get_repo_path()
-            return (False, "Репозиторий не найден в {p}".format(p=repo))
-
-        if not message or not message.strip():
-            return (False, "Сообщение коммита не может быть пустым.")
-
-        # Check if there are any changes at all
-        st = self.status()
-        if not st["modified"] and not st["untracked"] and not st["staged"]:
-            return (True, "Нет изменений для коммита.")
+        refused = self._commit_precheck(message)
+        if refused is not None:
+            return refused
 
         # git add .
         rc, out, err = self._run_git("add", ".")
@@ -340,6 +1059,24 @@ class GitService:
 
         # git commit
         rc, out, err = self._run_git("commit", "-m", message)
+        return self._commit_result(rc, out, err)
+
+    def _commit_precheck(self, message, st=None):
+        """Return (success, message) when there is nothing to run, else None."""
+        if not self.has_repo():
+            return self._no_repo()
+
+        if not message or not message.strip():
+            return (False, "Сообщение коммита не может быть пустым.")
+
+        # Check if there are any changes at all
+        if st is None:
+            st = self.get_status()
+        if st.is_clean():
+            return (True, "Нет изменений для коммита.")
+        return None
+
+    def _commit_result(self, rc, out, err):
         if rc == 0:
             return (True, out.strip() if out.strip() else "Коммит создан.")
 
@@ -348,16 +1085,18 @@ class GitService:
             return (True, "Нет изменений для коммита.")
         return (False, self._format_error(rc, err))
 
-    def push(self):
+    def push(self, on_progress=None):
         """Run ``git push``. Returns (success, message)."""
         if not self.has_repo():
-            repo = self.config.get_repo_path()
-            return (False, "Репозиторий не найден в {p}".format(p=repo))
+            return self._no_repo()
+
+        rc, out, err = self._run_git(*PUSH_ARGS, on_progress=_progress_sink(on_progress))
+        return self._push_result(rc, out, err)
 
-        rc, out, err = self._run_git("push")
+    def _push_result(self, rc, out, err):
         if rc == 0:
             msg = out.strip() or err.strip() or "Push выполнен успешно."
-            return (True, msg)
+            return (True, self._with_ssh_note(msg))
 
         combined = (out + "\n" + err).lower()
         if "rejected" in combined or "non-fast-forward" in combined:
@@ -368,31 +1107,569 @@ class GitService:
             return (False, "Нет подключения к серверу. Проверьте сетевое соединение.")
         return (False, self._format_error(rc, err))
 
-    def get_sync_status(self):
-        """Fetch and return ahead/behind counts.
+    def get_sync_status(self, force=False, on_progress=None):
+        """Fetch (when the remote moved) and return ahead/behind counts.
+
+        With ``[fetch] probe`` enabled a cheap ``git ls-remote`` of every
+        remote runs first; the full fetch only happens when a head or tag
+        differs from the local remote-tracking refs and tags.
 
         Returns
         -------
-        dict with keys: ahead, behind, success, message
+        dict with keys: ahead, behind, success, message, status, fetched
+            ``status`` is the :class:`GitStatus` read after the fetch
+            (None when the fetch failed); ``fetched`` tells whether a
+            full fetch was run.
         """
-        ok, msg = self.fetch()
+        fingerprint = ""
+        if self.config.get_fetch_probe_enabled() and not force and self.has_repo():
+            verdict, fingerprint, msg = self.probe_remote()
+            if verdict == "error":
+                return self._sync_failed(msg, fetched=False)
+            if verdict == "unchanged":
+                return self._sync_unchanged(self.get_status())
+
+        ok, msg = self.fetch(on_progress=on_progress)
         if not ok:
-            return {"ahead": 0, "behind": 0, "success": False, "message": msg}
+            return self._sync_failed(msg, fetched=True)
+        return self._sync_fetched(msg, fingerprint, self.get_status())
 
-        rc, out, err = self._run_git(
-            "rev-list", "--left-right", "--count", "HEAD...@{upstream}"
-        )
-        ahead = 0
-        behind = 0
+    @staticmethod
+    def _sync_failed(msg, fetched):
+        return {"ahead": 0, "behind": 0, "success": False, "message": msg,
+                "status": None, "fetched": fetched}
+
+    def _sync_unchanged(self, st):
+        msg = self._with_ssh_note("Изменений на сервере нет (probe {p} / fetch {f}).".format(
+            p=self.probe_count, f=self.fetch_count))
+        return {"ahead": st.ahead, "behind": st.behind, "success": True,
+                "message": msg, "status": st, "fetched": False}
+
+    def _sync_fetched(self, msg, fingerprint, st):
+        if fingerprint:
+            self._write_probe_fingerprint(fingerprint)
+        if self.probe_count:
+            msg = "{m} (probe {p} / fetch {f})".format(
+                m=msg, p=self.probe_count, f=self.fetch_count)
+        return {"ahead": st.ahead, "behind": st.behind, "success": True, "message": msg,
+                "status": st, "fetched": True}
+
+    # ------------------------------------------------------------------
+    # Public API — partial clone / sparse checkout
+    # ------------------------------------------------------------------
+    def clone(self, url, filter_spec="", sparse=False, on_progress=None):
+        """Clone ``url`` into this service's repository path.
+
+        Parameters
+        ----------
+        filter_spec : str
+            '' (full clone), 'blob:none' or 'blob:limit=<size>'. Blobs
+            left out are downloaded by git on demand (promisor remote).
+        sparse : bool
+            Clone without checkout; call :meth:`set_sparse_checkout`
+            with the chosen library directories afterwards.
+
+        Returns
+        -------
+        tuple(bool, str)
+        """
+        dest = self.get_repo_path()
+        if not dest:
+            return (False, "Путь к репозиторию не задан в настройках.")
+        if os.path.isdir(dest) and os.listdir(dest):
+            return (False, "Директория не пуста: {p}".format(p=dest))
+        parent = os.path.dirname(dest.rstrip("/\\"))
+        if not os.path.isdir(parent):
+            return (False, "Директория не существует: {p}".format(p=parent))
+        try:
+            filter_spec = normalize_filter(filter_spec)
+        except ValueError as exc:
+            return (False, str(exc))
+
+        args = ["clone", "--progress"]
+        if filter_spec:
+            args.append("--filter=" + filter_spec)
+        if sparse:
+            args.append("--no-checkout")
+        args += ["--", url, dest]
+        rc, out, err = self._run_git(*args, cwd=parent, on_progress=_progress_sink(on_progress))
+        self.invalidate_remote_cache()
+        if rc != 0:
+            return (False, self._network_error(rc, out, err))
+        if filter_spec:
+            return (True, "Клонировано ({f}): {p}".format(f=filter_spec, p=dest))
+        return (True, "Клонировано: {p}".format(p=dest))
+
+    def library_dirs(self, rev="HEAD"):
+        """Return the library directories of ``rev`` for sparse checkout.
+
+        ``*.pretty`` and ``*.3dshapes`` directories plus every directory
+        holding ``*.kicad_sym`` files. Read from the tree with
+        ``ls-tree --name-only``, so no blob of a partial clone is fetched.
+        """
+        rc, out, err = self._run_git("ls-tree", "-r", "--name-only", "-z", rev)
+        if rc != 0:
+            return []
+        dirs = set()
+        for path in out.split("\0"):
+            if not path:
+                continue
+            lib = library_of(path)
+            if lib.endswith(_LIBRARY_DIR_SUFFIXES):
+                dirs.add(lib)
+            elif lib and "/" in lib:
+                dirs.add(lib.rsplit("/", 1)[0])  # symbol folder
+        return sorted(dirs)
+
+    def partial_clone_filter(self):
+        """Return the promisor filter of the origin remote, or ''."""
+        return self._local_config().get("remote.origin.partialclonefilter", "")
+
+    def enable_partial_clone(self, filter_spec="blob:none"):
+        """Turn an existing clone into a partial one for future fetches.
+
+        Blobs already present stay; new ones matching the filter are only
+        downloaded when a checkout needs them.
+        """
+        try:
+            filter_spec = normalize_filter(filter_spec)
+        except ValueError as exc:
+            return (False, str(exc))
+        if not filter_spec:
+            return (False, "Фильтр не задан.")
+        for key, value in (("remote.origin.promisor", "true"),
+                           ("remote.origin.partialclonefilter", filter_spec)):
+            rc, out, err = self._run_git("config", "--local", key, value)
+            if rc != 0:
+                return (False, self._format_error(rc, err))
+        return (True, "Частичный клон включён ({f}).".format(f=filter_spec))
+
+    def sparse_checkout_dirs(self):
+        """Return the materialised directories, or None for a full checkout."""
+        # Not _local_config(): sparse-checkout writes config.worktree
+        rc, out, err = self._run_git("config", "--bool", "--get", "core.sparseCheckout")
+        if out.strip() != "true":
+            return None
+        rc, out, err = self._run_git("sparse-checkout", "list")
+        if rc != 0:
+            return None
+        return [line.strip() for line in out.splitlines() if line.strip()]
+
+    def set_sparse_checkout(self, dirs, on_progress=None):
+        """Materialise only ``dirs`` (cone mode); empty/None → full checkout.
+
+        Missing blobs of a partial clone are fetched by git during this
+        call, so it may take a while — it uses the transfer timeout.
+        """
+        if not self.has_repo():
+            return self._no_repo()
+        if dirs:
+            args = ["sparse-checkout", "set", "--cone", "--"] + list(dirs)
+        else:
+            args = ["sparse-checkout", "disable"]
+        rc, out, err = self._run_git(*args, network=True, on_progress=_progress_sink(on_progress))
+        if rc != 0:
+            return (False, self._format_error(rc, err))
+        if not self.rev_parse("HEAD") or self._index_empty():
+            # Fresh --no-checkout clone: populate the working tree now
+            branch = self.get_branch()
+            rc, out, err = self._run_git("checkout", "--progress", branch or "HEAD",
+                                         network=True, on_progress=_progress_sink(on_progress))
+            if rc != 0:
+                return (False, self._format_error(rc, err))
+        if dirs:
+            return (True, "Выборочная загрузка, библиотек: {n}.".format(n=len(dirs)))
+        return (True, "Загружены все библиотеки.")
+
+    def _index_empty(self):
+        return not os.path.exists(os.path.join(self.get_repo_path(), ".git", "index"))
+
+    # ------------------------------------------------------------------
+    # Public API — Git LFS (3D models)
+    # ------------------------------------------------------------------
+    def lfs_available(self):
+        """Return True when the git-lfs extension is installed."""
+        if self._lfs_version is None:
+            rc, out, err = self._run_git("lfs", "version")
+            self._lfs_version = out.strip() if rc == 0 else ""
+        return bool(self._lfs_version)
+
+    def lfs_patterns(self):
+        """Return the ``filter=lfs`` patterns of the root ``.gitattributes``."""
+        repo = self.get_repo_path()
+        if not repo:
+            return []
+        try:
+            with open(os.path.join(repo, ".gitattributes"), "r", encoding="utf-8") as fh:
+                text = fh.read()
+        except OSError:
+            return []
+        return lfs_patterns_from_attributes(text)
+
+    def uses_lfs(self):
+        """Return True when LFS transfers should be managed by the plugin."""
+        return (self.config.get_lfs_mode() != "off" and bool(self.lfs_patterns())
+                and self.lfs_available())
+
+    def lfs_tracked_paths(self):
+        """Return the LFS files of HEAD (``git lfs ls-files``)."""
+        rc, out, err = self._run_git("lfs", "ls-files", "--name-only")
+        if rc != 0:
+            return []
+        return [line for line in out.splitlines() if line]
+
+    def lfs_filters(self):
+        """Return (include, exclude) path lists for LFS transfers.
+
+        Taken from ``[lfs] include/exclude``; with no explicit include a
+        sparse checkout limits downloads to the selected libraries.
+        """
+        include = self.config.get_lfs_include()
+        if not include:
+            include = self.sparse_checkout_dirs() or []
+        return (include, self.config.get_lfs_exclude())
+
+    def _lfs_args(self, command, include=None, exclude=None):
+        if include is None and exclude is None:
+            include, exclude = self.lfs_filters()
+        args = ["-c", "lfs.concurrenttransfers={n}".format(n=self.config.get_lfs_concurrency()),
+                "lfs", command]
+        if include:
+            args += ["--include", ",".join(include)]
+        if exclude:
+            args += ["--exclude", ",".join(exclude)]
+        return args
+
+    def _lfs_pull_env(self):
+        """Environment for ``git pull`` that defers LFS downloads.
+
+        The smudge filter would download LFS objects one by one during
+        checkout; they are fetched afterwards in parallel by :meth:`lfs_pull`.
+        """
+        if not self.uses_lfs():
+            return {}
+        return {"GIT_LFS_SKIP_SMUDGE": "1"}
+
+    def lfs_fetch(self, include=None, exclude=None, on_progress=None):
+        """Download LFS objects of HEAD without touching the working tree.
+
+        Returns
+        -------
+        tuple(bool, str)
+        """
+        if not self.has_repo():
+            return self._no_repo()
+        if not self.lfs_available():
+            return (False, LFS_MISSING_MESSAGE)
+        rc, out, err = self._run_git(*self._lfs_args("fetch", include, exclude), network=True,
+                                     env=LFS_PROGRESS_ENV, on_progress=_progress_sink(on_progress))
+        return self._lfs_result(rc, out, err)
+
+    def lfs_pull(self, include=None, exclude=None, on_progress=None):
+        """Download LFS objects and replace pointer files in the working tree."""
+        if not self.has_repo():
+            return self._no_repo()
+        if not self.lfs_available():
+            return (False, LFS_MISSING_MESSAGE)
+        rc, out, err = self._run_git(*self._lfs_args("pull", include, exclude), network=True,
+                                     env=LFS_PROGRESS_ENV, on_progress=_progress_sink(on_progress))
+        return self._lfs_result(rc, out, err)
+
+    def _lfs_result(self, rc, out, err):
         if rc == 0:
-            parts = out.strip().split()
-            if len(parts) == 2:
-                try:
-                    ahead = int(parts[0])
-                    behind = int(parts[1])
-                except ValueError:
-                    pass
-        return {"ahead": ahead, "behind": behind, "success": True, "message": msg}
+            return (True, "LFS: файлы загружены.")
+        return (False, "LFS: " + self._format_error(rc, err))
+
+    @staticmethod
+    def _with_lfs(result, lfs):
+        """Merge a pull result with the follow-up ``git lfs pull`` result."""
+        ok, msg = result
+        lfs_ok, lfs_msg = lfs
+        return (ok and lfs_ok, msg + "\n" + lfs_msg)
+
+    # ------------------------------------------------------------------
+    # Public API — library merge driver
+    # ------------------------------------------------------------------
+    def _attributes_path(self):
+        repo = self.get_repo_path()
+        return os.path.join(repo, ".gitattributes") if repo else ""
+
+    def _read_attributes(self):
+        try:
+            with open(self._attributes_path(), "r", encoding="utf-8") as fh:
+                return fh.read().splitlines()
+        except OSError:
+            return []
+
+    def merge_driver_installed(self):
+        """Return True when the driver is configured and assigned in .gitattributes."""
+        if not self._local_config().get("merge.{d}.driver".format(d=MERGE_DRIVER)):
+            return False
+        attr = "merge=" + MERGE_DRIVER
+        return any(attr in line.split()[1:] for line in self._read_attributes() if line.strip())
+
+    def install_merge_driver(self):
+        """Register ``kicad_merge.py`` for symbol libraries and lib tables.
+
+        The driver command goes to the local git config (it contains this
+        machine's paths); the ``merge=kicad`` attributes go to the
+        committed ``.gitattributes`` so every clone uses them.
+
+        Returns
+        -------
+        tuple(bool, str)
+        """
+        if not self.has_repo():
+            return self._no_repo()
+        for key, value in (("merge.{d}.name".format(d=MERGE_DRIVER), "KiCad library merge"),
+                           ("merge.{d}.driver".format(d=MERGE_DRIVER), merge_driver_command())):
+            rc, out, err = self._run_git("config", "--local", key, value)
+            if rc != 0:
+                return (False, self._format_error(rc, err))
+
+        lines = self._read_attributes()
+        changed = False
+        for pattern in MERGE_PATTERNS:
+            for i, line in enumerate(lines):
+                parts = line.split()
+                if parts and parts[0] == pattern:
+                    if not any(p.startswith("merge=") for p in parts[1:]):
+                        lines[i] = line.rstrip() + " merge=" + MERGE_DRIVER
+                        changed = True
+                    break
+            else:
+                lines.append("{p} merge={d}".format(p=pattern, d=MERGE_DRIVER))
+                changed = True
+        if changed:
+            try:
+                with open(self._attributes_path(), "w", encoding="utf-8") as fh:
+                    fh.write("\n".join(lines) + "\n")
+            except OSError as exc:
+                return (False, "Не удалось записать .gitattributes: {e}".format(e=exc))
+            return (True, "Слияние по символам включено. Закоммитьте .gitattributes.")
+        return (True, "Слияние по символам включено.")
+
+    def uninstall_merge_driver(self):
+        """Remove the driver from the local config (.gitattributes is shared)."""
+        rc, out, err = self._run_git("config", "--local", "--remove-section",
+                                     "merge.{d}".format(d=MERGE_DRIVER))
+        if rc != 0 and "no such section" not in err.lower():
+            return (False, self._format_error(rc, err))
+        return (True, "Слияние по символам выключено.")
+
+    def refresh_merge_driver(self):
+        """Rewrite the driver command if the plugin or Python moved."""
+        key = "merge.{d}.driver".format(d=MERGE_DRIVER)
+        current = self._local_config().get(key)
+        if current and current != merge_driver_command():
+            self._run_git("config", "--local", key, merge_driver_command())
+            return True
+        return False
+
+    # ------------------------------------------------------------------
+    # Public API — performance mode (large repositories)
+    # ------------------------------------------------------------------
+    def count_index_entries(self):
+        """Return the number of entries in ``.git/index`` (0 if unknown).
+
+        Read from the index header, so it costs one small file read.
+        """
+        repo = self.get_repo_path()
+        if not repo:
+            return 0
+        try:
+            with open(os.path.join(repo, ".git", "index"), "rb") as fh:
+                header = fh.read(12)
+        except OSError:
+            return 0
+        if len(header) < 12 or header[:4] != b"DIRC":
+            return 0
+        return struct.unpack(">I", header[8:12])[0]
+
+    def index_version(self):
+        """Return the on-disk index format version (2, 3, 4) or 0."""
+        repo = self.get_repo_path()
+        try:
+            with open(os.path.join(repo, ".git", "index"), "rb") as fh:
+                header = fh.read(8)
+        except (OSError, TypeError):
+            return 0
+        if len(header) < 8 or header[:4] != b"DIRC":
+            return 0
+        return struct.unpack(">I", header[4:8])[0]
+
+    def is_large_repo(self):
+        """Return True when the index is above the configured threshold."""
+        return self.count_index_entries() >= self.config.get_large_repo_threshold()
+
+    def _local_config(self):
+        """Return the repository-local git config as a dict (one process)."""
+        rc, out, err = self._run_git("config", "--local", "-z", "--list")
+        result = {}
+        if rc != 0:
+            return result
+        for item in out.split("\0"):
+            if not item:
+                continue
+            key, _, value = item.partition("\n")
+            result[key.lower()] = value
+        return result
+
+    def fsmonitor_supported(self):
+        """Return True if git's built-in fsmonitor daemon works on this platform."""
+        rc, out, err = self._run_git("fsmonitor--daemon", "status")
+        combined = (out + "\n" + err).lower()
+        if "not supported" in combined or "not a git command" in combined:
+            return False
+        # rc != 0 with "not running" is fine — the daemon is just stopped
+        return rc == 0 or "not running" in combined or "not watching" in combined
+
+    def performance_mode_active(self):
+        """Return True when all performance settings are in effect."""
+        cfg = self._local_config()
+        for key, value in _PERFORMANCE_KEYS:
+            if cfg.get(key.lower()) != value:
+                return False
+        return self.index_version() == 4
+
+    def _time_status(self):
+        start = time.monotonic()
+        self.get_status()
+        return time.monotonic() - start
+
+    def enable_performance_mode(self):
+        """Turn on fsmonitor, untracked cache, manyFiles and index v4.
+
+        Measures ``git status`` before and after and verifies every
+        setting is active.
+
+        Returns
+        -------
+        tuple(bool, list of str)
+            (success, log lines)
+        """
+        if not self.has_repo():
+            repo = self.get_repo_path()
+            return (False, ["Репозиторий не найден в {p}".format(p=repo)])
+
+        lines = []
+        entries = self.count_index_entries()
+        before = self._time_status()
+        lines.append("Файлов в индексе: {n}; git status до: {t:.0f} мс".format(
+            n=entries, t=before * 1000))
+
+        keys = list(_PERFORMANCE_KEYS)
+        use_fsmonitor = self.fsmonitor_supported()
+        if use_fsmonitor:
+            keys.append(_FSMONITOR_KEY)
+        else:
+            lines.append("core.fsmonitor: не поддерживается этой версией git/платформой, пропущено.")
+
+        # Remember the previous values so disable only reverts our changes;
+        # a repeated enable keeps the values from before the first one.
+        changes = self._read_performance_changes()
+        cfg = self._local_config()
+        changes.setdefault("index_version", self.index_version())
+        for key, value in keys:
+            if cfg.get(key.lower()) == value:
+                continue
+            changes["config"].setdefault(key, cfg.get(key.lower()))
+            self._write_performance_changes(changes)
+            rc, out, err = self._run_git("config", "--local", key, value)
+            if rc != 0:
+                return (False, lines + ["git config {k}: {e}".format(k=key, e=err.strip())])
+        self._write_performance_changes(changes)
+
+        for args in (("update-index", "--index-version", "4"),
+                     ("update-index", "--untracked-cache")):
+            rc, out, err = self._run_git(*args)
+            if rc != 0:
+                return (False, lines + ["git {a}: {e}".format(a=" ".join(args), e=err.strip())])
+
+        if use_fsmonitor:
+            rc, out, err = self._run_git("fsmonitor--daemon", "start")
+            if rc != 0 and "already running" not in (out + err).lower():
+                lines.append("fsmonitor--daemon: " + (err.strip() or "не запущен"))
+
+        # First status fills the untracked cache / fsmonitor token
+        self._time_status()
+        after = self._time_status()
+
+        cfg = self._local_config()
+        missing = [k for k, v in keys if cfg.get(k.lower()) != v]
+        if self.index_version() != 4:
+            missing.append("index v4")
+        if missing:
+            lines.append("Не применено: " + ", ".join(missing))
+            return (False, lines)
+
+        lines.append("git status после: {a:.0f} мс (было {b:.0f} мс)".format(
+            a=after * 1000, b=before * 1000))
+        logger.info("Performance mode enabled: status %.3fs -> %.3fs", before, after)
+        return (True, lines)
+
+    def _read_performance_changes(self):
+        """Return what :meth:`enable_performance_mode` changed.
+
+        ``{"config": {key: previous value or None}, "index_version": n}``;
+        keys the user had already set to the target value are absent.
+        """
+        path = self.state_path(_PERFORMANCE_STATE_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            changes = {"config": dict(data.get("config") or {})}
+            if "index_version" in data:
+                changes["index_version"] = int(data["index_version"])
+            return changes
+        except (OSError, ValueError, TypeError, AttributeError):
+            return {"config": {}}
+
+    def _write_performance_changes(self, changes):
+        path = self.state_path(_PERFORMANCE_STATE_FILE, create_dir=True)
+        try:
+            with open(path, "w", encoding="utf-8") as fh:
+                json.dump(changes, fh)
+        except (OSError, TypeError) as exc:
+            logger.debug("Cannot store performance mode state: %s", exc)
+
+    def disable_performance_mode(self):
+        """Revert the settings made by :meth:`enable_performance_mode`.
+
+        Only keys recorded as changed by the plugin are restored to their
+        previous value (or unset); settings the user made are kept.
+
+        Returns
+        -------
+        tuple(bool, str)
+        """
+        if not self.has_repo():
+            repo = self.get_repo_path()
+            return (False, "Репозиторий не найден в {p}".format(p=repo))
+        changes = self._read_performance_changes()
+        previous = changes["config"]
+        if _FSMONITOR_KEY[0] in previous:
+            self._run_git("fsmonitor--daemon", "stop")
+        for key, value in previous.items():
+            if value is None:
+                rc, out, err = self._run_git("config", "--local", "--unset", key)
+                rc = 0 if rc == 5 else rc  # 5: key already gone
+            else:
+                rc, out, err = self._run_git("config", "--local", key, value)
+            if rc != 0:
+                return (False, self._format_error(rc, err))
+        if "core.untrackedCache" in previous:
+            self._run_git("update-index", "--no-untracked-cache")
+        version = changes.get("index_version")
+        if version in (2, 3) and self.index_version() == 4:
+            rc, out, err = self._run_git("update-index", "--index-version", str(version))
+            if rc != 0:
+                return (False, self._format_error(rc, err))
+        try:
+            os.remove(self.state_path(_PERFORMANCE_STATE_FILE))
+        except (OSError, TypeError):
+            pass
+        return (True, "Режим производительности выключен.")
 
     # ------------------------------------------------------------------
     # Helpers
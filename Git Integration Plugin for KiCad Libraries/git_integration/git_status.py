@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+Status engine — parses ``git status --porcelain=v2 --branch -z`` output
+into a typed, indexed result, so branch, upstream, ahead/behind and all
+entries come from a single git process.
+"""
+
+import logging
+
+logger = logging.getLogger("kicad_git_plugin.status")
+
+# Arguments for the single status call
+STATUS_ARGS = ("status", "--porcelain=v2", "--branch", "-z")
+
+_STAGED_CODES = ("M", "A", "D", "R", "C")
+_MODIFIED_CODES = ("M", "D")
+
+
+class StatusEntry:
+    """One changed path from the porcelain v2 output.
+
+    Attributes
+    ----------
+    path : str
+        Path relative to the repository root (new path for renames).
+    orig_path : str
+        Source path of a rename/copy, otherwise ''.
+    index : str
+        Index (staged) status letter, '.' when unchanged.
+    worktree : str
+        Worktree status letter, '.' when unchanged.
+    kind : str
+        'changed', 'renamed', 'unmerged', 'untracked' or 'ignored'.
+    """
+
+    __slots__ = ("path", "orig_path", "index", "worktree", "kind")
+
+    def __init__(self, path, index=".", worktree=".", kind="changed", orig_path=""):
+        self.path = path
+        self.orig_path = orig_path
+        self.index = index
+        self.worktree = worktree
+        self.kind = kind
+
+    @property
+    def is_untracked(self):
+        return self.kind == "untracked"
+
+    @property
+    def is_staged(self):
+        return self.index in _STAGED_CODES
+
+    @property
+    def is_modified(self):
+        return self.worktree in _MODIFIED_CODES
+
+    @property
+    def is_unmerged(self):
+        return self.kind == "unmerged"
+
+    def __repr__(self):
+        return "StatusEntry({k} {x}{y} {p!r})".format(
+            k=self.kind, x=self.index, y=self.worktree, p=self.path,
+        )
+
+
+# Path components that make a library unit for per-library rollups
+_LIBRARY_DIR_SUFFIXES = (".pretty", ".3dshapes")
+_LIBRARY_FILE_SUFFIXES = (".kicad_sym",)
+
+
+def library_of(path):
+    """Return the library a path belongs to, or ''.
+
+    ``Foo.pretty/R.kicad_mod`` → ``Foo.pretty``,
+    ``sym/Lib_MCU.kicad_sym`` → ``sym/Lib_MCU.kicad_sym``.
+    """
+    parts = path.rstrip("/").split("/")
+    for i, part in enumerate(parts):
+        if part.endswith(_LIBRARY_DIR_SUFFIXES):
+            return "/".join(parts[:i + 1])
+        if i == len(parts) - 1 and part.endswith(_LIBRARY_FILE_SUFFIXES):
+            return "/".join(parts)
+    return ""
+
+
+class StatusCounts:
+    """Number of staged / modified / untracked / unmerged paths."""
+
+    __slots__ = ("staged", "modified", "untracked", "unmerged")
+
+    def __init__(self):
+        self.staged = 0
+        self.modified = 0
+        self.untracked = 0
+        self.unmerged = 0
+
+    @property
+    def total(self):
+        """Number of changes shown on the Commit button."""
+        return self.staged + self.modified + self.untracked
+
+    def add(self, entry, sign=1):
+        if entry.is_staged:
+            self.staged += sign
+        if entry.is_modified:
+            self.modified += sign
+        if entry.is_untracked:
+            self.untracked += sign
+        if entry.is_unmerged:
+            self.unmerged += sign
+
+    def __repr__(self):
+        return "StatusCounts(staged={s}, modified={m}, untracked={u}, unmerged={c})".format(
+            s=self.staged, m=self.modified, u=self.untracked, c=self.unmerged,
+        )
+
+
+class _TrieNode:
+    __slots__ = ("children", "counts")
+
+    def __init__(self):
+        self.children = {}
+        self.counts = StatusCounts()
+
+
+class PathTrie:
+    """Directory trie whose nodes hold aggregated :class:`StatusCounts`."""
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def add(self, entry, sign=1):
+        node = self.root
+        node.counts.add(entry, sign)
+        for part in entry.path.rstrip("/").split("/")[:-1]:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _TrieNode()
+            child.counts.add(entry, sign)
+            node = child
+
+    def counts_for(self, directory):
+        """Return aggregated counts below ``directory`` ('' for the root)."""
+        node = self.root
+        for part in directory.strip("/").split("/") if directory.strip("/") else ():
+            node = node.children.get(part)
+            if node is None:
+                return StatusCounts()
+        return node.counts
+
+
+class GitStatus:
+    """Typed result of one status call.
+
+    Entries are indexed on insertion: category indexes (in git's output
+    order) give O(1) membership, :attr:`counts` and :attr:`libraries` give
+    O(1) totals and per-library rollups, and :attr:`trie` aggregates
+    counts per directory.
+
+    Attributes
+    ----------
+    branch : str
+        Current branch, '' for detached HEAD or no repository.
+    oid : str
+        Commit id of HEAD, '' for an unborn branch.
+    upstream : str
+        Upstream ref (e.g. ``origin/main``), '' when not configured.
+    ahead, behind : int
+        Commits ahead of / behind the upstream.
+    entries : dict
+        path → :class:`StatusEntry`, in git's output order.
+    counts : StatusCounts
+    libraries : dict
+        library (see :func:`library_of`) → :class:`StatusCounts`.
+    """
+
+    def __init__(self):
+        self.branch = ""
+        self.oid = ""
+        self.upstream = ""
+        self.ahead = 0
+        self.behind = 0
+        self.entries = {}
+        self.counts = StatusCounts()
+        self.libraries = {}
+        self.trie = PathTrie()
+        # Insertion-ordered (dict keys): O(1) membership, git's output order
+        self._staged = {}
+        self._modified = {}
+        self._untracked = {}
+        self._unmerged = {}
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+    def add_entry(self, entry):
+        """Insert (or replace) the entry for ``entry.path``."""
+        if entry.path in self.entries:
+            self.remove_path(entry.path)
+        self.entries[entry.path] = entry
+        if entry.is_staged:
+            self._staged[entry.path] = None
+        if entry.is_modified:
+            self._modified[entry.path] = None
+        if entry.is_untracked:
+            self._untracked[entry.path] = None
+        if entry.is_unmerged:
+            self._unmerged[entry.path] = None
+        self.counts.add(entry)
+        self.trie.add(entry)
+        lib = library_of(entry.path)
+        if lib:
+            rollup = self.libraries.get(lib)
+            if rollup is None:
+                rollup = self.libraries[lib] = StatusCounts()
+            rollup.add(entry)
+
+    def remove_path(self, path):
+        """Drop the entry for ``path`` if present."""
+        entry = self.entries.pop(path, None)
+        if entry is None:
+            return
+        for bucket in (self._staged, self._modified, self._untracked, self._unmerged):
+            bucket.pop(path, None)
+        self.counts.add(entry, -1)
+        self.trie.add(entry, -1)
+        lib = library_of(path)
+        rollup = self.libraries.get(lib)
+        if rollup is not None:
+            rollup.add(entry, -1)
+            if not (rollup.staged or rollup.modified or rollup.untracked or rollup.unmerged):
+                del self.libraries[lib]
+
+    def copy(self):
+        """Return an independent status with the same header and entries.
+
+        Statuses handed to other threads are never modified; incremental
+        updates are applied to a copy (entries themselves are shared, they
+        are not changed after parsing).
+        """
+        st = GitStatus()
+        st.branch, st.oid, st.upstream = self.branch, self.oid, self.upstream
+        st.ahead, st.behind = self.ahead, self.behind
+        for entry in self.entries.values():
+            st.add_entry(entry)
+        return st
+
+    # ------------------------------------------------------------------
+    # Derived views
+    # ------------------------------------------------------------------
+    @property
+    def has_upstream(self):
+        return bool(self.upstream)
+
+    @property
+    def staged(self):
+        return list(self._staged)
+
+    @property
+    def modified(self):
+        return list(self._modified)
+
+    @property
+    def untracked(self):
+        return list(self._untracked)
+
+    @property
+    def unmerged(self):
+        return list(self._unmerged)
+
+    def is_staged(self, path):
+        return path in self._staged
+
+    def is_modified(self, path):
+        return path in self._modified
+
+    def is_untracked(self, path):
+        return path in self._untracked
+
+    def library_rollup(self, library):
+        """Return :class:`StatusCounts` for one library, O(1)."""
+        return self.libraries.get(library) or StatusCounts()
+
+    def is_clean(self):
+        """Return True when there is nothing to commit."""
+        c = self.counts
+        return not (c.staged or c.modified or c.untracked or c.unmerged)
+
+    def as_dict(self):
+        """Return the legacy dict shape.
+
+        Keys: branch, modified, untracked, staged, unmerged, ahead, behind.
+        """
+        return {
+            "branch": self.branch,
+            "modified": self.modified,
+            "untracked": self.untracked,
+            "staged": self.staged,
+            "unmerged": self.unmerged,
+            "ahead": self.ahead,
+            "behind": self.behind,
+        }
+
+
+def parse_porcelain_v2(data):
+    """Parse NUL-delimited ``git status --porcelain=v2 --branch -z`` output.
+
+    Parameters
+    ----------
+    data : str
+
+    Returns
+    -------
+    GitStatus
+    """
+    st = GitStatus()
+    fields = data.split("\0")
+    i = 0
+    n = len(fields)
+    while i < n:
+        rec = fields[i]
+        i += 1
+        if not rec:
+            continue
+        tag = rec[0]
+
+        if tag == "#":
+            _parse_header(st, rec)
+        elif tag == "1":
+            # 1 XY sub mH mI mW hH hI path
+            parts = rec.split(" ", 8)
+            if len(parts) == 9:
+                st.add_entry(StatusEntry(parts[8], parts[1][0], parts[1][1]))
+        elif tag == "2":
+            # 2 XY sub mH mI mW hH hI Xscore path \0 origPath
+            parts = rec.split(" ", 9)
+            orig = fields[i] if i < n else ""
+            i += 1
+            if len(parts) == 10:
+                st.add_entry(StatusEntry(
+                    parts[9], parts[1][0], parts[1][1],
+                    kind="renamed", orig_path=orig,
+                ))
+        elif tag == "u":
+            # u XY sub m1 m2 m3 mW h1 h2 h3 path
+            parts = rec.split(" ", 10)
+            if len(parts) == 11:
+                st.add_entry(StatusEntry(
+                    parts[10], parts[1][0], parts[1][1], kind="unmerged",
+                ))
+        elif tag == "?":
+            st.add_entry(StatusEntry(rec[2:], "?", "?", kind="untracked"))
+        elif tag == "!":
+            st.add_entry(StatusEntry(rec[2:], "!", "!", kind="ignored"))
+        else:
+            logger.debug("Unknown status record: %r", rec)
+    return st
+
+
+def _parse_header(st, rec):
+    parts = rec.split(" ", 2)
+    if len(parts) < 3:
+        return
+    key, value = parts[1], parts[2]
+    if key == "branch.oid":
+        st.oid = "" if value == "(initial)" else value
+    elif key == "branch.head":
+        st.branch = "" if value == "(detached)" else value
+    elif key == "branch.upstream":
+        st.upstream = value
+    elif key == "branch.ab":
+        ab = value.split()
+        if len(ab) == 2:
+            try:
+                st.ahead = int(ab[0].lstrip("+"))
+                st.behind = int(ab[1].lstrip("-"))
+            except ValueError:
+                pass
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Merge driver for ``.kicad_sym``, ``sym-lib-table`` and ``fp-lib-table``.
+
+git calls it with the base, ours and theirs versions of a file::
+
+    [merge "kicad"]
+        name = KiCad library merge
+        driver = "<python>" "<plugin>/kicad_merge.py" %O %A %B %P
+
+Libraries are merged per symbol and tables per ``(lib ...)`` entry: an
+entry changed on one side only is taken from that side, so two people
+editing different symbols of one file never conflict. An entry changed
+differently on both sides is written between conflict markers and the
+driver exits with 1, as git's own merge does.
+"""
+
+import os
+import subprocess
+import sys
+
+if __package__:
+    from .kicad_sym import LIB_ENTRY_HEAD_RE, SYMBOL_HEAD_RE, SExprError, head_name, iter_top_level
+else:
+    # Run by git as a script: load kicad_sym.py directly, not through the
+    # package, whose __init__ registers the plugin with pcbnew
+    import importlib.util
+    _spec = importlib.util.spec_from_file_location(
+        "kicad_sym", os.path.join(os.path.dirname(os.path.abspath(__file__)), "kicad_sym.py"))
+    _sym = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(_sym)
+    LIB_ENTRY_HEAD_RE, SYMBOL_HEAD_RE = _sym.LIB_ENTRY_HEAD_RE, _sym.SYMBOL_HEAD_RE
+    SExprError, head_name, iter_top_level = _sym.SExprError, _sym.head_name, _sym.iter_top_level
+
+DRIVER_NAME = "kicad"
+TABLE_FILES = ("sym-lib-table", "fp-lib-table")
+SYMBOL_SUFFIX = ".kicad_sym"
+
+
+def handles(path):
+    """Return True for files this driver merges."""
+    name = os.path.basename(path)
+    return name.endswith(SYMBOL_SUFFIX) or name in TABLE_FILES
+
+
+class _Split:
+    """A file cut into header, named entries (in order) and footer."""
+
+    __slots__ = ("header", "names", "entries", "sep", "footer")
+
+    def __init__(self, data, head_re):
+        self.names = []
+        self.entries = {}
+        spans = list(iter_top_level(data, head_re))
+        if not spans:
+            end = data.rfind(b")")
+            self.header, self.footer = data[:max(end, 0)], data[max(end, 0):]
+            self.sep = b"\n  "
+            return
+        self.header = data[:spans[0][0]]
+        self.footer = data[spans[-1][1]:]
+        self.sep = data[spans[0][1]:spans[1][0]] if len(spans) > 1 else b"\n  "
+        for start, end in spans:
+            name = head_name(head_re.match(data, start, end))
+            if name not in self.entries:
+                self.names.append(name)
+            self.entries[name] = data[start:end]
+
+    def digest(self, name):
+        text = self.entries.get(name)
+        return None if text is None else b" ".join(text.split())
+
+
+def _pick(base, ours, theirs):
+    """3-way choice for one value; returns (value, conflict)."""
+    if ours == theirs or theirs == base:
+        return ours, False
+    if ours == base:
+        return theirs, False
+    return ours, True
+
+
+def _conflict_text(name, ours, theirs, sep):
+    indent = sep.lstrip(b"\r\n")
+    return (b"<<<<<<< ours (" + name.encode("utf-8") + b")\n" + indent + (ours or b"") +
+            b"\n=======\n" + indent + (theirs or b"") + b"\n>>>>>>> theirs")
+
+
+def _after_conflict(text):
+    """``text`` following a ``>>>>>>>`` line, moved to a line of its own."""
+    return text if text.startswith((b"\n", b"\r\n")) else b"\n" + text
+
+
+def merge_entries(base, ours, theirs, head_re):
+    """Merge three versions entry by entry.
+
+    Parameters
+    ----------
+    base, ours, theirs : bytes
+    head_re : regex
+        :data:`kicad_sym.SYMBOL_HEAD_RE` or :data:`kicad_sym.LIB_ENTRY_HEAD_RE`.
+
+    Returns
+    -------
+    tuple(bytes, list of str)
+        Merged content and the names left in conflict.
+    """
+    b, o, t = _Split(base, head_re), _Split(ours, head_re), _Split(theirs, head_re)
+
+    # Order: ours, with entries added by theirs placed after their
+    # predecessor in theirs
+    order = list(o.names)
+    placed = set(order)
+    for i, name in enumerate(t.names):
+        if name in placed:
+            continue
+        pos = len(order)
+        for prev in reversed(t.names[:i]):
+            if prev in placed:
+                pos = order.index(prev) + 1
+                break
+        order.insert(pos, name)
+        placed.add(name)
+
+    header, _ = _pick(b.header, o.header, t.header)
+    footer, _ = _pick(b.footer, o.footer, t.footer)
+    out = [header]
+    conflicts = []
+    first = True
+    after_conflict = False
+    for name in order:
+        db, do, dt = b.digest(name), o.digest(name), t.digest(name)
+        conflict = False
+        if do == dt or dt == db:
+            text = o.entries.get(name)
+        elif do == db:
+            text = t.entries.get(name)
+        else:
+            conflict = True
+            conflicts.append(name)
+            text = _conflict_text(name, o.entries.get(name), t.entries.get(name), o.sep)
+        if text is None:
+            continue
+        if not first:
+            out.append(_after_conflict(o.sep) if after_conflict else o.sep)
+        first = False
+        if conflict:
+            # git and merge tools only see markers at the start of a line;
+            # the indentation is at the end of the last piece (separator
+            # or header)
+            lead = out[-1].rstrip(b" \t")
+            out[-1] = lead if lead.endswith(b"\n") else lead + b"\n"
+        out.append(text)
+        after_conflict = conflict
+    out.append(_after_conflict(footer) if after_conflict else footer)
+    return b"".join(out), conflicts
+
+
+def merge_file(path, base, ours, theirs):
+    """Merge one file by its type; see :func:`merge_entries`."""
+    head_re = LIB_ENTRY_HEAD_RE if os.path.basename(path) in TABLE_FILES else SYMBOL_HEAD_RE
+    return merge_entries(base, ours, theirs, head_re)
+
+
+def line_merge(base_path, ours_path, theirs_path):
+    """git's own line merge (``git merge-file -p``) of three files.
+
+    Returns
+    -------
+    tuple(bytes, int)
+        Merged content with the usual conflict markers, and the number of
+        conflicts (negative when merge-file failed).
+    """
+    proc = subprocess.run(
+        ["git", "merge-file", "-p", "-L", "ours", "-L", "base", "-L", "theirs",
+         ours_path, base_path, theirs_path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode < 0 or proc.returncode > 127:
+        return b"", -1
+    return proc.stdout, proc.returncode
+
+
+def main(argv=None):
+    """Entry point for git: ``kicad_merge.py %O %A %B %P``.
+
+    Writes the result to %A. Exit status 0 = merged, 1 = conflicts left,
+    2 = could not read the files (git then reports the file as
+    conflicted). A file that does not parse is merged line by line with
+    ``git merge-file``, so the user still gets conflict markers.
+    """
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) < 3:
+        sys.stderr.write("usage: kicad_merge.py BASE OURS THEIRS [PATH]\n")
+        return 2
+    base_path, ours_path, theirs_path = args[:3]
+    path = args[3] if len(args) > 3 else ours_path
+    try:
+        with open(base_path, "rb") as fh:
+            base = fh.read()
+        with open(ours_path, "rb") as fh:
+            ours = fh.read()
+        with open(theirs_path, "rb") as fh:
+            theirs = fh.read()
+    except OSError as exc:
+        sys.stderr.write("kicad merge: {p}: {e}\n".format(p=path, e=exc))
+        return 2
+    try:
+        merged, conflicts = merge_file(path, base, ours, theirs)
+    except SExprError as exc:
+        sys.stderr.write("kicad merge: {p}: {e}, merging lines\n".format(p=path, e=exc))
+        try:
+            merged, count = line_merge(base_path, ours_path, theirs_path)
+        except OSError as exc:
+            sys.stderr.write("kicad merge: {p}: git merge-file: {e}\n".format(p=path, e=exc))
+            return 2
+        if count < 0:
+            return 2
+        with open(ours_path, "wb") as fh:
+            fh.write(merged)
+        return 1 if count else 0
+    with open(ours_path, "wb") as fh:
+        fh.write(merged)
+    if conflicts:
+        sys.stderr.write("kicad merge: {p}: conflicting changes in {n}\n".format(
+            p=path, n=", ".join(conflicts)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Footprint summaries from ``.kicad_mod`` files (one footprint per file).
+
+Both the current ``(footprint "Name" ...)`` form and the legacy
+``(module Name ...)`` form are read. Like :mod:`kicad_sym`, nothing is
+parsed into a tree: pads are counted on the string-neutralised copy and
+``descr`` / ``tags`` / properties are picked out with regexes.
+"""
+
+import re
+
+from .kicad_sym import PROPERTY_RE, ItemSummary, SExprError, neutralize_strings, unescape
+
+_STRING = rb'(?:"((?:[^"\\]|\\.)*)"|([^\s()"]+))'
+FOOTPRINT_HEAD_RE = re.compile(rb'\(\s*(?:footprint|module)\s+' + _STRING, re.S)
+_DESCR_RE = re.compile(rb'\(\s*descr\s+' + _STRING, re.S)
+_TAGS_RE = re.compile(rb'\(\s*tags\s+' + _STRING, re.S)
+_PAD_RE = re.compile(rb"\(\s*pad\s")
+
+FOOTPRINT_SUFFIX = ".kicad_mod"
+
+
+def _value(m):
+    if m is None:
+        return None
+    raw = m.group(1) if m.group(1) is not None else m.group(2)
+    return unescape(raw)
+
+
+def summarize_footprint(data):
+    """Return an :class:`kicad_sym.ItemSummary` for a ``.kicad_mod`` file.
+
+    ``pins`` holds the number of pads; ``descr`` and ``tags`` are stored
+    among the properties as ``Description`` and ``Keywords``.
+
+    Raises
+    ------
+    SExprError
+        When the file has no footprint head or unbalanced parentheses.
+    """
+    head = FOOTPRINT_HEAD_RE.search(data)
+    if head is None:
+        raise SExprError("no footprint in file")
+    clean = neutralize_strings(data)
+    end = clean.rfind(b")") + 1
+    if clean.count(b"(", head.start(), end) != clean.count(b")", head.start(), end):
+        raise SExprError("unbalanced parentheses")
+    props = {unescape(m.group(1)): unescape(m.group(2))
+             for m in PROPERTY_RE.finditer(data, head.start(), end)}
+    descr = _value(_DESCR_RE.search(data, head.start(), end))
+    if descr is not None:
+        props.setdefault("Description", descr)
+    tags = _value(_TAGS_RE.search(data, head.start(), end))
+    if tags is not None:
+        props.setdefault("Keywords", tags)
+    pads = len(_PAD_RE.findall(clean, head.start(), end))
+    return ItemSummary(_value(head), pads, props, head.start(), end)
@@ -0,0 +1,513 @@
+# -*- coding: utf-8 -*-
+"""
+``.kicad_sym`` reader — symbol-level view of a KiCad symbol library.
+
+A library is one S-expression::
+
+    (kicad_symbol_lib (version 20231120) (generator kicad_symbol_editor)
+      (symbol "R" (property "Reference" "R" ...) ...
+        (symbol "R_0_1" (rectangle ...))
+        (symbol "R_1_1" (pin passive line (at 0 3.81 270) (length 1.27)
+                          (name "~" ...) (number "1" ...))))
+      ...)
+
+:func:`index_symbols` finds the span of every top-level symbol without
+building a tree: strings are neutralised, then nesting depth is counted
+with ``bytes.count`` between ``(symbol "`` heads, so a 2000-symbol file
+is indexed without a Python-level loop over its parentheses.
+:func:`index_symbols_stream` does the same over chunks of a file, keeping
+only the current chunk and the symbol that straddles it in memory. Only
+symbols whose spans differ are parsed in full (:func:`parse_symbol`) to
+get property and pin detail.
+"""
+
+import hashlib
+import re
+
+_TOKEN_RE = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))', re.S)
+SYMBOL_HEAD_RE = re.compile(rb'\(\s*symbol\s+"((?:[^"\\]|\\.)*)"', re.S)
+# sym-lib-table / fp-lib-table: (lib (name "Lib_MCU")(type "KiCad")(uri ...))
+LIB_ENTRY_HEAD_RE = re.compile(
+    rb'\(\s*lib\s*\(\s*name\s+(?:"((?:[^"\\]|\\.)*)"|([^\s()"]+))', re.S)
+PROPERTY_RE = re.compile(rb'\(\s*property\s+"((?:[^"\\]|\\.)*)"\s+"((?:[^"\\]|\\.)*)"', re.S)
+EXTENDS_RE = re.compile(rb'\(\s*extends\s+"((?:[^"\\]|\\.)*)"', re.S)
+PIN_RE = re.compile(rb"\(\s*pin\s")
+_ESCAPE_RE = re.compile(r"\\(.)")
+_UNIT_RE = re.compile(r"_(\d+)_(\d+)$")
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r"}
+_BLANK_PARENS = bytes.maketrans(b"()", b"  ")
+
+
+class SExprError(ValueError):
+    """Raised for unbalanced or truncated S-expressions."""
+
+
+def unescape(raw):
+    text = raw.decode("utf-8", "replace")
+    if "\\" not in text:
+        return text
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), text)
+
+
+def parse_sexpr(data, start=0, end=None):
+    """Parse one S-expression from ``data[start:end]`` into nested lists.
+
+    Atoms and strings both become ``str``.
+    """
+    if end is None:
+        end = len(data)
+    stack = [[]]
+    for m in _TOKEN_RE.finditer(data, start, end):
+        if m.group(1):
+            stack.append([])
+        elif m.group(2):
+            if len(stack) == 1:
+                raise SExprError("Unexpected ')' at byte {p}".format(p=m.start(2)))
+            item = stack.pop()
+            stack[-1].append(item)
+            if len(stack) == 1:
+                return item
+        elif m.group(3) is not None:
+            stack[-1].append(unescape(m.group(3)))
+        else:
+            stack[-1].append(m.group(4).decode("utf-8", "replace"))
+    raise SExprError("Unterminated expression")
+
+
+def neutralize_strings(data):
+    """Return ``data`` with parentheses inside strings blanked out.
+
+    Offsets are preserved, so spans found in the result apply to ``data``.
+    Splitting on quotes keeps the work in C for the usual case of no
+    parentheses inside strings.
+    """
+    clean = data.replace(b"\\\\", b"__").replace(b'\\"', b"__")
+    parts = clean.split(b'"')
+    inside = parts[1::2]
+    if len(parts) % 2 == 0:
+        raise SExprError("Unterminated string")
+    joined = b"".join(inside)
+    if b"(" not in joined and b")" not in joined:
+        return clean
+    parts[1::2] = [p.translate(_BLANK_PARENS) for p in inside]
+    return b'"'.join(parts)
+
+
+def head_name(m):
+    """Return the name captured by a :data:`SYMBOL_HEAD_RE` /
+    :data:`LIB_ENTRY_HEAD_RE` match."""
+    raw = m.group(1)
+    if raw is None:
+        raw = m.group(2)
+    return unescape(raw)
+
+
+def iter_top_level_symbols(data):
+    """Yield ``(start, end)`` of every top-level ``(symbol ...)``."""
+    return iter_top_level(data, SYMBOL_HEAD_RE)
+
+
+def _top_level_heads(clean, head_re, depth=0):
+    """Return (head offsets at depth 1, depth at the end of ``clean``).
+
+    ``depth`` is the nesting depth at the start of ``clean``.
+    """
+    heads = []
+    prev = 0
+    for m in head_re.finditer(clean):
+        pos = m.start()
+        depth += clean.count(b"(", prev, pos) - clean.count(b")", prev, pos)
+        prev = pos
+        if depth == 1:
+            heads.append(pos)
+    depth += clean.count(b"(", prev) - clean.count(b")", prev)
+    return heads, depth
+
+
+def _spans(clean, heads, root_end):
+    for i, start in enumerate(heads):
+        limit = heads[i + 1] if i + 1 < len(heads) else root_end
+        # The item closes at the last ')' before the next top-level head
+        end = clean.rfind(b")", start, limit) + 1
+        yield (start, end)
+
+
+def iter_top_level(data, head_re, clean=None):
+    """Yield ``(start, end)`` of every child of the root matching ``head_re``.
+
+    Depth is tracked with ``bytes.count`` between consecutive heads, so
+    nested matches (unit sub-symbols) are skipped without visiting the
+    parentheses of pins and graphics one by one. ``clean`` is
+    :func:`neutralize_strings` of ``data`` when the caller has it already.
+    """
+    if clean is None:
+        clean = neutralize_strings(data)
+    if clean.count(b"(") != clean.count(b")"):
+        raise SExprError("Unbalanced parentheses")
+    heads, _ = _top_level_heads(clean, head_re)
+    return _spans(clean, heads, clean.rfind(b")"))
+
+
+class SymbolSpan:
+    """Location and content digest of one top-level symbol.
+
+    ``digest`` ignores whitespace, so reformatting is not a change.
+    """
+
+    __slots__ = ("name", "start", "end", "digest")
+
+    def __init__(self, name, start, end, digest):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.digest = digest
+
+    def __repr__(self):
+        return "SymbolSpan({n!r}, {s}..{e})".format(n=self.name, s=self.start, e=self.end)
+
+
+def index_symbols(data):
+    """Return {name: SymbolSpan} for the top-level symbols of ``data``.
+
+    Parameters
+    ----------
+    data : bytes
+        Content of a ``.kicad_sym`` file.
+    """
+    result = {}
+    for start, end in iter_top_level_symbols(data):
+        m = SYMBOL_HEAD_RE.match(data, start, end)
+        digest = hashlib.sha1(b" ".join(data[start:end].split())).digest()
+        name = head_name(m)
+        result[name] = SymbolSpan(name, start, end, digest)
+    return result
+
+
+def _stream_cut(buf):
+    """Return the length of the prefix of ``buf`` that ends outside a string.
+
+    A trailing backslash may start an escape completed by the next chunk,
+    and an odd number of quotes means the tail is an unterminated string;
+    both are left for the next round.
+    """
+    end = len(buf)
+    while end and buf[end - 1] == 0x5C:
+        end -= 1
+    clean = buf[:end].replace(b"\\\\", b"__").replace(b'\\"', b"__")
+    if clean.count(b'"') % 2:
+        end = clean.rfind(b'"')
+    return end
+
+
+def index_symbols_stream(chunks):
+    """Return :func:`index_symbols` of the concatenation of ``chunks``.
+
+    Complete top-level symbols are indexed as soon as the next top-level
+    head has been read; the rest of the buffer starts at that head (depth
+    1) and is carried into the next round. Memory is bounded by the chunk
+    size plus the largest symbol instead of the file size.
+
+    Parameters
+    ----------
+    chunks : iterable of bytes
+        Consecutive pieces of a ``.kicad_sym`` file.
+    """
+    result = {}
+    buf = b""
+    base = 0
+    depth = 0
+
+    def add(region, clean, heads, root_end):
+        for start, end in _spans(clean, heads, root_end):
+            m = SYMBOL_HEAD_RE.match(region, start, end)
+            digest = hashlib.sha1(b" ".join(region[start:end].split())).digest()
+            name = head_name(m)
+            result[name] = SymbolSpan(name, base + start, base + end, digest)
+
+    for chunk in chunks:
+        buf += chunk
+        region = buf[:_stream_cut(buf)]
+        clean = neutralize_strings(region)
+        heads, _ = _top_level_heads(clean, SYMBOL_HEAD_RE, depth)
+        if len(heads) < 2:
+            continue
+        keep = heads.pop()
+        add(region, clean, heads, keep)
+        buf = buf[keep:]
+        base += keep
+        depth = 1
+
+    clean = neutralize_strings(buf)
+    heads, end_depth = _top_level_heads(clean, SYMBOL_HEAD_RE, depth)
+    if end_depth != 0:
+        raise SExprError("Unbalanced parentheses")
+    add(buf, clean, heads, clean.rfind(b")"))
+    return result
+
+
+class ItemSummary:
+    """Searchable summary of one symbol or footprint (see parse_cache).
+
+    Attributes
+    ----------
+    name : str
+    pins : int
+        Pins of a symbol (all units), pads of a footprint.
+    properties : dict
+        Property name → value (``Value``, ``Footprint``, ``ki_keywords``, ...).
+    start, end : int
+        Byte span in the file.
+    """
+
+    __slots__ = ("name", "pins", "properties", "start", "end")
+
+    def __init__(self, name, pins=0, properties=None, start=0, end=0):
+        self.name = name
+        self.pins = pins
+        self.properties = properties or {}
+        self.start = start
+        self.end = end
+
+    def as_row(self):
+        return [self.name, self.pins, self.properties, self.start, self.end]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+    def __repr__(self):
+        return "ItemSummary({n!r}, pins={p})".format(n=self.name, p=self.pins)
+
+
+def summarize_symbols(data):
+    """Return an :class:`ItemSummary` for every top-level symbol of ``data``.
+
+    Regex-only (no tree): properties are read from the symbol's span,
+    pins are counted on the string-neutralised copy.
+    """
+    clean = neutralize_strings(data)
+    items = []
+    for start, end in iter_top_level(data, SYMBOL_HEAD_RE, clean):
+        name = head_name(SYMBOL_HEAD_RE.match(data, start, end))
+        props = {unescape(m.group(1)): unescape(m.group(2))
+                 for m in PROPERTY_RE.finditer(data, start, end)}
+        ext = EXTENDS_RE.search(data, start, end)
+        if ext is not None:
+            props["ki_extends"] = unescape(ext.group(1))
+        items.append(ItemSummary(name, len(PIN_RE.findall(clean, start, end)), props, start, end))
+    return items
+
+
+class PinInfo:
+    """Electrical and geometric attributes of one pin."""
+
+    __slots__ = ("number", "name", "etype", "shape", "at", "length", "hidden")
+
+    def __init__(self, number, name="", etype="", shape="", at=(), length="", hidden=False):
+        self.number = number
+        self.name = name
+        self.etype = etype
+        self.shape = shape
+        self.at = at
+        self.length = length
+        self.hidden = hidden
+
+    def key(self):
+        return (self.name, self.etype, self.shape, self.at, self.length, self.hidden)
+
+    def changed_fields(self, other):
+        """Return the attribute names that differ from ``other``."""
+        return [f for f in ("name", "etype", "shape", "at", "length", "hidden")
+                if getattr(self, f) != getattr(other, f)]
+
+
+class SymbolInfo:
+    """Fully parsed symbol: properties, pins and a digest of the graphics.
+
+    Attributes
+    ----------
+    pins : dict
+        ``number`` → PinInfo, or ``number@unit`` when a number repeats
+        across units / body styles.
+    """
+
+    __slots__ = ("name", "extends", "properties", "pins", "body_digest")
+
+    def __init__(self, name):
+        self.name = name
+        self.extends = ""
+        self.properties = {}
+        self.pins = {}
+        self.body_digest = b""
+
+
+def _parse_pin(node):
+    pin = PinInfo("", etype=node[1] if len(node) > 1 and isinstance(node[1], str) else "",
+                  shape=node[2] if len(node) > 2 and isinstance(node[2], str) else "")
+    for item in node[1:]:
+        if item == "hide":
+            pin.hidden = True
+        elif isinstance(item, list) and item:
+            head = item[0]
+            if head == "at":
+                pin.at = tuple(item[1:])
+            elif head == "length" and len(item) > 1:
+                pin.length = item[1]
+            elif head == "name" and len(item) > 1:
+                pin.name = item[1]
+            elif head == "number" and len(item) > 1:
+                pin.number = item[1]
+            elif head == "hide":
+                pin.hidden = len(item) < 2 or item[1] == "yes"
+    return pin
+
+
+def parse_symbol(data, span):
+    """Return the :class:`SymbolInfo` of ``span`` within ``data``."""
+    node = parse_sexpr(data, span.start, span.end)
+    info = SymbolInfo(span.name)
+    body = hashlib.sha1()
+    _collect(node, info, body, "")
+    info.body_digest = body.digest()
+    return info
+
+
+def _collect(node, info, body, unit):
+    for item in node[2:]:
+        if not isinstance(item, list) or not item:
+            body.update(repr(item).encode("utf-8"))
+            continue
+        head = item[0]
+        if head == "property" and len(item) > 2:
+            info.properties[item[1]] = item[2]
+        elif head == "extends" and len(item) > 1:
+            info.extends = item[1]
+        elif head == "symbol" and len(item) > 1:
+            m = _UNIT_RE.search(item[1])
+            _collect(item, info, body, "{u}.{s}".format(u=m.group(1), s=m.group(2)) if m else unit)
+        elif head == "pin":
+            pin = _parse_pin(item)
+            key = pin.number
+            if key in info.pins:
+                key = "{n}@{u}".format(n=pin.number, u=unit)
+            info.pins[key] = pin
+        else:
+            body.update(repr(item).encode("utf-8"))
+
+
+class SymbolChange:
+    """What differs in one symbol present in both versions."""
+
+    __slots__ = ("name", "properties", "pins_added", "pins_removed", "pins_changed", "graphics")
+
+    def __init__(self, name):
+        self.name = name
+        self.properties = []    # (key, old or None, new or None)
+        self.pins_added = []
+        self.pins_removed = []
+        self.pins_changed = []  # (number, [field, ...])
+        self.graphics = False
+
+    def describe(self):
+        """Short Russian description for the log."""
+        parts = []
+        if self.properties:
+            parts.append(", ".join(key for key, _, _ in self.properties))
+        if self.pins_added or self.pins_removed or self.pins_changed:
+            parts.append(u"выводы +{a} −{r} ~{c}".format(
+                a=len(self.pins_added), r=len(self.pins_removed), c=len(self.pins_changed)))
+        if self.graphics:
+            parts.append(u"графика")
+        return "; ".join(parts) or u"форматирование"
+
+
+def compare_symbols(old, new):
+    """Return a :class:`SymbolChange` between two :class:`SymbolInfo`."""
+    change = SymbolChange(new.name)
+    for key in sorted(set(old.properties) | set(new.properties)):
+        a, b = old.properties.get(key), new.properties.get(key)
+        if a != b:
+            change.properties.append((key, a, b))
+    if old.extends != new.extends:
+        change.properties.append(("extends", old.extends or None, new.extends or None))
+    change.pins_added = sorted(set(new.pins) - set(old.pins))
+    change.pins_removed = sorted(set(old.pins) - set(new.pins))
+    for key in sorted(set(old.pins) & set(new.pins)):
+        if old.pins[key].key() != new.pins[key].key():
+            change.pins_changed.append((key, old.pins[key].changed_fields(new.pins[key])))
+    change.graphics = old.body_digest != new.body_digest
+    return change
+
+
+class LibraryDiff:
+    """Symbol-level difference between two versions of one library.
+
+    Attributes
+    ----------
+    path : str
+    added, removed : list of str
+    modified : list of SymbolChange
+    error : str
+        Set when a version could not be parsed (the diff is then empty).
+    """
+
+    __slots__ = ("path", "added", "removed", "modified", "error")
+
+    def __init__(self, path):
+        self.path = path
+        self.added = []
+        self.removed = []
+        self.modified = []
+        self.error = ""
+
+    @property
+    def count(self):
+        return len(self.added) + len(self.removed) + len(self.modified)
+
+
+def _parse_at(data, span):
+    if callable(data):
+        piece = data(span.start, span.end)
+        return parse_symbol(piece, SymbolSpan(span.name, 0, len(piece), span.digest))
+    return parse_symbol(data, span)
+
+
+def diff_libraries(path, old_data, new_data, old_index=None, new_index=None):
+    """Compare two versions of a ``.kicad_sym`` file.
+
+    Parameters
+    ----------
+    old_data, new_data : bytes, callable or None
+        None for a file that does not exist on that side. A callable
+        ``read(start, end)`` returns one span of a file that is not kept
+        in memory; the matching index must then be given.
+    old_index, new_index : dict, optional
+        Precomputed :func:`index_symbols` results (e.g. from a cache).
+
+    Returns
+    -------
+    LibraryDiff
+    """
+    diff = LibraryDiff(path)
+    try:
+        if old_index is None:
+            old_index = index_symbols(old_data) if old_data is not None else {}
+        if new_index is None:
+            new_index = index_symbols(new_data) if new_data is not None else {}
+    except SExprError as exc:
+        diff.error = str(exc)
+        return diff
+
+    diff.added = sorted(set(new_index) - set(old_index))
+    diff.removed = sorted(set(old_index) - set(new_index))
+    for name in sorted(set(old_index) & set(new_index)):
+        a, b = old_index[name], new_index[name]
+        if a.digest == b.digest:
+            continue
+        try:
+            change = compare_symbols(_parse_at(old_data, a), _parse_at(new_data, b))
+        except SExprError:
+            change = SymbolChange(name)
+            change.graphics = True
+        diff.modified.append(change)
+    return diff
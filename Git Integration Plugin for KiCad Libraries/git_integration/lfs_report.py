@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+LFS migration report — which file types make the repository heavy.
+
+Every blob reachable from any ref is counted once (``git rev-list
+--objects --all`` for the paths, ``git cat-file --batch-all-objects
+--batch-check`` for the sizes) and grouped by file extension. History
+weight is what LFS removes from every clone, so the report ranks by it
+and marks the binary types worth moving (3D models above all).
+"""
+
+import logging
+import os
+
+from .progress import format_bytes
+
+logger = logging.getLogger("kicad_git_plugin.lfs_report")
+
+# KiCad text formats: diffable, merged by git — never LFS candidates
+_TEXT_EXTENSIONS = frozenset((
+    ".kicad_sym", ".kicad_mod", ".kicad_pcb", ".kicad_sch", ".kicad_pro",
+    ".kicad_dru", ".kicad_wks", ".lib", ".dcm", ".mod", ".sch",
+    ".txt", ".md", ".csv", ".json", ".ini", ".py", ".yml", ".yaml",
+    ".gitattributes", ".gitignore",
+))
+_MIN_TOTAL = 10 * 1024 * 1024   # history weight that makes a type a candidate
+_MIN_AVERAGE = 256 * 1024       # ...or an average blob this large
+
+
+class ExtensionStats:
+    """Size statistics of one file extension."""
+
+    __slots__ = ("extension", "files", "versions", "history_bytes", "head_bytes", "largest")
+
+    def __init__(self, extension):
+        self.extension = extension
+        self.files = 0          # distinct paths
+        self.versions = 0       # distinct blobs in history
+        self.history_bytes = 0
+        self.head_bytes = 0
+        self.largest = 0
+
+    @property
+    def average(self):
+        return self.history_bytes // self.versions if self.versions else 0
+
+    @property
+    def recommended(self):
+        """True when moving this type to LFS would shrink clones noticeably."""
+        if self.extension in _TEXT_EXTENSIONS:
+            return False
+        return self.history_bytes >= _MIN_TOTAL or self.average >= _MIN_AVERAGE
+
+    def __repr__(self):
+        return "ExtensionStats({e!r}, {n})".format(e=self.extension, n=self.history_bytes)
+
+
+def extension_of(path):
+    """Return the lower-case extension, the file name for dotfiles, or ''."""
+    name = path.rsplit("/", 1)[-1].lower()
+    if name.startswith(".") and name.count(".") == 1:
+        return name
+    return os.path.splitext(name)[1]
+
+
+def collect_stats(git):
+    """Return {extension: ExtensionStats} for all reachable blobs.
+
+    Returns None when git cannot read the repository.
+    """
+    rc, out, err = git._run_git("cat-file", "--batch-all-objects",
+                                "--batch-check=%(objectname) %(objecttype) %(objectsize)")
+    if rc != 0:
+        logger.debug("cat-file failed: %s", err.strip())
+        return None
+    sizes = {}
+    for line in out.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[1] == "blob":
+            sizes[parts[0]] = int(parts[2])
+
+    rc, out, err = git._run_git("rev-list", "--objects", "--all")
+    if rc != 0:
+        logger.debug("rev-list failed: %s", err.strip())
+        return None
+    head = _head_blobs(git)
+
+    stats = {}
+    seen_paths = set()
+    seen_blobs = set()
+    for line in out.splitlines():
+        sha, _, path = line.partition(" ")
+        size = sizes.get(sha)
+        if size is None or not path:
+            continue  # commit, tree, or a blob not present (partial clone)
+        ext = extension_of(path)
+        entry = stats.get(ext)
+        if entry is None:
+            entry = stats[ext] = ExtensionStats(ext)
+        if path not in seen_paths:
+            seen_paths.add(path)
+            entry.files += 1
+        if sha not in seen_blobs:
+            seen_blobs.add(sha)
+            entry.versions += 1
+            entry.history_bytes += size
+            entry.largest = max(entry.largest, size)
+    for path, sha in head.items():
+        entry = stats.get(extension_of(path))
+        if entry is not None and sha in sizes:
+            entry.head_bytes += sizes[sha]
+    return stats
+
+
+def _head_blobs(git):
+    rc, out, err = git._run_git("ls-tree", "-r", "-z", "HEAD")
+    result = {}
+    if rc != 0:
+        return result
+    for item in out.split("\0"):
+        meta, _, path = item.partition("\t")
+        parts = meta.split()
+        if len(parts) == 3 and parts[1] == "blob":
+            result[path] = parts[2]
+    return result
+
+
+def migration_report(git, limit=15):
+    """Return the report as text for the log / a dialog.
+
+    Parameters
+    ----------
+    git : git_service.GitService
+    limit : int
+        Number of extensions listed (largest first).
+    """
+    stats = collect_stats(git)
+    if stats is None:
+        return u"Не удалось прочитать репозиторий."
+    if not stats:
+        return u"Репозиторий пуст."
+
+    ranked = sorted(stats.values(), key=lambda s: s.history_bytes, reverse=True)
+    total = sum(s.history_bytes for s in ranked)
+    lines = [u"Объём истории: {t}".format(t=format_bytes(total)), u""]
+    lines.append(u"{e:<14} {f:>7} {v:>8} {h:>11} {c:>11} {m:>11}".format(
+        e=u"Тип", f=u"Файлов", v=u"Версий", h=u"История", c=u"HEAD", m=u"Макс."))
+    for s in ranked[:limit]:
+        lines.append(u"{e:<14} {f:>7} {v:>8} {h:>11} {c:>11} {m:>11}{r}".format(
+            e=s.extension or u"(без)", f=s.files, v=s.versions,
+            h=format_bytes(s.history_bytes), c=format_bytes(s.head_bytes),
+            m=format_bytes(s.largest), r=u"  ← LFS" if s.recommended else u""))
+
+    candidates = [s for s in ranked if s.recommended and s.extension]
+    lines.append(u"")
+    if not candidates:
+        lines.append(u"Переносить в LFS нечего.")
+        return u"\n".join(lines)
+    saved = sum(s.history_bytes for s in candidates)
+    lines.append(u"Перенос в LFS уменьшит клон на ~{s} ({p}%).".format(
+        s=format_bytes(saved), p=int(saved * 100 / total) if total else 0))
+    lines.append(u".gitattributes:")
+    for s in candidates:
+        lines.append(u"  *{e} filter=lfs diff=lfs merge=lfs -text".format(e=s.extension))
+    lines.append(u"Перенос истории:")
+    lines.append(u"  git lfs migrate import --everything --include=\"{p}\"".format(
+        p=",".join("*" + s.extension for s in candidates)))
+    return u"\n".join(lines)
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-repository support — symbols, footprints and 3D models may live in
+separate library repositories. :class:`RepoSet` keeps one GitService per
+repository and runs status / fetch / pull / push for all of them on a
+bounded thread pool, returning one :class:`RepoResult` per repository.
+With an :class:`async_git.AsyncBridge`, pull and push run as
+:class:`async_git.AsyncGitService` coroutines, so one ``CancelToken``
+stops them in every repository and each reports its own progress.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .async_git import AsyncGitService
+from .git_service import GitService
+
+logger = logging.getLogger("kicad_git_plugin.multi_repo")
+
+
+class RepoResult:
+    """Outcome of one operation in one repository.
+
+    Attributes
+    ----------
+    path : str
+    ok : bool
+    message : str
+    status : git_status.GitStatus or None
+        Status read after the operation (None if it failed).
+    """
+
+    __slots__ = ("path", "ok", "message", "status")
+
+    def __init__(self, path, ok, message="", status=None):
+        self.path = path
+        self.ok = ok
+        self.message = message
+        self.status = status
+
+    @property
+    def name(self):
+        return repo_name(self.path)
+
+    def __repr__(self):
+        return "RepoResult({n!r}, ok={o})".format(n=self.name, o=self.ok)
+
+
+def repo_name(path):
+    """Short display name of a repository (its directory name)."""
+    return os.path.basename(path.rstrip("/\\")) or path
+
+
+class RepoSet:
+    """All configured library repositories.
+
+    Parameters
+    ----------
+    config : config_service.ConfigService
+    primary : GitService, optional
+        Service of the ``[repository] path`` repo, reused instead of a
+        second instance.
+    bridge : async_git.AsyncBridge, optional
+        Loop that runs cancellable pull / push; without it they run
+        synchronously.
+    """
+
+    def __init__(self, config, primary=None, bridge=None):
+        self.config = config
+        self._primary = primary
+        self._bridge = bridge
+        self._services = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._workers = 0
+
+    # ------------------------------------------------------------------
+    # Services
+    # ------------------------------------------------------------------
+    @property
+    def paths(self):
+        return self.config.get_repo_paths()
+
+    def is_multi(self):
+        return len(self.paths) > 1
+
+    def service(self, path):
+        """Return the GitService of one repository."""
+        with self._lock:
+            svc = self._services.get(path)
+            if svc is None:
+                if self._primary is not None and path == self._primary.get_repo_path():
+                    svc = self._primary
+                else:
+                    svc = GitService(self.config, repo_path=path)
+                self._services[path] = svc
+            return svc
+
+    def _pool(self):
+        workers = self.config.get_repo_parallelism()
+        with self._lock:
+            if self._executor is None or self._workers != workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="git-repo")
+                self._workers = workers
+            return self._executor
+
+    def close(self):
+        with self._lock:
+            services = [s for s in self._services.values() if s is not self._primary]
+            self._services = {}
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        for svc in services:
+            svc.close()
+
+    # ------------------------------------------------------------------
+    # Batch operations
+    # ------------------------------------------------------------------
+    def run_all(self, operation, paths=None):
+        """Run ``operation(service)`` for every repository in parallel.
+
+        ``operation`` returns a :class:`RepoResult`; exceptions become a
+        failed result for that repository only.
+
+        Returns
+        -------
+        list of RepoResult
+            In configuration order.
+        """
+        paths = list(self.paths if paths is None else paths)
+        futures = [(p, self._pool().submit(operation, self.service(p))) for p in paths]
+        results = []
+        for path, future in futures:
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                logger.exception("Operation failed in %s", path)
+                results.append(RepoResult(path, False, str(exc)))
+        return results
+
+    def status_all(self, paths=None):
+        return self.run_all(_status, paths)
+
+    def fetch_all(self, paths=None):
+        """``get_sync_status`` (probe + fetch + status) in every repository."""
+        return self.run_all(_sync, paths)
+
+    def _runner(self, svc, token, progress_for):
+        """Return ``run(name)`` calling ``AsyncGitService.<name>`` of
+        ``svc`` on the bridge, or None without a bridge."""
+        if self._bridge is None:
+            return None
+        on_progress = progress_for(svc.get_repo_path()) if progress_for else None
+        agit = AsyncGitService(svc)
+
+        def run(name):
+            return self._bridge.run(getattr(agit, name)(token=token, on_progress=on_progress))
+
+        return run
+
+    def pull_all(self, paths=None, token=None, progress_for=None):
+        """Pull every repository.
+
+        ``token`` (a ``CancelToken``) cancels all of them;
+        ``progress_for(path)`` returns the ``on_progress`` callable of one
+        repository. Both need the bridge.
+        """
+        return self.run_all(lambda svc: _pull(svc, self._runner(svc, token, progress_for)),
+                            paths)
+
+    def push_all(self, paths=None, token=None, progress_for=None):
+        """Push every repository; see :meth:`pull_all`."""
+        return self.run_all(lambda svc: _push(svc, self._runner(svc, token, progress_for)),
+                            paths)
+
+
+def _missing(svc):
+    if not svc.has_repo():
+        path = svc.get_repo_path()
+        return RepoResult(path, False, "Репозиторий не найден в {p}".format(p=path))
+    return None
+
+
+def _status(svc):
+    missing = _missing(svc)
+    if missing is not None:
+        return missing
+    return RepoResult(svc.get_repo_path(), True, "", svc.get_status())
+
+
+def _sync(svc):
+    missing = _missing(svc)
+    if missing is not None:
+        return missing
+    sync = svc.get_sync_status()
+    return RepoResult(svc.get_repo_path(), sync["success"], sync["message"], sync["status"])
+
+
+def _pull(svc, run=None):
+    missing = _missing(svc)
+    if missing is not None:
+        return missing
+    ok, msg = run("pull") if run is not None else svc.pull()
+    return RepoResult(svc.get_repo_path(), ok, msg, svc.get_status())
+
+
+def _push(svc, run=None):
+    missing = _missing(svc)
+    if missing is not None:
+        return missing
+    st = svc.get_status()
+    if st.behind > 0:
+        return RepoResult(svc.get_repo_path(), False,
+                          "Отстаёт от сервера на {n} коммитов. Сначала выполните Pull.".format(
+                              n=st.behind), st)
+    if st.ahead == 0:
+        return RepoResult(svc.get_repo_path(), True, "Нечего отправлять.", st)
+    ok, msg = run("push") if run is not None else svc.push()
+    return RepoResult(svc.get_repo_path(), ok, msg, svc.get_status())
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Parse cache — symbol and footprint summaries of every library file in
+the repository, keyed by blob SHA.
+
+A blob id names the exact content, so a summary never goes stale: after
+a pull only paths whose id changed are read (one streaming ``git
+cat-file --batch``) and parsed, everything else is a lookup. The cache is kept in
+``.git/kicad_git_plugin/parse_cache.json.z`` as zlib-compressed JSON
+with one compact row per blob, least recently used blobs dropped first.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from .kicad_mod import FOOTPRINT_SUFFIX, summarize_footprint
+from .kicad_sym import ItemSummary, SExprError, summarize_symbols
+
+logger = logging.getLogger("kicad_git_plugin.parse_cache")
+
+CACHE_FILE = "parse_cache.json.z"
+# Bump when summaries change shape or content — old caches are dropped
+PARSER_VERSION = 1
+SYMBOL_SUFFIX = ".kicad_sym"
+LIBRARY_FILE_SUFFIXES = (SYMBOL_SUFFIX, FOOTPRINT_SUFFIX)
+
+
+class FileSummary:
+    """Summary of one library blob.
+
+    Attributes
+    ----------
+    kind : str
+        ``'symbol'`` (``.kicad_sym``) or ``'footprint'`` (``.kicad_mod``).
+    items : list of kicad_sym.ItemSummary
+    error : str
+        Parse error; ``items`` is empty then.
+    """
+
+    __slots__ = ("kind", "items", "error")
+
+    def __init__(self, kind, items=None, error=""):
+        self.kind = kind
+        self.items = items or []
+        self.error = error
+
+    def as_row(self):
+        return [self.kind, [item.as_row() for item in self.items], self.error]
+
+    @classmethod
+    def from_row(cls, row):
+        kind, items, error = row
+        return cls(kind, [ItemSummary.from_row(item) for item in items], error)
+
+    def __repr__(self):
+        return "FileSummary({k!r}, {n} items)".format(k=self.kind, n=len(self.items))
+
+
+class RefreshStats:
+    """Outcome of :meth:`ParseCache.refresh`.
+
+    Attributes
+    ----------
+    files, hits, parsed, failed, evicted : int
+    changed : list of str
+        Paths added, modified or removed since the previous refresh.
+    elapsed : float
+        Seconds.
+    """
+
+    __slots__ = ("files", "hits", "parsed", "failed", "evicted", "changed", "elapsed")
+
+    def __init__(self):
+        self.files = 0
+        self.hits = 0
+        self.parsed = 0
+        self.failed = 0
+        self.evicted = 0
+        self.changed = []
+        self.elapsed = 0.0
+
+    def describe(self):
+        return (u"Кэш библиотек: {f} файлов, разобрано {p}, из кэша {h}"
+                u"{e} ({t:.2f} с)").format(
+            f=self.files, p=self.parsed, h=self.hits, t=self.elapsed,
+            e=u", ошибок {n}".format(n=self.failed) if self.failed else u"")
+
+    def __repr__(self):
+        return "RefreshStats(files={f}, parsed={p}, hits={h})".format(
+            f=self.files, p=self.parsed, h=self.hits)
+
+
+def summarize_blob(path, data):
+    """Parse one library file into a :class:`FileSummary`."""
+    if path.endswith(SYMBOL_SUFFIX):
+        kind = "symbol"
+        parse = summarize_symbols
+    else:
+        kind = "footprint"
+        parse = lambda d: [summarize_footprint(d)]
+    try:
+        return FileSummary(kind, parse(data))
+    except SExprError as exc:
+        return FileSummary(kind, error=str(exc))
+
+
+def _in_cone(path, dirs):
+    """Cone-mode sparse checkout: root files plus everything under ``dirs``."""
+    if "/" not in path:
+        return True
+    return any(path.startswith(d.rstrip("/") + "/") for d in dirs)
+
+
+def list_library_blobs(git, rev="HEAD"):
+    """Return {path: blob sha} of all library files in ``rev``.
+
+    With a sparse checkout only the materialised directories are listed,
+    so a partial clone never downloads blobs of libraries nobody uses.
+    Returns None when ``rev`` cannot be read.
+    """
+    rc, out, err = git._run_git("ls-tree", "-r", "-z", "--full-tree", rev)
+    if rc != 0:
+        logger.debug("ls-tree %s failed: %s", rev, err.strip())
+        return None
+    dirs = git.sparse_checkout_dirs()
+    result = {}
+    for item in out.split("\0"):
+        meta, _, path = item.partition("\t")
+        if not path.endswith(LIBRARY_FILE_SUFFIXES):
+            continue
+        parts = meta.split()
+        if len(parts) == 3 and parts[1] == "blob" and (dirs is None or _in_cone(path, dirs)):
+            result[path] = parts[2]
+    return result
+
+
+class ParseCache:
+    """Blob-SHA keyed summaries of every library file.
+
+    Parameters
+    ----------
+    git : git_service.GitService
+    max_entries : int
+        Blobs kept (in memory and on disk); least recently used dropped.
+    """
+
+    def __init__(self, git, max_entries=20000):
+        self.git = git
+        self.max_entries = max_entries
+        self.tree = {}                 # path -> blob sha, as of the last refresh
+        self._entries = OrderedDict()  # blob sha -> FileSummary
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._loaded = False
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def load(self):
+        """Read the on-disk cache; a missing or outdated file is ignored."""
+        self._loaded = True
+        path = self.git.state_path(CACHE_FILE)
+        if not path:
+            return
+        try:
+            with open(path, "rb") as fh:
+                data = json.loads(zlib.decompress(fh.read()).decode("utf-8"))
+        except (OSError, ValueError, zlib.error):
+            return
+        if not isinstance(data, dict) or data.get("version") != PARSER_VERSION:
+            return
+        try:
+            entries = OrderedDict((sha, FileSummary.from_row(row))
+                                  for sha, row in data.get("blobs", []))
+            tree = dict(data.get("tree", {}))
+        except (TypeError, ValueError):
+            logger.debug("Ignoring malformed parse cache")
+            return
+        with self._lock:
+            self._entries = entries
+            self.tree = tree
+            self._dirty = False
+
+    def save(self):
+        """Write the cache atomically if it changed; failures are only logged."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": PARSER_VERSION,
+                "tree": self.tree,
+                "blobs": [[sha, entry.as_row()] for sha, entry in self._entries.items()],
+            }
+            self._dirty = False
+        path = self.git.state_path(CACHE_FILE, create_dir=True)
+        if not path:
+            return
+        tmp = path + ".tmp"
+        try:
+            raw = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+            with open(tmp, "wb") as fh:
+                fh.write(zlib.compress(raw.encode("utf-8"), 6))
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.debug("Cannot store parse cache: %s", exc)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def get(self, sha):
+        """Return the :class:`FileSummary` of a blob or None."""
+        with self._lock:
+            entry = self._entries.get(sha)
+            if entry is not None:
+                self._entries.move_to_end(sha)
+            return entry
+
+    def _store(self, sha, entry):
+        """Add one summary; returns the number of evicted blobs."""
+        evicted = 0
+        with self._lock:
+            self._entries[sha] = entry
+            self._entries.move_to_end(sha)
+            self._dirty = True
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def summary(self, path):
+        """Return the :class:`FileSummary` of ``path`` as of the last refresh."""
+        sha = self.tree.get(path)
+        return self.get(sha) if sha else None
+
+    def files(self):
+        """Return [(path, FileSummary)] for the last refreshed tree."""
+        with self._lock:
+            return [(path, self._entries[sha]) for path, sha in sorted(self.tree.items())
+                    if sha in self._entries]
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+    def refresh(self, rev="HEAD"):
+        """Bring the cache up to date with ``rev`` and save it.
+
+        Only blobs not yet cached are read and parsed; the paths that
+        changed are returned in :attr:`RefreshStats.changed`.
+
+        Returns
+        -------
+        RefreshStats or None
+            None when ``rev`` cannot be listed.
+        """
+        if not self._loaded:
+            self.load()
+        started = time.monotonic()
+        tree = list_library_blobs(self.git, rev)
+        if tree is None:
+            return None
+        stats = RefreshStats()
+        stats.files = len(tree)
+        missing = {}  # blob sha -> a path (the suffix picks the parser)
+        for path, sha in tree.items():
+            if self.get(sha) is not None:
+                stats.hits += 1
+            else:
+                missing[sha] = path
+        # One streaming cat-file for all new blobs: git inflates the
+        # next blob while this thread parses the current one
+        try:
+            for sha, _, otype, data in self.git.iter_objects(list(missing)):
+                path = missing.pop(sha)
+                if otype != "blob":
+                    stats.failed += 1
+                    continue
+                entry = summarize_blob(path, data)
+                if entry.error:
+                    stats.failed += 1
+                    logger.debug("Cannot parse %s: %s", path, entry.error)
+                stats.parsed += 1
+                stats.evicted += self._store(sha, entry)
+        except (OSError, EOFError) as exc:
+            logger.warning("Reading library blobs failed: %s", exc)
+        stats.failed += len(missing)
+
+        old = self.tree
+        stats.changed = sorted(p for p in set(old) | set(tree) if old.get(p) != tree.get(p))
+        with self._lock:
+            if stats.changed:
+                self._dirty = True
+            self.tree = tree
+        self.save()
+        stats.elapsed = time.monotonic() - started
+        logger.info("%s", stats.describe())
+        return stats
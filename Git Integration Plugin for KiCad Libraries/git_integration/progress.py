@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Progress parser — turns the ``--progress`` output git writes to stderr
+into :class:`ProgressEvent` objects.
+
+git redraws a progress line with ``\\r`` and finishes it with ``\\n``::
+
+    Receiving objects:  45% (450/1000), 12.34 MiB | 2.10 MiB/s\\r
+    Resolving deltas: 100% (80/80), done.\\n
+    Downloading LFS objects:  50% (3/6), 48 MB | 12 MB/s\\r
+
+:class:`LineSplitter` cuts the raw byte stream on both terminators, so
+each redraw is seen as soon as git writes it.
+"""
+
+import re
+
+_UNITS = {
+    "bytes": 1,
+    "KiB": 1024,
+    "MiB": 1024 ** 2,
+    "GiB": 1024 ** 3,
+    "TiB": 1024 ** 4,
+    # git-lfs reports decimal units
+    "B": 1,
+    "KB": 1000,
+    "MB": 1000 ** 2,
+    "GB": 1000 ** 3,
+    "TB": 1000 ** 4,
+}
+
+_PROGRESS_RE = re.compile(
+    r"^(?:remote:\s*)?"
+    r"(?P<phase>[A-Za-z][A-Za-z ]*?):\s+"
+    r"(?P<pct>\d{1,3})%\s+\((?P<done>\d+)/(?P<total>\d+)\)"
+    r"(?:,\s+(?P<size>[\d.]+)\s*(?P<size_unit>bytes|[KMGT]i?B|B))?"
+    r"(?:\s+\|\s+(?P<rate>[\d.]+)\s*(?P<rate_unit>bytes|[KMGT]i?B|B)/s)?"
+)
+# "Enumerating objects: 5, done." / "remote: Total 3 (delta 0), reused 0"
+_COUNTER_RE = re.compile(r"^(?:remote:\s*)?(?:[A-Za-z][A-Za-z ]*:\s+\d+(?:, done\.)?|Total \d+ .*)$")
+_TERMINATOR_RE = re.compile(b"[\r\n]")
+
+
+def _to_bytes(value, unit):
+    try:
+        return float(value) * _UNITS[unit]
+    except (ValueError, KeyError):
+        return 0.0
+
+
+def format_bytes(num):
+    """Return ``num`` bytes as a short human-readable string."""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if num < 1024 or unit == "GiB":
+            if unit == "B":
+                return "{n} B".format(n=int(num))
+            return "{n:.1f} {u}".format(n=num, u=unit)
+        num /= 1024.0
+
+
+class ProgressEvent:
+    """One parsed progress update.
+
+    Attributes
+    ----------
+    phase : str
+        e.g. 'Receiving objects', 'Resolving deltas', 'Writing objects'.
+    percent : int
+    done, total : int
+        Object counts.
+    transferred : float
+        Bytes transferred so far (0 when git does not report it).
+    rate : float
+        Bytes per second (0 when git does not report it).
+    remote : bool
+        True for lines relayed from the server (``remote: ...``).
+    """
+
+    __slots__ = ("phase", "percent", "done", "total", "transferred", "rate", "remote")
+
+    def __init__(self, phase, percent, done, total, transferred=0.0, rate=0.0, remote=False):
+        self.phase = phase
+        self.percent = percent
+        self.done = done
+        self.total = total
+        self.transferred = transferred
+        self.rate = rate
+        self.remote = remote
+
+    def describe(self):
+        """Return a one-line summary for the progress label."""
+        text = u"{p} {n}% ({d}/{t})".format(
+            p=self.phase, n=self.percent, d=self.done, t=self.total)
+        if self.transferred:
+            text += u" · " + format_bytes(self.transferred)
+        if self.rate:
+            text += u" · " + format_bytes(self.rate) + "/s"
+        return text
+
+    def __repr__(self):
+        return "ProgressEvent({p!r}, {n}%)".format(p=self.phase, n=self.percent)
+
+
+def parse_progress_line(line):
+    """Return a :class:`ProgressEvent` for a progress line, or None."""
+    m = _PROGRESS_RE.match(line.strip())
+    if m is None:
+        return None
+    transferred = rate = 0.0
+    if m.group("size"):
+        transferred = _to_bytes(m.group("size"), m.group("size_unit"))
+    if m.group("rate"):
+        rate = _to_bytes(m.group("rate"), m.group("rate_unit"))
+    return ProgressEvent(
+        m.group("phase").strip(),
+        min(int(m.group("pct")), 100),
+        int(m.group("done")),
+        int(m.group("total")),
+        transferred,
+        rate,
+        remote=line.lstrip().startswith("remote:"),
+    )
+
+
+def is_progress_line(line):
+    """Return True for progress/counter noise that need not be logged."""
+    text = line.strip()
+    return bool(_PROGRESS_RE.match(text) or _COUNTER_RE.match(text))
+
+
+class LineSplitter:
+    """Incrementally split a byte stream on ``\\r`` and ``\\n``.
+
+    :meth:`feed` returns ``(text, final)`` pairs; ``final`` is False for
+    ``\\r``-terminated redraws that the next line will overwrite.
+    """
+
+    def __init__(self, encoding="utf-8"):
+        self.encoding = encoding
+        self._buf = b""
+
+    def feed(self, chunk):
+        buf = self._buf + chunk
+        lines = []
+        start = 0
+        for m in _TERMINATOR_RE.finditer(buf):
+            end = m.start()
+            if end > start:
+                lines.append((buf[start:end].decode(self.encoding, "replace"),
+                              m.group() == b"\n"))
+            start = m.end()
+        self._buf = buf[start:]
+        return lines
+
+    def flush(self):
+        """Return the unterminated rest as a final line (or [])."""
+        rest, self._buf = self._buf, b""
+        if rest:
+            return [(rest.decode(self.encoding, "replace"), True)]
+        return []
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Git operation scheduler — a small bounded worker pool in front of
+GitService.
+
+* Mutating operations (fetch, pull, commit, push, ...) of one repository
+  run strictly one after another.
+* Jobs submitted with ``coalesce=True`` (the dialog's fetch, pull, push
+  and status reads) share the future of a job of the same kind and
+  repository that is still queued or running — e.g. a timer fetch while
+  a fetch is in flight, or a second status refresh.
+* Jobs are picked by priority, so a user-initiated Pull overtakes a
+  queued background fetch.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger("kicad_git_plugin.scheduler")
+
+PRIORITY_USER = 0
+PRIORITY_BACKGROUND = 10
+
+
+class _Job:
+    __slots__ = ("kind", "repo", "fn", "args", "kwargs", "future",
+                 "mutating", "key", "priority", "seq", "stale")
+
+    def __init__(self, kind, repo, fn, args, kwargs, mutating, key, priority, seq):
+        self.kind = kind
+        self.repo = repo
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.mutating = mutating
+        self.key = key
+        self.priority = priority
+        self.seq = seq
+        self.stale = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class GitScheduler:
+    """Priority job queue with per-repository serialisation.
+
+    Parameters
+    ----------
+    max_workers : int
+        Upper bound on concurrently running git operations.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max(1, max_workers)
+        self._heap = []
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._inflight = {}     # coalesce key -> _Job (queued or running)
+        self._busy_repos = set()  # repos with a running mutating job
+        self._workers = []
+        self._shutdown = False
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def submit(self, kind, fn, *args, **options):
+        """Queue ``fn(*args)`` and return a ``concurrent.futures.Future``.
+
+        Keyword options
+        ---------------
+        repo : str
+            Repository the job works on (serialisation key).
+        priority : int
+            PRIORITY_USER or PRIORITY_BACKGROUND (lower runs first).
+        mutating : bool
+            Serialise with other mutating jobs of the same repository.
+        coalesce : bool
+            Return the existing future if a job of the same kind/repo is
+            already queued or running.
+        """
+        repo = options.pop("repo", "")
+        priority = options.pop("priority", PRIORITY_BACKGROUND)
+        mutating = options.pop("mutating", False)
+        coalesce = options.pop("coalesce", False)
+        kwargs = options.pop("kwargs", {})
+        if options:
+            raise TypeError("Unknown options: " + ", ".join(sorted(options)))
+
+        key = (kind, repo) if coalesce else None
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("scheduler is shut down")
+            if key is not None:
+                existing = self._inflight.get(key)
+                if existing is not None:
+                    if priority < existing.priority and not existing.future.running():
+                        self._requeue(existing, priority)
+                    logger.debug("Coalesced %s for %s", kind, repo)
+                    return existing.future
+
+            job = _Job(kind, repo, fn, args, kwargs, mutating, key, priority, next(self._seq))
+            if key is not None:
+                self._inflight[key] = job
+            heapq.heappush(self._heap, job)
+            self._ensure_workers()
+            self._cond.notify()
+        return job.future
+
+    def is_pending(self, kind, repo=""):
+        """Return True if a coalescable job of ``kind`` is queued or running."""
+        with self._cond:
+            return (kind, repo) in self._inflight
+
+    def shutdown(self, cancel_pending=True):
+        """Stop accepting jobs; optionally cancel the ones not started yet."""
+        with self._cond:
+            self._shutdown = True
+            if cancel_pending:
+                for job in self._heap:
+                    if not job.stale:
+                        job.future.cancel()
+                self._heap = []
+                self._inflight = {
+                    k: j for k, j in self._inflight.items() if j.future.running()
+                }
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _requeue(self, job, priority):
+        """Move a queued job to a higher priority (old heap entry goes stale)."""
+        job.stale = True
+        clone = _Job(job.kind, job.repo, job.fn, job.args, job.kwargs,
+                     job.mutating, job.key, priority, next(self._seq))
+        clone.future = job.future
+        if job.key is not None:
+            self._inflight[job.key] = clone
+        heapq.heappush(self._heap, clone)
+
+    def _ensure_workers(self):
+        self._workers = [t for t in self._workers if t.is_alive()]
+        busy = len(self._workers)
+        if busy < self.max_workers:
+            t = threading.Thread(
+                target=self._worker_loop,
+                name="git-scheduler-{n}".format(n=busy),
+                daemon=True,
+            )
+            self._workers.append(t)
+            t.start()
+
+    def _next_job(self):
+        """Pop the best runnable job (caller holds the lock), or None."""
+        deferred = []
+        job = None
+        while self._heap:
+            candidate = heapq.heappop(self._heap)
+            if candidate.stale:
+                continue
+            if candidate.mutating and candidate.repo in self._busy_repos:
+                deferred.append(candidate)
+                continue
+            job = candidate
+            break
+        for d in deferred:
+            heapq.heappush(self._heap, d)
+        return job
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._shutdown and not self._heap:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+                if not job.future.set_running_or_notify_cancel():
+                    self._finish(job)
+                    continue
+                if job.mutating:
+                    self._busy_repos.add(job.repo)
+
+            logger.debug("Running %s (%s)", job.kind, job.repo)
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except BaseException as exc:
+                logger.exception("Scheduled %s failed", job.kind)
+                job.future.set_exception(exc)
+            else:
+                job.future.set_result(result)
+
+            with self._cond:
+                if job.mutating:
+                    self._busy_repos.discard(job.repo)
+                self._finish(job)
+
+    def _finish(self, job):
+        if job.key is not None and self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+        self._cond.notify_all()
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Search index — find which library holds a symbol or footprint.
+
+Words of symbol names, keywords, descriptions, the Value / Footprint /
+Datasheet properties and footprint names go into one inverted index
+(word → entry ids) over all configured repositories. The entries come
+from each repository's :class:`parse_cache.ParseCache`; repositories are
+refreshed in parallel on the :class:`multi_repo.RepoSet` pool, and after
+a pull or commit only the paths that changed are re-indexed.
+
+A query matches entries containing every query word as a word prefix
+(``stm32 lqfp`` finds ``STM32F103C8Tx`` with footprint ``LQFP-48``).
+Prefixes are looked up by bisecting the sorted word list, so a query
+touches only the postings it needs.
+"""
+
+import bisect
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+
+from .multi_repo import RepoResult, repo_name
+from .parse_cache import ParseCache
+
+logger = logging.getLogger("kicad_git_plugin.search_index")
+
+_WORD_RE = re.compile(r"[^\W_]+", re.U)
+# Properties whose words are indexed (KiCad 6/7 and 8 names, footprint descr/tags)
+SEARCH_PROPERTIES = ("Value", "Footprint", "Datasheet", "ki_keywords", "ki_description",
+                     "Description", "Keywords")
+
+
+def words(text):
+    """Return the lower-case words of ``text`` (letters and digits)."""
+    return _WORD_RE.findall(text.lower())
+
+
+def library_name(path):
+    """``sym/Lib_MCU.kicad_sym`` → ``Lib_MCU``, ``Foo.pretty/R.kicad_mod`` → ``Foo``."""
+    parts = path.split("/")
+    if len(parts) > 1 and parts[-2].endswith(".pretty"):
+        return parts[-2][:-len(".pretty")]
+    return os.path.splitext(parts[-1])[0]
+
+
+class SearchEntry:
+    """One symbol or footprint in the index.
+
+    Attributes
+    ----------
+    repo, path : str
+        Repository and repository-relative file.
+    kind : str
+        ``'symbol'`` or ``'footprint'``.
+    name : str
+    value, footprint, description : str
+    tokens : tuple of str
+        Indexed words (kept to remove the entry again).
+    """
+
+    __slots__ = ("repo", "path", "kind", "name", "value", "footprint", "description",
+                 "tokens", "_lname")
+
+    def __init__(self, repo, path, kind, item):
+        props = item.properties
+        self.repo = repo
+        self.path = path
+        self.kind = kind
+        self.name = item.name
+        self.value = props.get("Value", "")
+        self.footprint = props.get("Footprint", "")
+        self.description = (props.get("Description") or props.get("ki_description") or "")
+        text = [item.name] + [props[k] for k in SEARCH_PROPERTIES if props.get(k)]
+        self.tokens = tuple(set(words(" ".join(text))))
+        self._lname = item.name.lower()
+
+    @property
+    def library(self):
+        return library_name(self.path)
+
+    @property
+    def lib_id(self):
+        """``Library:Name`` as KiCad references it."""
+        return u"{l}:{n}".format(l=self.library, n=self.name)
+
+    def rank(self, query):
+        """Sort key: exact name, name prefix, name contains, other fields."""
+        if self._lname == query:
+            return (0, self._lname)
+        if self._lname.startswith(query):
+            return (1, self._lname)
+        if query in self._lname:
+            return (2, self._lname)
+        return (3, self._lname)
+
+    def __repr__(self):
+        return "SearchEntry({i!r}, {k})".format(i=self.lib_id, k=self.kind)
+
+
+class SearchIndex:
+    """Inverted index of symbols and footprints in all repositories.
+
+    Parameters
+    ----------
+    repos : multi_repo.RepoSet
+    max_files : int
+        ``max_entries`` of every repository's parse cache.
+    """
+
+    def __init__(self, repos, max_files=20000):
+        self.repos = repos
+        self.max_files = max_files
+        self._caches = {}     # repo path -> ParseCache
+        self._lock = threading.Lock()
+        self._entries = []    # id -> SearchEntry or None (freed)
+        self._free = []       # reusable ids
+        self._files = {}      # (repo, path) -> [ids]
+        self._postings = {}   # word -> set of ids
+        self._words = None    # sorted words, rebuilt lazily after changes
+        self._indexed = set()  # repositories indexed at least once
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries) - len(self._free)
+
+    def cache(self, repo):
+        """Return the ParseCache of one repository."""
+        with self._lock:
+            cache = self._caches.get(repo)
+            if cache is None:
+                cache = self._caches[repo] = ParseCache(self.repos.service(repo), self.max_files)
+            return cache
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+    def _remove_file(self, key):
+        for eid in self._files.pop(key, ()):
+            for word in self._entries[eid].tokens:
+                ids = self._postings.get(word)
+                if ids is not None:
+                    ids.discard(eid)
+                    if not ids:
+                        del self._postings[word]
+                        self._words = None
+            self._entries[eid] = None
+            self._free.append(eid)
+
+    def _add(self, entry):
+        if self._free:
+            eid = self._free.pop()
+            self._entries[eid] = entry
+        else:
+            eid = len(self._entries)
+            self._entries.append(entry)
+        for word in entry.tokens:
+            ids = self._postings.get(word)
+            if ids is None:
+                ids = self._postings[word] = set()
+                self._words = None
+            ids.add(eid)
+        return eid
+
+    def update(self, repo, paths):
+        """Re-index ``paths`` of ``repo`` from its parse cache.
+
+        Paths no longer in the cached tree are dropped from the index.
+        """
+        cache = self.cache(repo)
+        fresh = {}
+        for path in paths:
+            summary = cache.summary(path)
+            if summary is not None:
+                fresh[path] = [SearchEntry(repo, path, summary.kind, item)
+                               for item in summary.items]
+        with self._lock:
+            for path in paths:
+                self._remove_file((repo, path))
+                entries = fresh.get(path)
+                if entries:
+                    self._files[(repo, path)] = [self._add(e) for e in entries]
+            self._indexed.add(repo)
+
+    def drop_repo(self, repo):
+        """Forget everything indexed for ``repo``."""
+        with self._lock:
+            for key in [k for k in self._files if k[0] == repo]:
+                self._remove_file(key)
+            self._indexed.discard(repo)
+            self._caches.pop(repo, None)
+
+    def _refresh_repo(self, svc):
+        repo = svc.get_repo_path()
+        if not svc.has_repo():
+            return RepoResult(repo, False, u"Репозиторий не найден в {p}".format(p=repo))
+        cache = self.cache(repo)
+        stats = cache.refresh()
+        if stats is None:
+            return RepoResult(repo, False, u"Не удалось прочитать HEAD")
+        with self._lock:
+            first = repo not in self._indexed
+        # First pass indexes the whole tree, later ones only what changed
+        self.update(repo, sorted(cache.tree) if first else stats.changed)
+        return RepoResult(repo, True, stats.describe())
+
+    def refresh(self, paths=None):
+        """Refresh parse caches and the index of ``paths`` (all repositories
+        by default) in parallel.
+
+        Returns
+        -------
+        list of multi_repo.RepoResult
+        """
+        if paths is None:
+            configured = set(self.repos.paths)
+            with self._lock:
+                gone = [r for r in self._indexed if r not in configured]
+            for repo in gone:
+                self.drop_repo(repo)
+        started = time.monotonic()
+        results = self.repos.run_all(self._refresh_repo, paths)
+        logger.info("Search index: %d entries, refreshed in %.2fs",
+                    len(self), time.monotonic() - started)
+        return results
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+    def _matching(self, word):
+        """Union of the postings of all words starting with ``word``."""
+        lo = bisect.bisect_left(self._words, word)
+        hi = bisect.bisect_left(self._words, word + u"\uffff", lo)
+        if hi - lo == 1:
+            return set(self._postings[self._words[lo]])
+        return set().union(*[self._postings[w] for w in self._words[lo:hi]])
+
+    def search(self, query, limit=200):
+        """Return ``(entries, total)`` for a query.
+
+        Every query word must prefix some word of the entry. At most
+        ``limit`` entries are returned, best name matches first; ``total``
+        counts all matches.
+        """
+        terms = sorted(set(words(query)), key=len, reverse=True)
+        if not terms:
+            return [], 0
+        with self._lock:
+            if self._words is None:
+                self._words = sorted(self._postings)
+            ids = None
+            for term in terms:
+                found = self._matching(term)
+                ids = found if ids is None else ids & found
+                if not ids:
+                    return [], 0
+            entries = [self._entries[eid] for eid in ids]
+        needle = query.strip().lower()
+        best = heapq.nsmallest(limit, entries, key=lambda e: e.rank(needle))
+        return best, len(entries)
+
+    def describe(self):
+        with self._lock:
+            repos = sorted(self._indexed)
+        return u"Индекс: {n} символов и футпринтов в {r}".format(
+            n=len(self), r=u", ".join(repo_name(r) for r in repos) or u"—")
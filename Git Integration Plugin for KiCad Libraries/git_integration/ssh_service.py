@@ -6,12 +6,110 @@ SSH service — key generation, ssh config management, connection test.
 import logging
 import os
 import re
+import socket
+import stat
 import subprocess
 
 logger = logging.getLogger("kicad_git_plugin.ssh")
 
 _SSH_CONFIG_MARKER = "# KiCad Git Integration Plugin"
 
+# ControlMaster sockets live here; %C is OpenSSH's hash of
+# local host + remote host + port + user, i.e. one socket per host.
+CONTROL_DIR = "~/.ssh/kicad_cm"
+CONTROL_PATH = CONTROL_DIR + "/%C"
+
+
+def multiplex_supported():
+    """Return True if the platform's OpenSSH supports ControlMaster."""
+    return os.name != "nt"  # Win32-OpenSSH has no connection sharing
+
+
+def multiplex_options(config):
+    """Return ``-o`` options enabling connection sharing, or [] when off."""
+    if not config.get_ssh_multiplex_enabled() or not multiplex_supported():
+        return []
+    return [
+        "-o", "ControlMaster=auto",
+        "-o", "ControlPath={p}".format(p=os.path.expanduser(CONTROL_PATH)),
+        "-o", "ControlPersist={t}".format(t=config.get_ssh_control_persist()),
+    ]
+
+
+def ensure_control_dir():
+    """Create the control socket directory (0700) and return its path."""
+    path = os.path.expanduser(CONTROL_DIR)
+    if not os.path.isdir(path):
+        os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def live_control_sockets():
+    """Return the control sockets that currently accept connections."""
+    path = os.path.expanduser(CONTROL_DIR)
+    try:
+        names = os.listdir(path)
+    except OSError:
+        return []
+    live = []
+    for name in names:
+        full = os.path.join(path, name)
+        if _socket_alive(full):
+            live.append(full)
+    return live
+
+
+def cleanup_stale_control_sockets():
+    """Remove sockets left behind by masters that are gone.
+
+    Returns
+    -------
+    int
+        Number of removed sockets.
+    """
+    path = os.path.expanduser(CONTROL_DIR)
+    try:
+        names = os.listdir(path)
+    except OSError:
+        return 0
+    removed = 0
+    for name in names:
+        full = os.path.join(path, name)
+        try:
+            if not stat.S_ISSOCK(os.lstat(full).st_mode):
+                continue
+        except OSError:
+            continue
+        if _socket_alive(full):
+            continue
+        try:
+            os.remove(full)
+            removed += 1
+        except OSError as exc:
+            logger.debug("Cannot remove stale socket %s: %s", full, exc)
+    if removed:
+        logger.info("Removed %d stale SSH control socket(s)", removed)
+    return removed
+
+
+def _socket_alive(path):
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+    try:
+        if not stat.S_ISSOCK(os.lstat(path).st_mode):
+            return False
+    except OSError:
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(0.5)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
 
 class SSHService:
     """Manages SSH keys and ``~/.ssh/config`` for the plugin."""
@@ -203,6 +301,16 @@ class SSHService:
             user=user,
             key=key_path,
         )
+        if self.config.get_ssh_multiplex_enabled() and multiplex_supported():
+            try:
+                ensure_control_dir()
+            except Exception as exc:
+                return (False, "Не удалось создать {d}: {e}".format(d=CONTROL_DIR, e=exc))
+            block += (
+                "    ControlMaster auto\n"
+                "    ControlPath {path}\n"
+                "    ControlPersist {persist}\n"
+            ).format(path=CONTROL_PATH, persist=self.config.get_ssh_control_persist())
 
         # Read existing config
         existing = ""
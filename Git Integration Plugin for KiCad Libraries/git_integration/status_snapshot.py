@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Status snapshot — the last known branch, ahead/behind, dirty counts and
+fetch time, kept in ``.git/kicad_git_plugin/status_snapshot.json`` so
+the dialog can show something useful before the first ``git status``
+of the session has finished.
+"""
+
+import json
+import logging
+import os
+import time
+
+from .git_status import GitStatus
+
+logger = logging.getLogger("kicad_git_plugin.snapshot")
+
+SNAPSHOT_FILE = "status_snapshot.json"
+_VERSION = 1
+
+
+class StatusSnapshot:
+    """Counts-only view of a :class:`git_status.GitStatus`."""
+
+    __slots__ = ("branch", "upstream", "ahead", "behind", "staged", "modified",
+                 "untracked", "unmerged", "last_fetch_time", "saved_at")
+
+    def __init__(self, branch="", upstream="", ahead=0, behind=0, staged=0, modified=0,
+                 untracked=0, unmerged=0, last_fetch_time=None, saved_at=0.0):
+        self.branch = branch
+        self.upstream = upstream
+        self.ahead = ahead
+        self.behind = behind
+        self.staged = staged
+        self.modified = modified
+        self.untracked = untracked
+        self.unmerged = unmerged
+        self.last_fetch_time = last_fetch_time
+        self.saved_at = saved_at
+
+    @classmethod
+    def from_status(cls, st, last_fetch_time=None):
+        c = st.counts
+        return cls(st.branch, st.upstream, st.ahead, st.behind, c.staged, c.modified,
+                   c.untracked, c.unmerged, last_fetch_time, time.time())
+
+    def as_status(self):
+        """Return a :class:`GitStatus` with these counts and no entries."""
+        st = GitStatus()
+        st.branch, st.upstream = self.branch, self.upstream
+        st.ahead, st.behind = self.ahead, self.behind
+        c = st.counts
+        c.staged, c.modified = self.staged, self.modified
+        c.untracked, c.unmerged = self.untracked, self.unmerged
+        return st
+
+    def as_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["version"] = _VERSION
+        return data
+
+
+def load_snapshot(git):
+    """Return the stored :class:`StatusSnapshot` or None."""
+    path = git.state_path(SNAPSHOT_FILE)
+    if not path:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != _VERSION:
+        return None
+    try:
+        return StatusSnapshot(
+            str(data.get("branch", "")),
+            str(data.get("upstream", "")),
+            int(data.get("ahead", 0)),
+            int(data.get("behind", 0)),
+            int(data.get("staged", 0)),
+            int(data.get("modified", 0)),
+            int(data.get("untracked", 0)),
+            int(data.get("unmerged", 0)),
+            data.get("last_fetch_time"),
+            float(data.get("saved_at", 0.0)),
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def save_snapshot(git, snapshot):
+    """Write ``snapshot`` atomically; failures are only logged."""
+    path = git.state_path(SNAPSHOT_FILE, create_dir=True)
+    if not path:
+        return
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(snapshot.as_dict(), fh)
+        os.replace(tmp, path)
+    except OSError as exc:
+        logger.debug("Cannot store status snapshot: %s", exc)
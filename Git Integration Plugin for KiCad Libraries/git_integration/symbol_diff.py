@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Symbol diff service — turns changed ``.kicad_sym`` paths of the working
+tree into "3 символа изменено в Lib_MCU.kicad_sym".
+
+The HEAD side is read through the cat-file pool as one blob. The
+working-tree side is streamed from disk: hashed like ``git hash-object``
+and indexed chunk by chunk, with only the spans of modified symbols read
+back. Symbol indexes are cached by blob SHA and finished diffs by the
+(old, new) SHA pair, so the status timer and the commit dialog reuse
+each other's work.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from .kicad_sym import LibraryDiff, SExprError, diff_libraries, index_symbols, index_symbols_stream
+
+logger = logging.getLogger("kicad_git_plugin.symbol_diff")
+
+SYMBOL_SUFFIX = ".kicad_sym"
+# Read size for working-tree libraries (hashing and indexing)
+READ_CHUNK = 1 << 20
+
+
+def blob_sha(data):
+    """Return the git blob id of ``data`` (same as ``git hash-object``)."""
+    sha = hashlib.sha1(b"blob " + str(len(data)).encode("ascii") + b"\0")
+    sha.update(data)
+    return sha.hexdigest()
+
+
+class WorktreeFile:
+    """A working-tree file read in chunks instead of loaded whole.
+
+    Calling it with ``(start, end)`` returns that byte range, as
+    :func:`kicad_sym.diff_libraries` expects of a file not kept in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def chunks(self):
+        with open(self.path, "rb") as fh:
+            while True:
+                chunk = fh.read(READ_CHUNK)
+                if not chunk:
+                    return
+                yield chunk
+
+    def blob_sha(self):
+        """Return the git blob id of the file, like :func:`blob_sha`."""
+        sha = hashlib.sha1(b"blob " + str(os.path.getsize(self.path)).encode("ascii") + b"\0")
+        for chunk in self.chunks():
+            sha.update(chunk)
+        return sha.hexdigest()
+
+    def __call__(self, start, end):
+        with open(self.path, "rb") as fh:
+            fh.seek(start)
+            return fh.read(end - start)
+
+
+def plural(n, one, few, many):
+    """Russian plural form for ``n``: 1 символ, 3 символа, 5 символов."""
+    if n % 10 == 1 and n % 100 != 11:
+        return one
+    if 2 <= n % 10 <= 4 and not 12 <= n % 100 <= 14:
+        return few
+    return many
+
+
+def summary_line(diff):
+    """Return ``'3 символа изменено в Lib_MCU.kicad_sym (+1 −0 ~2)'``."""
+    name = os.path.basename(diff.path)
+    if diff.error:
+        return u"{f}: не удалось разобрать ({e})".format(f=name, e=diff.error)
+    if not diff.count:
+        return u"{f}: символы не изменены".format(f=name)
+    return u"{n} {w} в {f} (+{a} −{r} ~{m})".format(
+        n=diff.count, f=name,
+        w=plural(diff.count, u"символ изменён", u"символа изменено", u"символов изменено"),
+        a=len(diff.added), r=len(diff.removed), m=len(diff.modified))
+
+
+def detail_lines(diff, limit=20):
+    """Return per-symbol lines (``+ NAME``, ``− NAME``, ``~ NAME: Value``)."""
+    lines = [u"  + " + name for name in diff.added]
+    lines += [u"  − " + name for name in diff.removed]
+    lines += [u"  ~ {n}: {d}".format(n=c.name, d=c.describe()) for c in diff.modified]
+    if len(lines) > limit:
+        rest = len(lines) - limit
+        lines = lines[:limit] + [u"  … и ещё {n}".format(n=rest)]
+    return lines
+
+
+class SymbolDiffer:
+    """Symbol-level diff of the working tree against HEAD, with caching.
+
+    Parameters
+    ----------
+    git : git_service.GitService
+    max_entries : int
+        Symbol indexes / diffs kept in memory (least recently used dropped).
+    """
+
+    def __init__(self, git, max_entries=64):
+        self.git = git
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()  # blob sha -> {name: SymbolSpan}
+        self._diffs = OrderedDict()    # (old sha, new sha, path) -> LibraryDiff
+        self._lock = threading.Lock()
+
+    def _cached(self, table, key):
+        with self._lock:
+            value = table.get(key)
+            if value is not None:
+                table.move_to_end(key)
+            return value
+
+    def _store(self, table, key, value):
+        with self._lock:
+            table[key] = value
+            table.move_to_end(key)
+            while len(table) > self.max_entries:
+                table.popitem(last=False)
+
+    def _index(self, sha, data):
+        index = self._cached(self._indexes, sha)
+        if index is None:
+            if isinstance(data, WorktreeFile):
+                index = index_symbols_stream(data.chunks())
+            else:
+                index = index_symbols(data)
+            self._store(self._indexes, sha, index)
+        return index
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def diff_blobs(self, path, old, new):
+        """Diff two versions given as ``(sha, data)`` or None (absent).
+
+        ``data`` is the content as bytes or a :class:`WorktreeFile`.
+
+        Returns
+        -------
+        kicad_sym.LibraryDiff
+        """
+        key = (old[0] if old else "", new[0] if new else "", path)
+        diff = self._cached(self._diffs, key)
+        if diff is not None:
+            return diff
+        try:
+            old_index = self._index(old[0], old[1]) if old else {}
+            new_index = self._index(new[0], new[1]) if new else {}
+        except SExprError as exc:
+            old_index = new_index = None
+            logger.debug("Cannot index %s: %s", path, exc)
+        diff = diff_libraries(path, old[1] if old else None, new[1] if new else None,
+                              old_index, new_index)
+        if not diff.error:
+            self._store(self._diffs, key, diff)
+        return diff
+
+    def diff_path(self, path, old_path=None, rev="HEAD"):
+        """Diff ``rev:old_path`` against the working-tree file ``path``."""
+        obj = self.git.read_object("{r}:{p}".format(r=rev, p=old_path or path))
+        old = (obj[0], obj[2]) if obj is not None and obj[1] == "blob" else None
+        new = None
+        data = WorktreeFile(os.path.join(self.git.get_repo_path(), path))
+        try:
+            new = (data.blob_sha(), data)
+        except OSError:
+            pass  # deleted in the working tree
+        try:
+            return self.diff_blobs(path, old, new)
+        except OSError as exc:
+            # Changed or removed while it was being read; the next refresh retries
+            diff = LibraryDiff(path)
+            diff.error = str(exc)
+            return diff
+
+    def summarize(self, st=None):
+        """Return a LibraryDiff for every changed ``.kicad_sym`` path.
+
+        Parameters
+        ----------
+        st : git_status.GitStatus, optional
+            Read from git when omitted.
+        """
+        if st is None:
+            st = self.git.get_status()
+        diffs = []
+        for path, entry in sorted(st.entries.items()):
+            if not path.endswith(SYMBOL_SUFFIX) or entry.is_unmerged:
+                continue
+            try:
+                diffs.append(self.diff_path(path, entry.orig_path or None))
+            except Exception:
+                logger.exception("Symbol diff failed for %s", path)
+        return diffs
@@ -13,9 +13,26 @@ import time
 
 import wx
 
+from .async_git import CANCELLED_MESSAGE, AsyncBridge, AsyncGitService, CancelToken
+from .fetch_policy import FetchPolicy
+from .git_service import GitService
+from .lfs_report import migration_report
+from .multi_repo import RepoSet, repo_name
+from .scheduler import PRIORITY_BACKGROUND, PRIORITY_USER, GitScheduler
+from .search_index import SearchIndex
+from .ssh_service import cleanup_stale_control_sockets, multiplex_supported
+from .status_snapshot import StatusSnapshot, load_snapshot, save_snapshot
+from .symbol_diff import SYMBOL_SUFFIX, SymbolDiffer, detail_lines, summary_line
+from .watcher import StatusTracker
+
 logger = logging.getLogger("kicad_git_plugin.ui")
 
 
+def _plain_paths(paths):
+    """Paths that are not symbol libraries (those get a per-symbol summary)."""
+    return [p for p in paths if not p.endswith(SYMBOL_SUFFIX)]
+
+
 # ======================================================================
 #  MainDialog
 # ======================================================================
@@ -33,25 +50,61 @@ class MainDialog(wx.Dialog):
         self.git = git
         self.ssh = ssh
         self._last_fetch_time = None
+        # Created and used on scheduler workers only (inotify setup walks the tree)
+        self._tracker = None
+        self._tracker_lock = threading.Lock()
+        # All git work goes through one bounded, per-repo serial scheduler
+        self.scheduler = GitScheduler(max_workers=2)
+        self._fetch_future = None
+        # Network/mutating operations run as coroutines on an asyncio
+        # loop thread so the Cancel button can kill them
+        self._bridge = AsyncBridge()
+        self.async_git = AsyncGitService(self.git)
+        self._tokens = {}  # kind -> (CancelToken, Future)
+        # Extra library repositories ([repository] extra_paths)
+        self.repos = RepoSet(self.config, primary=self.git, bridge=self._bridge)
+        self._repo_rows = {}  # path -> ListCtrl row
+        # Per-symbol view of changed .kicad_sym files (cached by blob SHA)
+        self.symbol_diff = SymbolDiffer(self.git)
+        # Symbol / footprint search over all repositories (summaries cached by blob SHA)
+        self.search_index = SearchIndex(self.repos, self.config.get_parse_cache_size())
+        self._search_call = None
+        self._search_hits = []
 
         self.SetMinSize((500, 400))
         self._build_ui()
+        self._layout_repo_table()
         self.Centre()
 
         # Check git availability
         self._git_available = self.git.git_available()
 
-        # Initial refresh (local, fast)
+        # Last known status first, then a fresh one from a worker
+        self._show_snapshot()
         wx.CallAfter(self._on_refresh_status)
-        # Background fetch
-        wx.CallAfter(self._start_bg_fetch)
 
-        # Periodic fetch timer
+        # Sockets of ControlMaster processes that died with the machine
+        if self.config.get_ssh_multiplex_enabled():
+            self.scheduler.submit("ssh-cleanup", cleanup_stale_control_sockets)
+
+        # Keep the merge driver path valid after KiCad / plugin upgrades
+        if self.config.is_configured():
+            self.scheduler.submit("merge-driver", self.git.refresh_merge_driver,
+                                  repo=self.config.get_repo_path(), mutating=True)
+            self._refresh_search_index()
+
+        # Background fetch: one-shot timer re-armed after every fetch with
+        # jitter / backoff from FetchPolicy (first fetch is jittered too)
+        self._fetch_policy = FetchPolicy(self.git, self.config)
         self._fetch_timer = wx.Timer(self)
         self.Bind(wx.EVT_TIMER, self._on_fetch_timer, self._fetch_timer)
-        interval_ms = self.config.get_fetch_interval() * 1000
-        if interval_ms >= 10000:  # min 10 sec
-            self._fetch_timer.Start(interval_ms)
+        self._schedule_fetch(self._fetch_policy.initial_delay())
+
+        # Working-tree watch: re-read status only when files changed
+        self._status_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self._on_status_timer, self._status_timer)
+        if self.config.get_status_watch_enabled():
+            self._status_timer.Start(self.config.get_status_poll_interval() * 1000)
 
         # Close handler
         self.Bind(wx.EVT_CLOSE, self._on_close)
@@ -94,7 +147,47 @@ class MainDialog(wx.Dialog):
         self.btn_status = wx.Button(panel, label="Status")
         for btn in (self.btn_pull, self.btn_commit, self.btn_push, self.btn_status):
             btn_row.Add(btn, 0, wx.ALL, 4)
-        vbox.Add(btn_row, 0, wx.LEFT | wx.RIGHT | wx.TOP, 4)
+        btn_row.AddStretchSpacer()
+        self.btn_cancel = wx.Button(panel, label=u"Отмена")
+        self.btn_cancel.Enable(False)
+        btn_row.Add(self.btn_cancel, 0, wx.ALL, 4)
+        vbox.Add(btn_row, 0, wx.LEFT | wx.RIGHT | wx.TOP | wx.EXPAND, 4)
+
+        # --- Transfer progress ---
+        progress_row = wx.BoxSizer(wx.HORIZONTAL)
+        self.gauge = wx.Gauge(panel, range=100, size=(160, -1))
+        self.lbl_progress = wx.StaticText(panel, label="")
+        progress_row.Add(self.gauge, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 8)
+        progress_row.Add(self.lbl_progress, 1, wx.ALIGN_CENTER_VERTICAL)
+        vbox.Add(progress_row, 0, wx.LEFT | wx.RIGHT | wx.EXPAND, 8)
+
+        # --- Per-repository table (only with several repositories) ---
+        self.lst_repos = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL, size=(-1, 120))
+        for col, (title, width) in enumerate((
+                (u"Репозиторий", 150), (u"Ветка", 80), (u"\u2B07", 40), (u"\u2B06", 40),
+                (u"Изменено", 70), (u"Новых", 55), (u"Результат", 220))):
+            self.lst_repos.InsertColumn(col, title, width=width)
+        self.chk_all_repos = wx.CheckBox(panel, label=u"Pull / Push во всех репозиториях")
+        self.chk_all_repos.SetValue(True)
+        vbox.Add(self.lst_repos, 0, wx.LEFT | wx.RIGHT | wx.TOP | wx.EXPAND, 8)
+        vbox.Add(self.chk_all_repos, 0, wx.LEFT | wx.TOP, 8)
+        self._panel = panel
+
+        # --- Symbol / footprint search ---
+        search_row = wx.BoxSizer(wx.HORIZONTAL)
+        self.txt_search = wx.SearchCtrl(panel, style=wx.TE_PROCESS_ENTER)
+        self.txt_search.SetDescriptiveText(u"Поиск символа или футпринта")
+        self.txt_search.ShowCancelButton(True)
+        self.lbl_search = wx.StaticText(panel, label="")
+        search_row.Add(self.txt_search, 1, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 8)
+        search_row.Add(self.lbl_search, 0, wx.ALIGN_CENTER_VERTICAL)
+        self.lst_search = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL, size=(-1, 140))
+        for col, (title, width) in enumerate((
+                (u"Имя", 170), (u"Библиотека", 130), ("Value", 110), ("Footprint", 170))):
+            self.lst_search.InsertColumn(col, title, width=width)
+        self.lst_search.Show(False)
+        vbox.Add(search_row, 0, wx.LEFT | wx.RIGHT | wx.TOP | wx.EXPAND, 8)
+        vbox.Add(self.lst_search, 0, wx.LEFT | wx.RIGHT | wx.TOP | wx.EXPAND, 8)
         vbox.Add(wx.StaticLine(panel), 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 5)
 
         # --- Output log ---
@@ -130,9 +223,14 @@ class MainDialog(wx.Dialog):
         self.btn_commit.Bind(wx.EVT_BUTTON, self._on_commit)
         self.btn_push.Bind(wx.EVT_BUTTON, self._on_push)
         self.btn_status.Bind(wx.EVT_BUTTON, self._on_status)
+        self.btn_cancel.Bind(wx.EVT_BUTTON, self._on_cancel)
         self.btn_settings.Bind(wx.EVT_BUTTON, self._on_settings)
         self.btn_ssh.Bind(wx.EVT_BUTTON, self._on_ssh_setup)
         self.btn_help.Bind(wx.EVT_BUTTON, self._on_help)
+        self.txt_search.Bind(wx.EVT_TEXT, self._on_search_text)
+        self.txt_search.Bind(wx.EVT_TEXT_ENTER, self._run_search)
+        self.txt_search.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN, self._on_search_cancel)
+        self.lst_search.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self._on_search_activated)
 
     # ------------------------------------------------------------------
     # Helpers
@@ -146,19 +244,22 @@ class MainDialog(wx.Dialog):
             btn.Enable(enabled)
 
     def _update_status_labels(self, st):
-        branch = st.get("branch", "")
+        """Refresh the status row from a :class:`GitStatus`."""
+        if self.repos.is_multi():
+            self._set_repo_row(self.git.get_repo_path(), st)
+        branch = st.branch
         if branch:
             self.lbl_branch.SetLabel("[{b}]".format(b=branch))
         else:
             self.lbl_branch.SetLabel("[нет репозитория]")
 
-        ahead = st.get("ahead", 0)
-        behind = st.get("behind", 0)
+        ahead = st.ahead
+        behind = st.behind
         self.lbl_sync.SetLabel(u"\u2B07{b} \u2B06{a}".format(a=ahead, b=behind))
 
-        n_mod = len(st.get("modified", []))
-        n_new = len(st.get("untracked", []))
-        self.lbl_dirty.SetLabel("{m} изменено, {n} новых".format(m=n_mod, n=n_new))
+        counts = st.counts
+        self.lbl_dirty.SetLabel("{m} изменено, {n} новых".format(
+            m=counts.modified, n=counts.untracked))
 
         if self._last_fetch_time:
             self.lbl_fetch_time.SetLabel(
@@ -176,12 +277,242 @@ class MainDialog(wx.Dialog):
         else:
             self.btn_push.SetLabel("Push")
 
-        n_changes = n_mod + n_new + len(st.get("staged", []))
+        n_changes = counts.total
         if n_changes > 0:
             self.btn_commit.SetLabel("Commit ({n})".format(n=n_changes))
         else:
             self.btn_commit.SetLabel("Commit")
 
+    def _submit(self, kind, fn, callback, *args, **options):
+        """Queue ``fn(*args)`` on the scheduler and deliver the result to
+        ``callback(result)`` on the UI thread.
+
+        Returns the future (possibly one already in flight).
+        """
+        options.setdefault("repo", self.config.get_repo_path())
+        if options.get("coalesce") and self.scheduler.is_pending(kind, options["repo"]):
+            # Same request already in flight — its callback will report
+            return self.scheduler.submit(kind, fn, *args, **options)
+        future = self.scheduler.submit(kind, fn, *args, **options)
+
+        def _done(f):
+            wx.CallAfter(self._deliver, kind, f, callback)
+
+        future.add_done_callback(_done)
+        return future
+
+    # ------------------------------------------------------------------
+    # Repository table
+    # ------------------------------------------------------------------
+    def _layout_repo_table(self):
+        """Show the table only when more than one repository is configured."""
+        multi = self.repos.is_multi()
+        self.lst_repos.Show(multi)
+        self.chk_all_repos.Show(multi)
+        self.lst_repos.DeleteAllItems()
+        self._repo_rows = {}
+        if multi:
+            for path in self.repos.paths:
+                self._repo_rows[path] = self.lst_repos.InsertItem(
+                    self.lst_repos.GetItemCount(), repo_name(path))
+        self._panel.Layout()
+
+    def _set_repo_row(self, path, st=None, message=None):
+        row = self._repo_rows.get(path)
+        if row is None:
+            return
+        if st is not None:
+            c = st.counts
+            for col, value in enumerate((st.branch or u"\u2014", st.behind, st.ahead,
+                                         c.modified, c.untracked), 1):
+                self.lst_repos.SetItem(row, col, str(value))
+        if message is not None:
+            self.lst_repos.SetItem(row, 6, message.strip().splitlines()[-1] if message.strip() else "")
+
+    def _fill_repo_table(self, results):
+        for res in results:
+            self._set_repo_row(res.path, res.status, res.message or None)
+
+    def _refresh_repo_table(self):
+        if not self.repos.is_multi():
+            return
+        self._submit("repos-status", self.repos.status_all, self._fill_repo_table,
+                     coalesce=True)
+
+    def _log_repo_results(self, action, results):
+        for res in results:
+            prefix = u"\u2713 " if res.ok else u"\u2717 "
+            self._log(u"{p}{a} [{n}]: {m}".format(p=prefix, a=action, n=res.name, m=res.message))
+        self._fill_repo_table(results)
+
+    def _submit_async(self, kind, coro_fn, callback, *args, **options):
+        """Like :meth:`_submit`, for an :class:`AsyncGitService` coroutine.
+
+        The scheduler still orders and serialises the job; the job itself
+        runs ``coro_fn(*args, token=..., **kwargs)`` on the asyncio bridge
+        with a :class:`CancelToken` the Cancel button can fire.
+        """
+        def _run(*a, **kw):
+            return self._bridge.run(coro_fn(*a, **kw))
+
+        return self._submit_cancellable(kind, _run, callback, *args, **options)
+
+    def _submit_cancellable(self, kind, fn, callback, *args, **options):
+        """Like :meth:`_submit` for ``fn(*args, token=..., **kwargs)``
+        (e.g. :meth:`RepoSet.pull_all`), with a :class:`CancelToken` the
+        Cancel button can fire."""
+        token = CancelToken()
+        kwargs = dict(options.pop("kwargs", {}), token=token)
+
+        def _job():
+            return fn(*args, **kwargs)
+
+        future = self._submit(kind, _job, callback, **options)
+        current = self._tokens.get(kind)
+        if current is None or current[1] is not future:
+            self._tokens[kind] = (token, future)
+            future.add_done_callback(
+                lambda f: wx.CallAfter(self._forget_token, kind, f))
+        self.btn_cancel.Enable(True)
+        return future
+
+    def _forget_token(self, kind, future):
+        if not self:
+            return
+        current = self._tokens.get(kind)
+        if current is not None and current[1] is future:
+            del self._tokens[kind]
+        self.btn_cancel.Enable(bool(self._tokens))
+
+    def _on_cancel(self, event=None):
+        """Cancel queued operations and kill the running git processes."""
+        if not self._tokens:
+            return
+        self._log(u"Отмена: " + ", ".join(sorted(self._tokens)))
+        for token, future in list(self._tokens.values()):
+            future.cancel()  # still queued → never starts
+            token.cancel()   # running → process group killed
+
+    def _deliver(self, kind, future, callback):
+        if not self:  # dialog already destroyed
+            return
+        if future.cancelled():
+            self._set_buttons_enabled(True)
+            self._reset_progress()
+            self._log(u"\u2717 {k}: {m}".format(k=kind, m=CANCELLED_MESSAGE))
+            return
+        exc = future.exception()
+        if exc is not None:
+            self._set_buttons_enabled(True)
+            self._reset_progress()
+            self._log(u"\u2717 {k}: {e}".format(k=kind, e=exc))
+            return
+        callback(future.result())
+
+    def _progress_callback(self, action):
+        """Return an ``on_progress`` callable for a worker thread.
+
+        Updates are throttled to ~10 per second before crossing to the
+        UI thread; phase changes and 100% always get through.
+        """
+        state = {"t": 0.0, "phase": None}
+
+        def _on_progress(event):
+            now = time.monotonic()
+            if (event.phase == state["phase"] and event.percent < 100
+                    and now - state["t"] < 0.1):
+                return
+            state["t"], state["phase"] = now, event.phase
+            wx.CallAfter(self._show_progress, action, event)
+
+        return _on_progress
+
+    def _show_progress(self, action, event):
+        if not self:
+            return
+        self.gauge.SetValue(event.percent)
+        self.lbl_progress.SetLabel(u"{a}: {d}".format(a=action, d=event.describe()))
+
+    def _reset_progress(self):
+        self.gauge.SetValue(0)
+        self.lbl_progress.SetLabel("")
+
+    def _get_tracker(self):
+        """Return the StatusTracker for the configured repo, or None.
+
+        Worker threads only — creating the watcher walks the tree.
+        """
+        if not self.config.get_status_watch_enabled() or not self.git.has_repo():
+            return None
+        repo = self.config.get_repo_path()
+        with self._tracker_lock:
+            if self._tracker is not None and self._tracker.repo != repo:
+                self._tracker.close()
+                self._tracker = None
+            if self._tracker is None:
+                try:
+                    self._tracker = StatusTracker(self.git)
+                except Exception as exc:
+                    logger.warning("Working-tree watcher unavailable: %s", exc)
+                    return None
+            return self._tracker
+
+    def _close_tracker(self):
+        with self._tracker_lock:
+            if self._tracker is not None:
+                self._tracker.close()
+                self._tracker = None
+
+    def _current_status(self, force=False):
+        """Return (GitStatus, changed), incrementally when possible.
+
+        Worker threads only; see :meth:`_refresh_status_async`.
+        """
+        tracker = self._get_tracker()
+        if tracker is None:
+            return (self.git.get_status(), True)
+        return tracker.refresh(force=force)
+
+    def _status_job(self, force, last_fetch_time):
+        """Scheduler job: fresh status, stored as the on-disk snapshot."""
+        st, changed = self._current_status(force)
+        if changed:
+            save_snapshot(self.git, StatusSnapshot.from_status(st, last_fetch_time))
+        return (st, changed)
+
+    def _adopt_status(self, st, last_fetch_time):
+        """Scheduler job: make a status read by fetch the current one."""
+        tracker = self._get_tracker()
+        if tracker is not None:
+            tracker.adopt(st)
+        save_snapshot(self.git, StatusSnapshot.from_status(st, last_fetch_time))
+        return (st, True)
+
+    def _refresh_status_async(self, callback, force=False, priority=PRIORITY_BACKGROUND):
+        """Read the status on a worker and pass the GitStatus to ``callback``."""
+        kind = "status-full" if force else "status"
+        # Unlike _submit, every caller gets the result of a coalesced read
+        future = self.scheduler.submit(
+            kind, self._status_job, force, self._last_fetch_time,
+            repo=self.config.get_repo_path(), priority=priority, coalesce=True,
+        )
+        future.add_done_callback(lambda f: wx.CallAfter(
+            self._deliver, kind, f, lambda res: callback(res[0])))
+        return future
+
+    def _show_snapshot(self):
+        """Fill the status row from the last persisted snapshot, if any."""
+        if not self.config.is_configured():
+            return
+        snap = load_snapshot(self.git)
+        if snap is None:
+            return
+        if snap.last_fetch_time:
+            self._last_fetch_time = snap.last_fetch_time
+        self._update_status_labels(snap.as_status())
+        self._log(u"Статус на {t} (сохранённый), обновление...".format(
+            t=time.strftime("%d.%m %H:%M", time.localtime(snap.saved_at))))
+
     # ------------------------------------------------------------------
     # Status / Fetch
     # ------------------------------------------------------------------
@@ -195,12 +526,22 @@ class MainDialog(wx.Dialog):
             self.lbl_branch.SetLabel(u"[не настроено]")
             self._log(u"Плагин не настроен. Откройте Settings.")
             return
-        st = self.git.status()
+        self._submit("refresh", self._refresh_job, self._refresh_done,
+                     self._last_fetch_time, priority=PRIORITY_USER, coalesce=True)
+
+    def _refresh_job(self, last_fetch_time):
+        """Scheduler job: status, remote info and performance-mode check."""
+        st, _changed = self._status_job(False, last_fetch_time)
+        return (st, self.git.get_remote_type(), self.git.get_remote_url(),
+                self._performance_check())
+
+    def _refresh_done(self, result):
+        st, rtype, rurl, perf = result
+        self._layout_repo_table()
         self._update_status_labels(st)
+        self._refresh_repo_table()
 
         # Show remote type
-        rtype = self.git.get_remote_type()
-        rurl = self.git.get_remote_url()
         if rtype == "https":
             self._log(u"Remote: HTTPS ({u})".format(u=rurl))
         elif rtype == "ssh":
@@ -208,52 +549,206 @@ class MainDialog(wx.Dialog):
         else:
             self._log(u"Remote: не определён")
 
+        if perf is not None:
+            wx.CallAfter(self._check_performance_mode, *perf)
+
+    def _performance_check(self):
+        """Worker part of the performance-mode check.
+
+        Returns None (nothing to do), ('ask', n_files) or ('apply', 0).
+        """
+        mode = self.config.get_performance_mode()
+        if mode == "off" or not self.git.has_repo():
+            return None
+        if mode == "ask":
+            if not self.git.is_large_repo():
+                return None
+            return ("ask", self.git.count_index_entries())
+        if self.git.performance_mode_active():
+            return None
+        return ("apply", 0)
+
+    def _check_performance_mode(self, action, n_files):
+        """Offer (or re-apply) performance mode for large repositories."""
+        if action == "ask":
+            ret = wx.MessageBox(
+                u"Репозиторий большой ({n} файлов).\n"
+                u"Включить режим производительности git "
+                u"(fsmonitor, untracked cache, index v4)?".format(n=n_files),
+                u"Режим производительности",
+                wx.YES_NO | wx.ICON_QUESTION,
+                self,
+            )
+            self.config.set("performance", "mode", "on" if ret == wx.YES else "off")
+            self.config.save()
+            if ret != wx.YES:
+                return
+        self._run_performance_mode(True)
+
+    def _run_performance_mode(self, enable):
+        self._log(u"Режим производительности: {s} ...".format(
+            s=u"включение" if enable else u"выключение"))
+
+        def _job():
+            if enable:
+                return self.git.enable_performance_mode()
+            ok, msg = self.git.disable_performance_mode()
+            return (ok, [msg])
+
+        self._submit("performance", _job, lambda res: self._performance_mode_done(*res),
+                     priority=PRIORITY_USER, mutating=True)
+
+    def _performance_mode_done(self, ok, lines):
+        prefix = u"\u2713 " if ok else u"\u2717 "
+        for line in lines:
+            self._log(prefix + line)
+
     def _on_status(self, event=None):
         if not self.config.is_configured():
             self._log("Плагин не настроен.")
             return
         self._log("--- git status ---")
-        st = self.git.status()
+        self._refresh_status_async(self._status_done, force=True, priority=PRIORITY_USER)
+        self._refresh_repo_table()
+
+    def _status_done(self, st):
         self._update_status_labels(st)
-        if st["staged"]:
-            self._log("Staged: " + ", ".join(st["staged"]))
-        if st["modified"]:
-            self._log("Modified: " + ", ".join(st["modified"]))
-        if st["untracked"]:
-            self._log("Untracked: " + ", ".join(st["untracked"]))
-        if not st["staged"] and not st["modified"] and not st["untracked"]:
+        # Symbol libraries are reported per symbol by _symbol_diff_done
+        if _plain_paths(st.staged):
+            self._log("Staged: " + ", ".join(_plain_paths(st.staged)))
+        if _plain_paths(st.modified):
+            self._log("Modified: " + ", ".join(_plain_paths(st.modified)))
+        if _plain_paths(st.untracked):
+            self._log("Untracked: " + ", ".join(_plain_paths(st.untracked)))
+        if st.counts.unmerged:
+            self._log("Conflicts: " + ", ".join(st.unmerged))
+        if any(p.endswith(SYMBOL_SUFFIX) for p in st.entries):
+            self._submit("symbol-diff", self.symbol_diff.summarize, self._symbol_diff_done, st,
+                         priority=PRIORITY_USER)
+        for lib in sorted(st.libraries):
+            c = st.libraries[lib]
+            self._log(u"  {l}: {m} изменено, {n} новых, {s} staged".format(
+                l=lib, m=c.modified, n=c.untracked, s=c.staged))
+        if st.is_clean():
             self._log("Working tree clean.")
 
+    def _symbol_diff_done(self, diffs):
+        for diff in diffs:
+            self._log(summary_line(diff))
+            for line in detail_lines(diff):
+                self._log(line)
+
     def _start_bg_fetch(self):
         if not self.config.is_configured():
             return
 
-        def _worker():
-            sync = self.git.get_sync_status()
-            wx.CallAfter(self._bg_fetch_done, sync)
-
-        t = threading.Thread(target=_worker, daemon=True)
-        t.start()
+        # Never start a fetch while the previous one is queued or running
+        if self._fetch_future is not None and not self._fetch_future.done():
+            logger.debug("Fetch already in flight, skipping timer tick")
+            return
+        self._fetch_future = self._submit_async(
+            "fetch", self.async_git.get_sync_status, self._bg_fetch_done,
+            priority=PRIORITY_BACKGROUND, mutating=True, coalesce=True,
+            kwargs={"on_progress": self._progress_callback("Fetch")},
+        )
+        # _bg_fetch_done only runs for a result; re-arm on the other outcomes
+        self._fetch_future.add_done_callback(
+            lambda f: wx.CallAfter(self._bg_fetch_settled, f))
+        extras = self.repos.paths[1:]
+        if extras:
+            # Extra repositories are fetched in parallel on the RepoSet pool
+            self._submit("fetch-extra", self.repos.fetch_all, self._extra_fetch_done, extras,
+                         priority=PRIORITY_BACKGROUND, mutating=True, coalesce=True)
+
+    def _extra_fetch_done(self, results):
+        self._fill_repo_table(results)
+        for res in results:
+            if not res.ok:
+                self._log(u"Fetch [{n}]: {m}".format(n=res.name, m=res.message))
+
+    def _bg_fetch_settled(self, future):
+        """Keep background fetch alive when the job raised or was
+        cancelled before it started (runs after :meth:`_deliver` has
+        logged it)."""
+        if not self:
+            return
+        if future.cancelled():
+            # Cancelled while queued — like a cancelled fetch, no backoff
+            self._schedule_fetch(self._fetch_policy.next_delay())
+            return
+        exc = future.exception()
+        if exc is None:
+            return  # _bg_fetch_done has re-armed the timer
+        delay = self._fetch_policy.record(False, str(exc))
+        self._rearm_fetch(delay)
 
     def _bg_fetch_done(self, sync):
+        self._reset_progress()
+        if sync.get("message") == CANCELLED_MESSAGE:
+            # A cancelled fetch is not a server failure — no backoff
+            self._log("Fetch: " + CANCELLED_MESSAGE)
+            self._schedule_fetch(self._fetch_policy.next_delay())
+            return
         self._last_fetch_time = time.time()
+        delay = self._fetch_policy.record(sync.get("success", False), sync.get("message", ""))
+        self._rearm_fetch(delay)
+        if not sync.get("success") and self._fetch_policy.failures > 1:
+            self._log(u"Следующая попытка fetch через {m} мин.".format(m=int(delay // 60) or 1))
         if sync.get("success"):
-            self._log("Fetch OK.")
+            self._log("Fetch OK: " + sync.get("message", ""))
         else:
             self._log("Fetch: " + sync.get("message", "ошибка"))
-        # refresh labels
-        st = self.git.status()
+        # refresh labels — reuse the status read by the worker if any
+        st = sync.get("status")
+        if st is None:
+            self._refresh_status_async(self._update_status_labels)
+            return
         self._update_status_labels(st)
+        self._submit("adopt", self._adopt_status, lambda res: None, st, self._last_fetch_time)
 
     # ------------------------------------------------------------------
     # Timer / Close / First-run
     # ------------------------------------------------------------------
+    def _schedule_fetch(self, delay_sec):
+        """Arm the one-shot fetch timer."""
+        if self._fetch_timer.IsRunning():
+            self._fetch_timer.Stop()
+        self._fetch_timer.StartOnce(max(int(delay_sec * 1000), 1000))
+        logger.debug("Next background fetch in %.0fs", delay_sec)
+
+    def _rearm_fetch(self, delay_sec):
+        """Schedule the next background fetch unless it is disabled."""
+        if self.config.get_fetch_interval() >= 10:  # min 10 sec
+            self._schedule_fetch(delay_sec)
+
     def _on_fetch_timer(self, event):
         self._start_bg_fetch()
 
+    def _on_status_timer(self, event):
+        if not self.config.is_configured():
+            return
+        if self.scheduler.is_pending("status", self.config.get_repo_path()):
+            return
+        self._submit("status", self._status_job, self._status_timer_done,
+                     False, self._last_fetch_time, coalesce=True)
+
+    def _status_timer_done(self, result):
+        st, changed = result
+        if changed:
+            self._update_status_labels(st)
+
     def _on_close(self, event):
         if hasattr(self, '_fetch_timer') and self._fetch_timer.IsRunning():
             self._fetch_timer.Stop()
+        if self._status_timer.IsRunning():
+            self._status_timer.Stop()
+        self.scheduler.shutdown()
+        for token, _future in list(self._tokens.values()):
+            token.cancel()
+        self._bridge.close()
+        self.repos.close()
+        self._close_tracker()
+        self.git.close()
         self.EndModal(wx.ID_CANCEL)
 
     def _first_run_check(self):
@@ -312,19 +807,36 @@ class MainDialog(wx.Dialog):
             self._log("Плагин не настроен.")
             return
         self._set_buttons_enabled(False)
+        if self._batch_mode():
+            self._log(u"Pull во всех репозиториях ...")
+            self._submit_cancellable("pull-all", self.repos.pull_all,
+                                     lambda res: self._batch_done("Pull", res),
+                                     priority=PRIORITY_USER, mutating=True, coalesce=True,
+                                     kwargs={"progress_for": self._repo_progress("Pull")})
+            return
         self._log("Pull ...")
 
-        def _worker():
-            ok, msg = self.git.pull()
-            wx.CallAfter(self._action_done, "Pull", ok, msg)
-
-        threading.Thread(target=_worker, daemon=True).start()
+        self._submit_async("pull", self.async_git.pull,
+                           lambda res: self._action_done("Pull", *res),
+                           priority=PRIORITY_USER, mutating=True, coalesce=True,
+                           kwargs={"on_progress": self._progress_callback("Pull")})
 
     def _on_commit(self, event):
         if not self.config.is_configured():
             self._log("Плагин не настроен.")
             return
-        dlg = CommitDialog(self)
+        # Show what changed per symbol before asking for the message
+        self._set_buttons_enabled(False)
+        self._submit("symbol-diff", self.symbol_diff.summarize, self._open_commit_dialog,
+                     priority=PRIORITY_USER)
+
+    def _open_commit_dialog(self, diffs):
+        self._set_buttons_enabled(True)
+        changes = []
+        for diff in diffs:
+            changes.append(summary_line(diff))
+            changes.extend(detail_lines(diff, limit=8))
+        dlg = CommitDialog(self, changes)
         if dlg.ShowModal() == wx.ID_OK:
             message = dlg.get_message()
             dlg.Destroy()
@@ -334,11 +846,9 @@ class MainDialog(wx.Dialog):
             self._set_buttons_enabled(False)
             self._log("Commit ...")
 
-            def _worker():
-                ok, msg = self.git.commit(message)
-                wx.CallAfter(self._action_done, "Commit", ok, msg)
-
-            threading.Thread(target=_worker, daemon=True).start()
+            self._submit_async("commit", self.async_git.commit,
+                               lambda res: self._action_done("Commit", *res), message,
+                               priority=PRIORITY_USER, mutating=True)
         else:
             dlg.Destroy()
 
@@ -346,9 +856,31 @@ class MainDialog(wx.Dialog):
         if not self.config.is_configured():
             self._log(u"Плагин не настроен.")
             return
-        # Block push if behind remote
-        st = self.git.status()
-        behind = st.get("behind", 0)
+        if self._batch_mode():
+            ret = wx.MessageBox(
+                u"Отправить коммиты во всех репозиториях?\n"
+                u"Репозитории, отстающие от сервера, будут пропущены.",
+                "Push",
+                wx.YES_NO | wx.ICON_QUESTION,
+                self,
+            )
+            if ret != wx.YES:
+                return
+            self._set_buttons_enabled(False)
+            self._log(u"Push во всех репозиториях ...")
+            self._submit_cancellable("push-all", self.repos.push_all,
+                                     lambda res: self._batch_done("Push", res),
+                                     priority=PRIORITY_USER, mutating=True, coalesce=True,
+                                     kwargs={"progress_for": self._repo_progress("Push")})
+            return
+        # Block push if behind remote — status is read off the UI thread
+        self._set_buttons_enabled(False)
+        self._refresh_status_async(self._confirm_push, priority=PRIORITY_USER)
+
+    def _confirm_push(self, st):
+        self._update_status_labels(st)
+        self._set_buttons_enabled(True)
+        behind = st.behind
         if behind > 0:
             wx.MessageBox(
                 u"Репозиторий отстаёт от сервера на {n} коммитов.\n"
@@ -369,27 +901,119 @@ class MainDialog(wx.Dialog):
         self._set_buttons_enabled(False)
         self._log("Push ...")
 
-        def _worker():
-            ok, msg = self.git.push()
-            wx.CallAfter(self._action_done, "Push", ok, msg)
+        self._submit_async("push", self.async_git.push,
+                           lambda res: self._action_done("Push", *res),
+                           priority=PRIORITY_USER, mutating=True, coalesce=True,
+                           kwargs={"on_progress": self._progress_callback("Push")})
 
-        threading.Thread(target=_worker, daemon=True).start()
+    def _batch_mode(self):
+        return self.repos.is_multi() and self.chk_all_repos.GetValue()
+
+    def _repo_progress(self, action):
+        """``progress_for(path)`` for :meth:`RepoSet.pull_all` / ``push_all``:
+        one throttled progress callback per repository."""
+        return lambda path: self._progress_callback(
+            u"{a} [{n}]".format(a=action, n=repo_name(path)))
+
+    def _batch_done(self, action, results):
+        self._set_buttons_enabled(True)
+        self._reset_progress()
+        self._log_repo_results(action, results)
+        failed = [r for r in results if not r.ok]
+        self._log(u"{a}: {ok} из {n} репозиториев без ошибок.".format(
+            a=action, ok=len(results) - len(failed), n=len(results)))
+        if action == "Pull" and len(failed) < len(results):
+            self._refresh_search_index()
+        for res in results:
+            if res.path == self.git.get_repo_path() and res.status is not None:
+                self._update_status_labels(res.status)
+                self._submit("adopt", self._adopt_status, lambda r: None,
+                             res.status, self._last_fetch_time)
 
     def _action_done(self, action, ok, msg):
         self._set_buttons_enabled(True)
+        self._reset_progress()
         prefix = u"\u2713 " if ok else u"\u2717 "
         self._log("{p}{a}: {m}".format(p=prefix, a=action, m=msg))
         # Refresh status labels
-        st = self.git.status()
-        self._update_status_labels(st)
+        self._refresh_status_async(self._update_status_labels, priority=PRIORITY_USER)
+        if ok and action in ("Pull", "Commit"):
+            self._refresh_search_index()
+
+    # ------------------------------------------------------------------
+    # Symbol / footprint search
+    # ------------------------------------------------------------------
+    def _refresh_search_index(self):
+        """Update the search index of all repositories in the background.
+
+        Unchanged repositories cost one ``ls-tree``; in the others only
+        the files whose blob changed are parsed and re-indexed.
+        """
+        self._submit("search-index", self.search_index.refresh, self._search_index_done,
+                     priority=PRIORITY_BACKGROUND, coalesce=True)
+
+    def _search_index_done(self, results):
+        for res in results:
+            if not res.ok:
+                self._log(u"\u2717 Индекс [{n}]: {m}".format(n=res.name, m=res.message))
+        if self.txt_search.GetValue().strip():
+            self._run_search()
+
+    def _on_search_text(self, event):
+        # Search after a short pause in typing, not on every key
+        if self._search_call is not None:
+            self._search_call.Stop()
+        self._search_call = wx.CallLater(150, self._run_search)
+
+    def _on_search_cancel(self, event):
+        self.txt_search.SetValue("")
+        self._run_search()
+
+    def _run_search(self, event=None):
+        query = self.txt_search.GetValue()
+        hits, total = self.search_index.search(query) if query.strip() else ([], 0)
+        self._search_hits = hits
+        self.lst_search.Freeze()
+        self.lst_search.DeleteAllItems()
+        for hit in hits:
+            row = self.lst_search.InsertItem(self.lst_search.GetItemCount(), hit.name)
+            self.lst_search.SetItem(row, 1, hit.library)
+            self.lst_search.SetItem(row, 2, hit.value)
+            self.lst_search.SetItem(row, 3, hit.footprint)
+        self.lst_search.Thaw()
+        if not query.strip():
+            self.lbl_search.SetLabel("")
+        elif not len(self.search_index):
+            self.lbl_search.SetLabel(u"индекс строится...")
+        elif total > len(hits):
+            self.lbl_search.SetLabel(u"{n} из {t}".format(n=len(hits), t=total))
+        else:
+            self.lbl_search.SetLabel(u"найдено: {t}".format(t=total))
+        self.lst_search.Show(bool(query.strip()))
+        self._panel.Layout()
+
+    def _on_search_activated(self, event):
+        """Copy ``Library:Name`` of the chosen entry to the clipboard."""
+        hit = self._search_hits[event.GetIndex()]
+        if wx.TheClipboard.Open():
+            wx.TheClipboard.SetData(wx.TextDataObject(hit.lib_id))
+            wx.TheClipboard.Close()
+        self._log(u"{i} ({p}) — скопировано в буфер обмена".format(i=hit.lib_id, p=hit.path))
 
     # ------------------------------------------------------------------
     # Settings / SSH / Help dialogs
     # ------------------------------------------------------------------
     def _on_settings(self, event):
         dlg = SettingsDialog(self, config=self.config, git=self.git)
+        old_mode = self.config.get_performance_mode()
         if dlg.ShowModal() == wx.ID_OK:
             self._log("Настройки сохранены.")
+            if old_mode == "on" and self.config.get_performance_mode() == "off":
+                self._run_performance_mode(False)
+            # Repository or interval may have changed
+            self._fetch_policy = FetchPolicy(self.git, self.config)
+            if self._fetch_future is None or self._fetch_future.done():
+                self._rearm_fetch(self._fetch_policy.initial_delay())
             wx.CallAfter(self._on_refresh_status)
         dlg.Destroy()
 
@@ -442,7 +1066,32 @@ class SettingsDialog(wx.Dialog):
         repo_grid.Add(self.txt_interval, 0)
         repo_grid.Add((0, 0))
 
+        self.txt_extra_repos = wx.TextCtrl(panel, style=wx.TE_MULTILINE, size=(-1, 54))
+        btn_add_repo = wx.Button(panel, label="+", size=(32, -1))
+        repo_grid.Add(wx.StaticText(panel, label=u"Доп. репозитории:"), 0, wx.ALIGN_TOP)
+        repo_grid.Add(self.txt_extra_repos, 1, wx.EXPAND)
+        repo_grid.Add(btn_add_repo, 0)
+
         repo_box.Add(repo_grid, 1, wx.ALL | wx.EXPAND, 6)
+        self.chk_performance = wx.CheckBox(
+            panel, label=u"Режим производительности (fsmonitor, untracked cache, index v4)",
+        )
+        repo_box.Add(self.chk_performance, 0, wx.LEFT | wx.BOTTOM, 6)
+        self.chk_merge_driver = wx.CheckBox(
+            panel, label=u"Слияние .kicad_sym и lib-table по символам (merge driver)",
+        )
+        self.chk_merge_driver.Enable(self.git is not None and self.git.has_repo())
+        repo_box.Add(self.chk_merge_driver, 0, wx.LEFT | wx.BOTTOM, 6)
+        clone_row = wx.BoxSizer(wx.HORIZONTAL)
+        btn_clone = wx.Button(panel, label=u"Клонировать...")
+        btn_sparse = wx.Button(panel, label=u"Библиотеки (sparse)...")
+        btn_sparse.Enable(self.git is not None and self.git.has_repo())
+        btn_lfs = wx.Button(panel, label=u"Отчёт LFS...")
+        btn_lfs.Enable(btn_sparse.IsEnabled())
+        clone_row.Add(btn_clone, 0, wx.RIGHT, 6)
+        clone_row.Add(btn_sparse, 0, wx.RIGHT, 6)
+        clone_row.Add(btn_lfs, 0)
+        repo_box.Add(clone_row, 0, wx.LEFT | wx.BOTTOM, 6)
         vbox.Add(repo_box, 0, wx.ALL | wx.EXPAND, 8)
 
         # --- Remote info (read-only) ---
@@ -497,6 +1146,11 @@ class SettingsDialog(wx.Dialog):
                 ssh_grid.Add((0, 0))
 
         ssh_box.Add(ssh_grid, 1, wx.ALL | wx.EXPAND, 6)
+        self.chk_multiplex = wx.CheckBox(
+            panel, label=u"Переиспользовать SSH-соединение (ControlMaster)",
+        )
+        self.chk_multiplex.Enable(multiplex_supported())
+        ssh_box.Add(self.chk_multiplex, 0, wx.LEFT | wx.BOTTOM, 6)
         vbox.Add(ssh_box, 0, wx.ALL | wx.EXPAND, 8)
 
         # --- Buttons ---
@@ -515,12 +1169,17 @@ class SettingsDialog(wx.Dialog):
         # --- Populate ---
         self.txt_repo.SetValue(self.config.get("repository", "path"))
         self.txt_interval.SetValue(str(self.config.get_fetch_interval()))
+        self.txt_extra_repos.SetValue("\n".join(self.config.get_extra_repo_paths()))
+        self.chk_performance.SetValue(self.config.get_performance_mode() == "on")
+        self._merge_driver = self.chk_merge_driver.IsEnabled() and self.git.merge_driver_installed()
+        self.chk_merge_driver.SetValue(self._merge_driver)
         self.txt_username.SetValue(self.config.get_credentials_username())
         self.txt_token.SetValue(self.config.get_credentials_token())
         self.txt_host.SetValue(self.config.get_server_host())
         self.txt_port.SetValue(str(self.config.get_server_port()))
         self.txt_user.SetValue(self.config.get_server_user())
         self.txt_key.SetValue(self.config.get_ssh_key_path())
+        self.chk_multiplex.SetValue(self.config.get_ssh_multiplex_enabled())
 
         # Show remote type if git service available
         self._update_remote_info()
@@ -528,7 +1187,11 @@ class SettingsDialog(wx.Dialog):
         # --- Bindings ---
         btn_ok.Bind(wx.EVT_BUTTON, self._on_save)
         btn_browse_repo.Bind(wx.EVT_BUTTON, self._on_browse_repo)
+        btn_add_repo.Bind(wx.EVT_BUTTON, self._on_add_repo)
         btn_browse_key.Bind(wx.EVT_BUTTON, self._on_browse_key)
+        btn_clone.Bind(wx.EVT_BUTTON, self._on_clone)
+        btn_sparse.Bind(wx.EVT_BUTTON, self._on_sparse)
+        btn_lfs.Bind(wx.EVT_BUTTON, self._on_lfs_report)
 
     def _update_remote_info(self):
         if self.git is not None:
@@ -553,6 +1216,37 @@ class SettingsDialog(wx.Dialog):
             self.txt_repo.SetValue(dlg.GetPath())
         dlg.Destroy()
 
+    def _on_add_repo(self, event):
+        dlg = wx.DirDialog(self, u"Выберите дополнительный репозиторий библиотек")
+        if dlg.ShowModal() == wx.ID_OK:
+            text = self.txt_extra_repos.GetValue().rstrip()
+            self.txt_extra_repos.SetValue((text + "\n" if text else "") + dlg.GetPath())
+        dlg.Destroy()
+
+    def _on_clone(self, event):
+        dest = self.txt_repo.GetValue().strip()
+        if not dest:
+            wx.MessageBox(u"Укажите путь к репозиторию.", u"Ошибка", wx.OK | wx.ICON_ERROR)
+            return
+        git = GitService(self.config, repo_path=os.path.abspath(os.path.expanduser(dest)))
+        dlg = CloneDialog(self, self.config, git)
+        if dlg.ShowModal() == wx.ID_OK and dlg.sparse:
+            sparse = SparseCheckoutDialog(self, git)
+            sparse.ShowModal()
+            sparse.Destroy()
+        dlg.Destroy()
+        git.close()
+
+    def _on_sparse(self, event):
+        dlg = SparseCheckoutDialog(self, self.git)
+        dlg.ShowModal()
+        dlg.Destroy()
+
+    def _on_lfs_report(self, event):
+        dlg = LfsReportDialog(self, self.git)
+        dlg.ShowModal()
+        dlg.Destroy()
+
     def _on_browse_key(self, event):
         dlg = wx.FileDialog(
             self, u"Выберите SSH ключ",
@@ -601,13 +1295,41 @@ class SettingsDialog(wx.Dialog):
                 if ret != wx.YES:
                     return
 
+        # Extra repositories: same warning
+        extra = self.txt_extra_repos.GetValue().splitlines()
+        missing = [p.strip() for p in extra
+                   if p.strip() and not os.path.isdir(os.path.join(os.path.expanduser(p.strip()), ".git"))]
+        if missing:
+            ret = wx.MessageBox(
+                u"Не являются git-репозиториями:\n{p}\n\n"
+                u"Продолжить сохранение?".format(p="\n".join(missing)),
+                u"Предупреждение",
+                wx.YES_NO | wx.ICON_WARNING,
+            )
+            if ret != wx.YES:
+                return
+
         # Save all settings
         self.config.set("repository", "path", repo)
         self.config.set("fetch", "interval_sec", str(interval))
+        self.config.set_extra_repo_paths(extra)
+        if self.chk_performance.GetValue():
+            self.config.set("performance", "mode", "on")
+        elif self.config.get_performance_mode() == "on":
+            self.config.set("performance", "mode", "off")
         self.config.set("server", "host", self.txt_host.GetValue().strip())
         self.config.set("server", "port", str(port))
         self.config.set("server", "user", self.txt_user.GetValue().strip() or "git")
         self.config.set("ssh", "key_path", self.txt_key.GetValue().strip())
+        self.config.set("ssh", "multiplex", "1" if self.chk_multiplex.GetValue() else "0")
+
+        if self.chk_merge_driver.GetValue() != self._merge_driver:
+            if self.chk_merge_driver.GetValue():
+                ok, msg = self.git.install_merge_driver()
+            else:
+                ok, msg = self.git.uninstall_merge_driver()
+            wx.MessageBox(msg, u"Готово" if ok else u"Ошибка",
+                          wx.OK | (wx.ICON_INFORMATION if ok else wx.ICON_WARNING))
 
         username = self.txt_username.GetValue().strip()
         token = self.txt_token.GetValue().strip()
@@ -637,6 +1359,255 @@ class SettingsDialog(wx.Dialog):
         self.EndModal(wx.ID_OK)
 
 
+# ======================================================================
+#  CloneDialog
+# ======================================================================
+class CloneDialog(wx.Dialog):
+    """Clone the library repository, optionally as a partial clone."""
+
+    _FILTERS = [
+        (u"Полный клон", ""),
+        (u"Без содержимого файлов (blob:none)", "blob:none"),
+        (u"Файлы до 1 МБ (blob:limit=1m)", "blob:limit=1m"),
+    ]
+
+    def __init__(self, parent, config, git):
+        super(CloneDialog, self).__init__(
+            parent,
+            title=u"Клонирование репозитория",
+            size=(520, 260),
+            style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER,
+        )
+        self.config = config
+        self.git = git
+        self.sparse = False
+        self._build_ui()
+        self.Centre()
+
+    def _build_ui(self):
+        panel = wx.Panel(self)
+        vbox = wx.BoxSizer(wx.VERTICAL)
+        grid = wx.FlexGridSizer(cols=2, vgap=6, hgap=6)
+        grid.AddGrowableCol(1, 1)
+
+        self.txt_url = wx.TextCtrl(panel)
+        self.cho_filter = wx.Choice(panel, choices=[label for label, _ in self._FILTERS])
+        grid.Add(wx.StaticText(panel, label=u"URL:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.txt_url, 1, wx.EXPAND)
+        grid.Add(wx.StaticText(panel, label=u"Куда:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(wx.StaticText(panel, label=self.git.get_repo_path()), 1, wx.EXPAND)
+        grid.Add(wx.StaticText(panel, label=u"Загрузка:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.cho_filter, 1, wx.EXPAND)
+        vbox.Add(grid, 0, wx.ALL | wx.EXPAND, 10)
+
+        self.chk_sparse = wx.CheckBox(panel, label=u"Выбрать библиотеки после клонирования (sparse checkout)")
+        vbox.Add(self.chk_sparse, 0, wx.LEFT | wx.RIGHT, 10)
+
+        self.lbl_result = wx.StaticText(panel, label="")
+        vbox.Add(self.lbl_result, 0, wx.ALL | wx.EXPAND, 10)
+
+        btn_sizer = wx.StdDialogButtonSizer()
+        self.btn_ok = wx.Button(panel, wx.ID_OK, u"Клонировать")
+        btn_cancel = wx.Button(panel, wx.ID_CANCEL, u"Отмена")
+        btn_sizer.AddButton(self.btn_ok)
+        btn_sizer.AddButton(btn_cancel)
+        btn_sizer.Realize()
+        vbox.Add(btn_sizer, 0, wx.ALL | wx.ALIGN_RIGHT, 8)
+        panel.SetSizer(vbox)
+
+        self.txt_url.SetValue(self.config.get_clone_url())
+        specs = [spec for _, spec in self._FILTERS]
+        current = self.config.get_clone_filter()
+        self.cho_filter.SetSelection(specs.index(current) if current in specs else 1)
+        self.btn_ok.Bind(wx.EVT_BUTTON, self._on_clone)
+
+    def _on_clone(self, event):
+        url = self.txt_url.GetValue().strip()
+        if not url:
+            wx.MessageBox(u"Укажите URL репозитория.", u"Ошибка", wx.OK | wx.ICON_ERROR)
+            return
+        spec = self._FILTERS[self.cho_filter.GetSelection()][1]
+        self.sparse = self.chk_sparse.GetValue()
+        self.config.set("clone", "url", url)
+        self.config.set("clone", "filter", spec)
+        self.config.save()
+
+        self.btn_ok.Enable(False)
+        self.lbl_result.SetLabel(u"Клонирование...")
+        self.lbl_result.SetForegroundColour(wx.Colour(0, 0, 0))
+
+        def _progress(ev):
+            wx.CallAfter(self._show_progress, ev.describe())
+
+        def _worker():
+            ok, msg = self.git.clone(url, spec, sparse=self.sparse, on_progress=_progress)
+            wx.CallAfter(self._clone_done, ok, msg)
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def _show_progress(self, text):
+        if self.lbl_result:
+            self.lbl_result.SetLabel(text)
+
+    def _clone_done(self, ok, msg):
+        if not self:
+            return
+        if ok:
+            self.EndModal(wx.ID_OK)
+            return
+        self.btn_ok.Enable(True)
+        self.lbl_result.SetLabel(u"\u2717 " + msg)
+        self.lbl_result.SetForegroundColour(wx.Colour(200, 0, 0))
+
+
+# ======================================================================
+#  SparseCheckoutDialog
+# ======================================================================
+class SparseCheckoutDialog(wx.Dialog):
+    """Choose which library directories are checked out (cone mode)."""
+
+    def __init__(self, parent, git):
+        super(SparseCheckoutDialog, self).__init__(
+            parent,
+            title=u"Библиотеки в рабочей копии",
+            size=(480, 480),
+            style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER,
+        )
+        self.git = git
+        self._dirs = []
+        self._build_ui()
+        self.Centre()
+        self._load()
+
+    def _build_ui(self):
+        panel = wx.Panel(self)
+        vbox = wx.BoxSizer(wx.VERTICAL)
+        self.lbl_info = wx.StaticText(panel, label=u"Чтение списка библиотек...")
+        vbox.Add(self.lbl_info, 0, wx.ALL | wx.EXPAND, 8)
+        self.lst_dirs = wx.CheckListBox(panel)
+        vbox.Add(self.lst_dirs, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 8)
+
+        row = wx.BoxSizer(wx.HORIZONTAL)
+        btn_all = wx.Button(panel, label=u"Все")
+        btn_none = wx.Button(panel, label=u"Ничего")
+        row.Add(btn_all, 0, wx.RIGHT, 6)
+        row.Add(btn_none, 0)
+        row.AddStretchSpacer()
+        self.btn_apply = wx.Button(panel, wx.ID_OK, u"Применить")
+        btn_close = wx.Button(panel, wx.ID_CANCEL, u"Закрыть")
+        row.Add(self.btn_apply, 0, wx.RIGHT, 6)
+        row.Add(btn_close, 0)
+        vbox.Add(row, 0, wx.EXPAND | wx.ALL, 8)
+        panel.SetSizer(vbox)
+
+        self.btn_apply.Enable(False)
+        btn_all.Bind(wx.EVT_BUTTON, lambda evt: self._check_all(True))
+        btn_none.Bind(wx.EVT_BUTTON, lambda evt: self._check_all(False))
+        self.btn_apply.Bind(wx.EVT_BUTTON, self._on_apply)
+
+    def _load(self):
+        def _worker():
+            dirs = self.git.library_dirs()
+            selected = self.git.sparse_checkout_dirs()
+            spec = self.git.partial_clone_filter()
+            wx.CallAfter(self._loaded, dirs, selected, spec)
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def _loaded(self, dirs, selected, spec):
+        if not self:
+            return
+        self._dirs = dirs
+        self.lst_dirs.Set(dirs)
+        for i, path in enumerate(dirs):
+            self.lst_dirs.Check(i, selected is None or path in selected)
+        info = u"Библиотек: {n}".format(n=len(dirs))
+        if spec:
+            info += u" · частичный клон ({f}), файлы загружаются по требованию".format(f=spec)
+        self.lbl_info.SetLabel(info)
+        self.btn_apply.Enable(bool(dirs))
+
+    def _check_all(self, value):
+        for i in range(self.lst_dirs.GetCount()):
+            self.lst_dirs.Check(i, value)
+
+    def _on_apply(self, event):
+        chosen = [self._dirs[i] for i in self.lst_dirs.GetCheckedItems()]
+        if not chosen:
+            wx.MessageBox(u"Выберите хотя бы одну библиотеку.", u"Ошибка", wx.OK | wx.ICON_ERROR)
+            return
+        if len(chosen) == len(self._dirs):
+            chosen = []  # everything → plain full checkout
+        self.btn_apply.Enable(False)
+        self.lbl_info.SetLabel(u"Обновление рабочей копии...")
+
+        def _progress(ev):
+            wx.CallAfter(self._show_progress, ev.describe())
+
+        def _worker():
+            ok, msg = self.git.set_sparse_checkout(chosen, on_progress=_progress)
+            wx.CallAfter(self._apply_done, ok, msg)
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def _show_progress(self, text):
+        if self.lbl_info:
+            self.lbl_info.SetLabel(text)
+
+    def _apply_done(self, ok, msg):
+        if not self:
+            return
+        self.btn_apply.Enable(True)
+        self.lbl_info.SetLabel((u"\u2713 " if ok else u"\u2717 ") + msg)
+        self.lbl_info.SetForegroundColour(wx.Colour(0, 128, 0) if ok else wx.Colour(200, 0, 0))
+
+
+# ======================================================================
+#  LfsReportDialog
+# ======================================================================
+class LfsReportDialog(wx.Dialog):
+    """Show which file types would benefit from Git LFS."""
+
+    def __init__(self, parent, git):
+        super(LfsReportDialog, self).__init__(
+            parent,
+            title=u"Git LFS: анализ репозитория",
+            size=(640, 420),
+            style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER,
+        )
+        self.git = git
+        self._build_ui()
+        self.Centre()
+
+        def _worker():
+            text = migration_report(self.git)
+            if self.git.lfs_patterns():
+                text += u"\n\nУже в LFS: " + u", ".join(self.git.lfs_patterns())
+            wx.CallAfter(self._show, text)
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def _build_ui(self):
+        panel = wx.Panel(self)
+        vbox = wx.BoxSizer(wx.VERTICAL)
+        self.txt_report = wx.TextCtrl(
+            panel,
+            value=u"Подсчёт размеров...",
+            style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_DONTWRAP,
+        )
+        self.txt_report.SetFont(wx.Font(
+            9, wx.FONTFAMILY_TELETYPE, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL,
+        ))
+        vbox.Add(self.txt_report, 1, wx.EXPAND | wx.ALL, 8)
+        btn_close = wx.Button(panel, wx.ID_CANCEL, u"Закрыть")
+        vbox.Add(btn_close, 0, wx.ALL | wx.ALIGN_RIGHT, 8)
+        panel.SetSizer(vbox)
+
+    def _show(self, text):
+        if self.txt_report:
+            self.txt_report.SetValue(text)
+
+
 # ======================================================================
 #  SSHSetupDialog
 # ======================================================================
@@ -825,13 +1796,14 @@ class SSHSetupDialog(wx.Dialog):
 #  CommitDialog
 # ======================================================================
 class CommitDialog(wx.Dialog):
-    """Simple modal to enter a commit message."""
+    """Modal to enter a commit message; lists symbol changes if given."""
 
-    def __init__(self, parent):
+    def __init__(self, parent, changes=None):
+        self._changes = changes or []
         super(CommitDialog, self).__init__(
             parent,
             title=u"Сообщение коммита",
-            size=(420, 200),
+            size=(480, 360) if self._changes else (420, 200),
             style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER,
         )
         self._build_ui()
@@ -841,6 +1813,15 @@ class CommitDialog(wx.Dialog):
         panel = wx.Panel(self)
         vbox = wx.BoxSizer(wx.VERTICAL)
 
+        if self._changes:
+            vbox.Add(wx.StaticText(panel, label=u"Изменения в библиотеках символов:"), 0, wx.ALL, 8)
+            txt_changes = wx.TextCtrl(
+                panel,
+                value="\n".join(self._changes),
+                style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_DONTWRAP,
+            )
+            vbox.Add(txt_changes, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 8)
+
         vbox.Add(
             wx.StaticText(panel, label=u"Введите сообщение коммита:"),
             0, wx.ALL, 8,
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+"""
+Working-tree watcher — collects the paths that changed on disk so the
+status can be recomputed only for them (or not at all).
+
+On Linux the watcher uses inotify through ctypes; everywhere else (or
+when inotify is unavailable / out of watches) it falls back to a
+portable mtime scan. Both backends are polled without threads: the
+dialog timer calls :meth:`StatusTracker.refresh`, which drains the
+pending events and decides between "nothing to do", a path-limited
+``git status`` and a full one.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import struct
+import sys
+import threading
+
+logger = logging.getLogger("kicad_git_plugin.watcher")
+
+# More dirty paths than this → one full status is cheaper
+MAX_INCREMENTAL_PATHS = 200
+
+# inotify constants (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (
+    _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+    | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _skip_dir(name):
+    return name == ".git"
+
+
+class _InotifyBackend:
+    """Recursive inotify watch of the working tree (Linux only)."""
+
+    name = "inotify"
+
+    def __init__(self, root):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.root = root
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wd_to_rel = {}
+        self._pending = set()
+        self._overflow = False
+        try:
+            self._add_tree("")
+        except Exception:
+            self.close()
+            raise
+
+    def _add_watch(self, rel):
+        path = os.path.join(self.root, rel) if rel else self.root
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return  # vanished in the meantime
+            raise OSError(err, "inotify_add_watch failed for {p}".format(p=path))
+        self._wd_to_rel[wd] = rel
+
+    def _add_tree(self, rel):
+        self._add_watch(rel)
+        base = os.path.join(self.root, rel) if rel else self.root
+        for dirpath, dirnames, _ in os.walk(base):
+            dirnames[:] = [d for d in dirnames if not _skip_dir(d)]
+            for d in dirnames:
+                self._add_watch(os.path.relpath(os.path.join(dirpath, d), self.root).replace(os.sep, "/"))
+
+    def _read_events(self):
+        while True:
+            try:
+                buf = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return
+            if not buf:
+                return
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip(b"\0")
+                offset += length
+                self._handle(wd, mask, os.fsdecode(name))
+
+    def _handle(self, wd, mask, name):
+        if mask & _IN_Q_OVERFLOW:
+            self._overflow = True
+            return
+        rel_dir = self._wd_to_rel.get(wd)
+        if mask & _IN_IGNORED:
+            self._wd_to_rel.pop(wd, None)
+            return
+        if rel_dir is None:
+            return
+        if not name:
+            # Event on the watched directory itself
+            if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF) and rel_dir:
+                self._pending.add(rel_dir)
+            return
+        if not rel_dir and _skip_dir(name):
+            return
+        rel = rel_dir + "/" + name if rel_dir else name
+        self._pending.add(rel)
+        if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+            try:
+                self._add_tree(rel)
+            except OSError as exc:
+                logger.warning("Cannot watch new directory %s: %s", rel, exc)
+                self._overflow = True
+
+    def drain(self):
+        """Return (changed relative paths, overflow flag) since the last call."""
+        self._read_events()
+        paths, overflow = self._pending, self._overflow
+        self._pending = set()
+        self._overflow = False
+        return paths, overflow
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class _PollingBackend:
+    """Portable fallback: compares mtime/size snapshots of the working tree."""
+
+    name = "mtime-scan"
+
+    def __init__(self, root):
+        self.root = root
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snap = {}
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            base = os.path.join(self.root, rel_dir) if rel_dir else self.root
+            try:
+                it = os.scandir(base)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    rel = rel_dir + "/" + entry.name if rel_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if _skip_dir(entry.name):
+                                continue
+                            snap[rel] = None  # directories are tracked for creation only
+                            stack.append(rel)
+                        else:
+                            st = entry.stat(follow_symlinks=False)
+                            snap[rel] = (st.st_mtime_ns, st.st_size, st.st_mode)
+                    except OSError:
+                        continue
+        return snap
+
+    def drain(self):
+        new = self._scan()
+        old = self._snapshot
+        self._snapshot = new
+        changed = set()
+        for rel, sig in new.items():
+            prev = old.get(rel, False)
+            if prev is False or (sig is not None and prev != sig):
+                changed.add(rel)
+        for rel in old:
+            if rel not in new:
+                changed.add(rel)
+        return changed, False
+
+    def close(self):
+        self._snapshot = {}
+
+
+class RepoWatcher:
+    """Watch a working tree and report changed paths.
+
+    Parameters
+    ----------
+    root : str
+        Repository root (from ``ConfigService.get_repo_path()``).
+    use_inotify : bool
+        Try inotify first (Linux); the mtime scan is used otherwise.
+    """
+
+    def __init__(self, root, use_inotify=True):
+        self.root = root
+        self._backend = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._backend = _InotifyBackend(root)
+            except Exception as exc:
+                logger.warning("inotify unavailable (%s), using mtime scan", exc)
+        if self._backend is None:
+            self._backend = _PollingBackend(root)
+        logger.info("Watching %s with %s", root, self._backend.name)
+
+    @property
+    def backend(self):
+        return self._backend.name
+
+    def drain(self):
+        """Return (set of changed relative paths, overflow flag).
+
+        ``overflow`` means events were lost and a full status is required.
+        """
+        try:
+            return self._backend.drain()
+        except OSError as exc:
+            logger.warning("Watcher failed (%s), falling back to mtime scan", exc)
+            self._backend.close()
+            self._backend = _PollingBackend(self.root)
+            return set(), True
+
+    def close(self):
+        self._backend.close()
+
+
+def _minimal_prefixes(paths):
+    """Drop paths that lie below another path of the set."""
+    result = []
+    for p in sorted(paths):
+        if result and (p == result[-1] or p.startswith(result[-1] + "/")):
+            continue
+        result.append(p)
+    return result
+
+
+class StatusTracker:
+    """Keeps the last :class:`GitStatus` and updates it incrementally.
+
+    Safe to use from worker threads: :meth:`refresh` and :meth:`adopt`
+    are serialised by an internal lock.
+
+    Parameters
+    ----------
+    git : git_service.GitService
+    watcher : RepoWatcher or None
+        Created for ``git.get_repo_path()`` when omitted.
+    """
+
+    def __init__(self, git, watcher=None):
+        self.git = git
+        self.repo = git.get_repo_path()
+        self.watcher = watcher if watcher is not None else RepoWatcher(self.repo)
+        self._lock = threading.RLock()
+        self._status = None
+        self._meta_sig = None
+        self.full_runs = 0
+        self.partial_runs = 0
+        self.skipped = 0
+
+    def _git_meta_signature(self, st):
+        """Stat the few .git files whose change invalidates the whole status."""
+        git_dir = os.path.join(self.repo, ".git")
+        names = ["HEAD", "index", "packed-refs", "info/exclude"]
+        if st is not None:
+            if st.branch:
+                names.append("refs/heads/" + st.branch)
+            if st.upstream:
+                names.append("refs/remotes/" + st.upstream)
+        sig = []
+        for name in names:
+            try:
+                s = os.stat(os.path.join(git_dir, name))
+                sig.append((name, s.st_mtime_ns, s.st_size, s.st_ino))
+            except OSError:
+                sig.append((name, None))
+        return tuple(sig)
+
+    @property
+    def status(self):
+        """Last known :class:`GitStatus` or None."""
+        return self._status
+
+    def adopt(self, st):
+        """Take a status computed elsewhere (e.g. after fetch) as current."""
+        with self._lock:
+            self.watcher.drain()
+            self._set_status(st)
+
+    def _full(self):
+        self.watcher.drain()
+        return self._run_full()
+
+    def _run_full(self):
+        st = self.git.get_status()
+        self.full_runs += 1
+        self._set_status(st)
+        return st
+
+    def _set_status(self, st):
+        # Signature taken after the status call: git status itself
+        # rewrites .git/index when it refreshes stat data
+        self._meta_sig = self._git_meta_signature(st)
+        self._status = st
+
+    def _needs_full(self, paths):
+        if len(paths) > MAX_INCREMENTAL_PATHS:
+            return True
+        untracked_dirs = [p for p in self._status.untracked if p.endswith("/")]
+        for p in paths:
+            if p.rsplit("/", 1)[-1] == ".gitignore":
+                return True
+            for d in untracked_dirs:
+                if p.startswith(d):
+                    return True
+        return False
+
+    def refresh(self, force=False):
+        """Bring the status up to date.
+
+        Returns
+        -------
+        tuple(GitStatus, bool)
+            (status, changed) — ``changed`` is False when nothing on disk
+            moved and no git command was run.
+        """
+        with self._lock:
+            return self._refresh(force)
+
+    def _refresh(self, force):
+        if force or self._status is None:
+            return (self._full(), True)
+
+        sig = self._git_meta_signature(self._status)
+        paths, overflow = self.watcher.drain()
+        if overflow or sig != self._meta_sig:
+            return (self._run_full(), True)
+        if not paths:
+            self.skipped += 1
+            return (self._status, False)
+
+        paths = _minimal_prefixes(paths)
+        if self._needs_full(paths):
+            return (self._run_full(), True)
+
+        partial = self.git.get_status(paths=paths)
+        if not (partial.branch or partial.oid):
+            # A successful status always has branch headers; on failure
+            # do not drop the entries of these paths
+            logger.debug("Path-limited status failed, running a full one")
+            return (self._run_full(), True)
+        self.partial_runs += 1
+        # the previous status may be in use on the UI or a worker thread
+        st = self._status.copy()
+        st.branch, st.oid = partial.branch, partial.oid
+        st.upstream, st.ahead, st.behind = partial.upstream, partial.ahead, partial.behind
+        for p in paths:
+            st.remove_path(p)
+            st.remove_path(p + "/")
+            below = st.trie.counts_for(p)
+            if below.staged or below.modified or below.untracked or below.unmerged:
+                prefix = p + "/"
+                for e in [e for e in st.entries if e.startswith(prefix)]:
+                    st.remove_path(e)
+        for entry in partial.entries.values():
+            st.add_entry(entry)
+        logger.debug("Incremental status for %d path(s)", len(paths))
+        self._set_status(st)
+        return (st, True)
+
+    def close(self):
+        with self._lock:
+            self.watcher.close()
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+Altium ``.SchLib`` → KiCad ``.kicad_sym`` importer (see TZ.md).
+
+Pure Python, no KiCad dependency:
+
+- ``cfb``     — memory-mapped Compound File (OLE2) reader
+- ``schlib``  — component list from ``FileHeader`` and ``Data`` streams
+- ``records`` — zero-copy record iterator, lazy property decoding
+- ``model``   — core symbol model (TZ.md 3.2.2), column-oriented pins and graphics
+- ``normalizer`` — Altium records → model (TZ.md 3.2.3)
+- ``generator`` — model → ``.kicad_sym`` text (TZ.md 3.2.4)
+- ``batch``   — directory trees on a process pool; ``python -m altium_importer``
+- ``import_cache`` — content-hash cache of converted components
+- ``bench``   — throughput benchmarks on real libraries
+"""
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Command line: convert ``.SchLib`` files or directory trees to ``.kicad_sym``.
+
+Usage::
+
+    python -m altium_importer SRC [SRC ...] [-o OUT_DIR] [-j JOBS]
+                              [--name-format "{library}_{name}"] [--log FILE]
+                              [--cache-dir DIR | --no-cache] [--cache-max-mb MB]
+
+Each ``SRC`` is a ``.SchLib`` file or a directory searched recursively.
+Without ``-o`` every ``.kicad_sym`` is written next to its source; with
+``-o`` the directory structure is mirrored under ``OUT_DIR``. Converted
+components are cached (see :mod:`import_cache`), so a re-run only parses
+what changed. Exit status is 1 when at least one library could not be
+converted.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from .batch import (DEFAULT_NAME_FORMAT, LOG_FILE, find_libraries, run_batch,
+                    target_path)
+from .import_cache import DEFAULT_MAX_BYTES, default_directory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m altium_importer",
+        description="Импорт библиотек Altium .SchLib в KiCad .kicad_sym")
+    parser.add_argument("sources", nargs="+", metavar="SRC",
+                        help=".SchLib или каталог с библиотеками")
+    parser.add_argument("-o", "--output", default="",
+                        help="каталог для .kicad_sym (по умолчанию рядом с исходными)")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="число процессов (по умолчанию по числу ядер)")
+    parser.add_argument("--name-format", default=DEFAULT_NAME_FORMAT,
+                        help="имя символа: {name} — имя компонента, {library} — библиотеки")
+    parser.add_argument("--log", default="",
+                        help="файл журнала (по умолчанию OUT/" + LOG_FILE + " при -o)")
+    parser.add_argument("--cache-dir", default=default_directory(),
+                        help="каталог кэша импорта (по умолчанию %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="не использовать кэш")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="размер кэша, МБ (по умолчанию %(default)s)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="без строки на каждый файл")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+
+    jobs = []
+    for root in args.sources:
+        if not os.path.exists(root):
+            parser.error("{r}: не найден".format(r=root))
+        jobs.extend((source, target_path(source, root, args.output))
+                    for source in find_libraries(root))
+    if not jobs:
+        print("Библиотеки .SchLib не найдены")
+        return 1
+
+    def progress(done, total, result):
+        if not args.quiet or not result.ok:
+            print("[{d}/{t}] {r}".format(d=done, t=total, r=result.describe()), flush=True)
+
+    cache_dir = "" if args.no_cache else args.cache_dir
+    summary = run_batch(jobs, args.jobs or None, args.name_format, progress,
+                        cache_dir, args.cache_max_mb * 1024 * 1024)
+    print(summary.describe())
+    stats = summary.cache_stats()
+    if stats is not None:
+        print(stats.describe())
+    log_path = args.log or (os.path.join(args.output, LOG_FILE) if args.output else "")
+    if log_path:
+        summary.write_log(log_path)
+        print("Журнал: {p}".format(p=log_path))
+    return 1 if summary.totals()[1] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+Batch import: a directory tree of ``.SchLib`` files → ``.kicad_sym``.
+
+Each library is converted in a worker process of a
+``ProcessPoolExecutor`` (one worker per core by default) through the
+TZ.md pipeline — parser (:mod:`schlib`, :mod:`records`) → normalizer →
+generator. Workers write their ``.kicad_sym`` themselves and return only
+a compact :class:`FileResult` (names, counts and messages), so no model
+or text crosses the process boundary. A component that cannot be
+converted is skipped and reported; it never aborts its library or the
+batch.
+
+The main process aggregates progress, per-file timing and the log that
+TZ.md §4.3 asks for: imported and skipped components, warnings and
+normalization errors (:meth:`BatchSummary.write_log`).
+
+With a cache directory, components whose streams are unchanged since an
+earlier run are emitted from :mod:`import_cache` without being parsed.
+"""
+
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .cfb import CFBError
+from .generator import format_library, format_symbol, rename_symbol
+from .import_cache import DEFAULT_MAX_BYTES, CacheEntry, CacheStats, ImportCache
+from .normalizer import normalize
+from .records import RecordError
+from .schlib import PIN_FRAC_STREAM, SchLib
+
+logger = logging.getLogger("altium_importer.batch")
+
+SOURCE_SUFFIX = ".schlib"
+TARGET_SUFFIX = ".kicad_sym"
+DEFAULT_NAME_FORMAT = "{name}"
+LOG_FILE = "import.log"
+
+# Characters KiCad does not accept in symbol names
+_BAD_NAME_CHARS_RE = re.compile(r"[:/\\\x00-\x1f]")
+
+
+class FileResult:
+    """Outcome of one library, returned by a worker.
+
+    Attributes
+    ----------
+    source, target : str
+    imported : list of str
+        Symbol names written to ``target``.
+    skipped : list of tuple(str, str)
+        (component, reason) of components that could not be converted.
+    warnings : list of tuple(str, str)
+        (component, message) of detail lost in the conversion.
+    error : str
+        Set when the whole library failed (unreadable file, write error).
+    elapsed : float
+        Seconds spent on the library.
+    cache : import_cache.CacheStats or None
+        Cache lookups of the library, None without a cache.
+    """
+
+    __slots__ = ("source", "target", "imported", "skipped", "warnings", "error", "elapsed",
+                 "cache")
+
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+        self.imported = []
+        self.skipped = []
+        self.warnings = []
+        self.error = ""
+        self.elapsed = 0.0
+        self.cache = None
+
+    @property
+    def ok(self):
+        return not self.error
+
+    def describe(self):
+        """One progress line for the library."""
+        if self.error:
+            return "{s}: ошибка: {e} ({t:.2f} с)".format(s=self.source, e=self.error,
+                                                          t=self.elapsed)
+        return "{s}: {n} символов, пропущено {k}, предупреждений {w}{c} ({t:.2f} с)".format(
+            s=self.source, n=len(self.imported), k=len(self.skipped), w=len(self.warnings),
+            c=", из кэша {h}".format(h=self.cache.hits) if self.cache else "",
+            t=self.elapsed)
+
+
+def symbol_name(name_format, name, library):
+    """Return the KiCad symbol name for an Altium component.
+
+    ``name_format`` may use ``{name}`` and ``{library}`` (file name of the
+    source library without extension); characters KiCad rejects are
+    replaced with ``_``.
+    """
+    try:
+        text = name_format.format(name=name, library=library)
+    except (KeyError, IndexError, ValueError):
+        text = name
+    return _BAD_NAME_CHARS_RE.sub("_", text).strip() or "_"
+
+
+def _unique(name, used):
+    """Make ``name`` unique with a ``_2``, ``_3``... suffix.
+
+    ``used`` maps lower-cased names to the last suffix tried for them.
+    """
+    candidate = name
+    n = used.get(name.lower(), 1)
+    while candidate.lower() in used:
+        n += 1
+        candidate = "{n}_{i}".format(n=name, i=n)
+    if n > 1:
+        used[name.lower()] = n
+    used[candidate.lower()] = 1
+    return candidate
+
+
+def convert_component(lib, component):
+    """Run one component through the normalizer.
+
+    Returns
+    -------
+    tuple(model.Symbol, list of str)
+        Symbol and the normalizer's warnings.
+    """
+    warnings = []
+    try:
+        fracs = lib.pin_fracs(component)
+    except RecordError as exc:
+        warnings.append("PinFrac не прочитан ({e}), координаты пинов без дробной "
+                        "части".format(e=exc))
+        fracs = {}
+    symbol = normalize(component, lib.records(component), fracs, warnings)
+    return symbol, warnings
+
+
+def _convert_cached(lib, component, cache):
+    """Return the :class:`CacheEntry` of a component, from ``cache`` when
+    its streams are unchanged; converts and stores it otherwise."""
+    if cache is None:
+        symbol, warnings = convert_component(lib, component)
+        return CacheEntry(symbol.name, warnings, format_symbol(symbol))
+    data = lib.data(component)
+    try:
+        pin_frac = lib.stream(component, PIN_FRAC_STREAM)
+    except KeyError:
+        pin_frac = b""
+    key = cache.key(component, data, pin_frac)
+    entry = cache.get(key)
+    if entry is None:
+        symbol, warnings = convert_component(lib, component)
+        entry = CacheEntry(symbol.name, warnings, format_symbol(symbol))
+        cache.put(key, entry)
+    return entry
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="\n") as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+def convert_file(source, target, name_format=DEFAULT_NAME_FORMAT, cache_dir=""):
+    """Convert one library; runs in a worker process.
+
+    Never raises for bad input: problems end up in the returned
+    :class:`FileResult`.
+    """
+    start = time.perf_counter()
+    result = FileResult(source, target)
+    library = os.path.splitext(os.path.basename(source))[0]
+    cache = ImportCache(cache_dir) if cache_dir else None
+    try:
+        with SchLib(source) as lib:
+            used = {}
+            fragments = []
+            for component in lib.components():
+                try:
+                    entry = _convert_cached(lib, component, cache)
+                except KeyError as exc:
+                    result.skipped.append((component.name, "нет стрима {s}".format(
+                        s=exc.args[0] if exc.args else "Data")))
+                    continue
+                except (RecordError, ValueError) as exc:
+                    result.skipped.append((component.name, str(exc) or type(exc).__name__))
+                    continue
+                except Exception as exc:  # normalizer bug or out-of-range value
+                    logger.exception("cannot convert %s in %s", component.name, source)
+                    result.skipped.append((component.name, "{t}: {e}".format(
+                        t=type(exc).__name__, e=exc)))
+                    continue
+                name = _unique(symbol_name(name_format, entry.name, library), used)
+                fragments.append(rename_symbol(entry.fragment, entry.name, name))
+                result.imported.append(name)
+                result.warnings.extend((name, message) for message in entry.warnings)
+        if not result.imported and result.skipped:
+            result.error = "ни один компонент не импортирован"
+        else:
+            _write_atomic(target, format_library(fragments))
+    except (OSError, CFBError) as exc:
+        result.error = str(exc)
+    if cache is not None:
+        result.cache = cache.stats
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def find_libraries(root):
+    """Return the ``.SchLib`` files under ``root`` (or ``root`` itself), sorted."""
+    if os.path.isfile(root):
+        return [root]
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(SOURCE_SUFFIX):
+                found.append(os.path.join(dirpath, name))
+    return found
+
+
+def target_path(source, root, out_dir):
+    """Output path of ``source``: mirrored under ``out_dir`` relative to
+    ``root``, or next to the source when ``out_dir`` is empty."""
+    base = os.path.splitext(source)[0] + TARGET_SUFFIX
+    if not out_dir:
+        return base
+    if os.path.isfile(root):
+        return os.path.join(out_dir, os.path.basename(base))
+    return os.path.join(out_dir, os.path.relpath(base, root))
+
+
+class BatchSummary:
+    """Aggregated results of a batch, in source order."""
+
+    def __init__(self):
+        self.results = []
+        self.elapsed = 0.0
+        self.evicted = 0
+
+    def add(self, result):
+        self.results.append(result)
+
+    def totals(self):
+        """Return (files, failed files, imported, skipped, warnings)."""
+        return (len(self.results),
+                sum(1 for r in self.results if not r.ok),
+                sum(len(r.imported) for r in self.results),
+                sum(len(r.skipped) for r in self.results),
+                sum(len(r.warnings) for r in self.results))
+
+    def cache_stats(self):
+        """Return the combined :class:`CacheStats`, None when no library
+        used the cache."""
+        stats = None
+        for r in self.results:
+            if r.cache is not None:
+                if stats is None:
+                    stats = CacheStats()
+                stats.add(r.cache)
+        if stats is not None:
+            stats.evicted += self.evicted
+        return stats
+
+    def describe(self):
+        files, failed, imported, skipped, warnings = self.totals()
+        return ("Библиотек: {f} (с ошибкой {e}), символов импортировано: {i}, "
+                "пропущено: {s}, предупреждений: {w}, время {t:.1f} с".format(
+                    f=files, e=failed, i=imported, s=skipped, w=warnings, t=self.elapsed))
+
+    def write_log(self, path):
+        """Write the full import log (TZ.md §4.3)."""
+        lines = []
+        for r in sorted(self.results, key=lambda r: r.source):
+            lines.append("== {s} -> {t} ({e:.2f} с)".format(s=r.source, t=r.target, e=r.elapsed))
+            if r.error:
+                lines.append("ОШИБКА: {e}".format(e=r.error))
+            for name in r.imported:
+                lines.append("импортирован: {n}".format(n=name))
+            for name, reason in r.skipped:
+                lines.append("пропущен: {n}: {r}".format(n=name, r=reason))
+            for name, message in r.warnings:
+                lines.append("предупреждение: {n}: {m}".format(n=name, m=message))
+        lines.append(self.describe())
+        stats = self.cache_stats()
+        if stats is not None:
+            lines.append(stats.describe())
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def run_batch(jobs_list, workers=None, name_format=DEFAULT_NAME_FORMAT, progress=None,
+              cache_dir="", cache_max_bytes=DEFAULT_MAX_BYTES):
+    """Convert libraries on a process pool.
+
+    Parameters
+    ----------
+    jobs_list : list of tuple(str, str)
+        (source, target) pairs.
+    workers : int or None
+        Pool size; default one per core. 1 converts in this process.
+    progress : callable or None
+        Called with (done, total, FileResult) as libraries finish.
+    cache_dir : str
+        :class:`import_cache.ImportCache` directory, '' for no cache. It
+        is pruned to ``cache_max_bytes`` after the batch.
+
+    Returns
+    -------
+    BatchSummary
+    """
+    start = time.perf_counter()
+    summary = BatchSummary()
+    total = len(jobs_list)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or total <= 1:
+        for done, (source, target) in enumerate(jobs_list, 1):
+            try:
+                result = convert_file(source, target, name_format, cache_dir)
+            except Exception as exc:
+                logger.exception("conversion failed on %s", source)
+                result = FileResult(source, target)
+                result.error = "сбой обработчика: {e}".format(e=exc)
+            summary.add(result)
+            if progress:
+                progress(done, total, result)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, total)) as pool:
+            futures = {pool.submit(convert_file, source, target, name_format, cache_dir):
+                       (source, target) for source, target in jobs_list}
+            for done, future in enumerate(as_completed(futures), 1):
+                source, target = futures[future]
+                try:
+                    result = future.result()
+                except Exception as exc:  # worker crashed (MemoryError, killed process...)
+                    logger.exception("worker failed on %s", source)
+                    result = FileResult(source, target)
+                    result.error = "сбой обработчика: {e}".format(e=exc)
+                summary.add(result)
+                if progress:
+                    progress(done, total, result)
+    summary.results.sort(key=lambda r: r.source)
+    if cache_dir:
+        summary.evicted = ImportCache(cache_dir, cache_max_bytes).prune()
+    summary.elapsed = time.perf_counter() - start
+    return summary
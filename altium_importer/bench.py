@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the importer on real libraries.
+
+Usage::
+
+    python -m altium_importer.bench records LIB.SchLib [LIB.SchLib ...]
+    python -m altium_importer.bench memory [--components 10000] [--budget-mb 100]
+
+``records`` times two passes over every component: a walk that only
+reads record headers and types, and a full pass that decodes every
+record's properties and the PinFrac stream.
+
+``memory`` builds a library of synthetic symbols in the core model and
+measures it with ``tracemalloc``; the exit status is 1 when the model
+does not fit the budget. ``--compare`` also builds the same library as
+one tuple per pin and primitive, for reference.
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+from . import model
+from .records import RecordError, iter_records
+from .schlib import SchLib
+
+
+def _pass(paths, decode):
+    """Run one pass; return (records, bytes, components, errors, seconds)."""
+    records = size = components = errors = 0
+    start = time.perf_counter()
+    for path in paths:
+        with SchLib(path) as lib:
+            for comp in lib.components():
+                try:
+                    data = lib.data(comp)
+                    size += len(data)
+                    for record in iter_records(data):
+                        record.record_type
+                        if decode:
+                            record.properties
+                        records += 1
+                    if decode:
+                        lib.pin_fracs(comp)
+                except (KeyError, RecordError):
+                    errors += 1
+                components += 1
+    return records, size, components, errors, time.perf_counter() - start
+
+
+def bench_records(paths, repeat=3):
+    """Print records/s for the header walk and the full decode."""
+    for label, decode in (("walk", False), ("decode", True)):
+        best = None
+        for _ in range(repeat):
+            result = _pass(paths, decode)
+            if best is None or result[4] < best[4]:
+                best = result
+        records, size, components, errors, elapsed = best
+        elapsed = max(elapsed, 1e-9)
+        print("{label:7s} {c} components, {r} records, {mb:.1f} MB in {t:.3f} s: "
+              "{rps:,.0f} records/s, {mbs:.1f} MB/s{err}".format(
+                  label=label, c=components, r=records, mb=size / 1e6, t=elapsed,
+                  rps=records / elapsed, mbs=size / 1e6 / elapsed,
+                  err=", {n} errors".format(n=errors) if errors else ""))
+
+
+def _synthetic_symbols(count, units, pins, graphics):
+    """Yield symbols shaped like a typical IC library: a body in unit 0,
+    ``pins`` pins and ``graphics`` primitives spread over ``units``."""
+    mil = model.IU_PER_MIL
+    for n in range(count):
+        symbol = model.Symbol("IC_{n:05d}".format(n=n))
+        symbol.set_property("Value", symbol.name)
+        symbol.set_property("Footprint", "Package_SO:SOIC-{p}".format(p=pins))
+        symbol.set_property("Description", "Synthetic component {n}".format(n=n))
+        symbol.set_meta("altium_part_count", units + 1)
+        symbol.unit(0).graphics.add_rectangle(-300 * mil, 500 * mil, 300 * mil, -500 * mil,
+                                              fill="background")
+        for u in range(1, units + 1):
+            unit = symbol.unit(u)
+            table = unit.pins
+            for i in range(pins // units):
+                side = i % 2
+                table.append((-400 if side == 0 else 400) * mil, (400 - 100 * (i // 2)) * mil,
+                             100 * mil, 0 if side == 0 else 180, "bidirectional", "line",
+                             "P{u}_{i}".format(u=u, i=i), str(u * pins + i))
+            shapes = unit.graphics
+            for i in range(graphics // units):
+                y = i * 20 * mil
+                if i % 3 == 0:
+                    shapes.add_polyline(((0, y), (50 * mil, y), (50 * mil, y + mil)))
+                elif i % 3 == 1:
+                    shapes.add_arc((0, y), (10 * mil, y + 10 * mil), (20 * mil, y))
+                else:
+                    shapes.add_rectangle(0, y, 10 * mil, y + 10 * mil)
+        yield symbol
+
+
+def _as_objects(symbol):
+    """The same symbol as lists of :class:`model.Pin`/:class:`model.Shape`."""
+    return (symbol.name, symbol.reference, list(symbol.properties), dict(symbol.metadata or {}),
+            [(u.number, u.body_style, list(u.pins), list(u.graphics)) for u in symbol.units])
+
+
+def _measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        kept = build()
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return kept, current, peak, elapsed
+
+
+def bench_memory(components, units, pins, graphics, budget_mb, compare=False):
+    """Print the memory of ``components`` symbols; return True within budget."""
+    def build():
+        return list(_synthetic_symbols(components, units, pins, graphics))
+
+    symbols, current, peak, elapsed = _measure(build)
+    total_pins = sum(s.pin_count() for s in symbols)
+    total_shapes = sum(u.graphic_count() for s in symbols for u in s.units)
+    print("model   {c} symbols, {p} pins, {g} primitives: {mb:.1f} MB "
+          "(peak {pk:.1f} MB), {per:,.0f} B/symbol, built in {t:.2f} s".format(
+              c=components, p=total_pins, g=total_shapes, mb=current / 1e6, pk=peak / 1e6,
+              per=current / max(components, 1), t=elapsed))
+    if compare:
+        objects, obj_current, _peak, _elapsed = _measure(
+            lambda: [_as_objects(s) for s in symbols])
+        print("objects same data as tuples: {mb:.1f} MB, {per:,.0f} B/symbol "
+              "({x:.1f}x the model)".format(
+                  mb=obj_current / 1e6, per=obj_current / max(components, 1),
+                  x=obj_current / max(current, 1)))
+        del objects
+    ok = current <= budget_mb * 1e6
+    print("budget  {b} MB: {r}".format(b=budget_mb, r="ok" if ok else "EXCEEDED"))
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m altium_importer.bench")
+    sub = parser.add_subparsers(dest="command")
+    p = sub.add_parser("records", help="record iteration throughput")
+    p.add_argument("paths", nargs="+", metavar="LIB.SchLib")
+    p.add_argument("--repeat", type=int, default=3, help="passes, best is reported")
+    p = sub.add_parser("memory", help="core model memory for a large library")
+    p.add_argument("--components", type=int, default=10000)
+    p.add_argument("--units", type=int, default=2, help="units per symbol")
+    p.add_argument("--pins", type=int, default=32, help="pins per symbol")
+    p.add_argument("--graphics", type=int, default=12, help="primitives per symbol")
+    p.add_argument("--budget-mb", type=float, default=100.0)
+    p.add_argument("--compare", action="store_true",
+                   help="also measure one tuple per pin and primitive")
+    args = parser.parse_args(argv)
+    if args.command == "records":
+        bench_records(args.paths, args.repeat)
+    elif args.command == "memory":
+        if not bench_memory(args.components, args.units, args.pins, args.graphics,
+                            args.budget_mb, args.compare):
+            return 1
+    else:
+        parser.print_help()
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+"""
+Compound File Binary (OLE2) reader — the container format of Altium
+``.SchLib`` files.
+
+The file is memory-mapped and nothing is read up front except the
+512-byte header. FAT and MiniFAT entries are looked up in place with
+``struct.unpack_from`` when a chain is walked, directory entries are
+decoded when first visited, and a stream whose sectors are contiguous
+(the usual layout of files written by Altium) is returned as a
+``memoryview`` slice of the map without copying. Only fragmented
+streams are assembled into a new buffer.
+
+Usage::
+
+    with CompoundFile("Lib.SchLib") as cf:
+        for entry in cf.listdir():
+            data = cf.open_stream(entry.name + "/Data")
+"""
+
+import mmap
+import os
+import struct
+
+SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+# Special sector ids
+FREESECT = 0xFFFFFFFF
+ENDOFCHAIN = 0xFFFFFFFE
+FATSECT = 0xFFFFFFFD
+DIFSECT = 0xFFFFFFFC
+NOSTREAM = 0xFFFFFFFF
+_MAXREGSECT = 0xFFFFFFFA
+
+# Directory entry types
+TYPE_EMPTY = 0
+TYPE_STORAGE = 1
+TYPE_STREAM = 2
+TYPE_ROOT = 5
+
+_HEADER = struct.Struct("<8s16sHHHHH6sIIIIIIIII")
+# name, name length, type, (color), left, right, child, (clsid, state, times), start, size
+_DIR_ENTRY = struct.Struct("<64sHBxIII36xIQ")
+_DIR_ENTRY_SIZE = 128
+_HEADER_DIFAT = 109
+
+
+class CFBError(ValueError):
+    """Raised for files that are not valid compound files."""
+
+
+class DirEntry:
+    """One directory entry (storage or stream).
+
+    Attributes
+    ----------
+    did : int
+        Index in the directory.
+    name : str
+    type : int
+        ``TYPE_STORAGE``, ``TYPE_STREAM`` or ``TYPE_ROOT``.
+    left, right, child : int
+        Red-black tree links (``NOSTREAM`` when absent).
+    start : int
+        First sector (or mini sector) of the stream.
+    size : int
+    """
+
+    __slots__ = ("did", "name", "type", "left", "right", "child", "start", "size")
+
+    def __init__(self, did, name, type_, left, right, child, start, size):
+        self.did = did
+        self.name = name
+        self.type = type_
+        self.left = left
+        self.right = right
+        self.child = child
+        self.start = start
+        self.size = size
+
+    @property
+    def is_storage(self):
+        return self.type in (TYPE_STORAGE, TYPE_ROOT)
+
+    @property
+    def is_stream(self):
+        return self.type == TYPE_STREAM
+
+    def __repr__(self):
+        return "DirEntry({n!r}, type={t}, size={s})".format(n=self.name, t=self.type, s=self.size)
+
+
+class _LazyChain:
+    """Sector chain resolved only as far as it has been indexed."""
+
+    __slots__ = ("_next", "_sids", "_pending", "_limit")
+
+    def __init__(self, next_fn, start, limit):
+        self._next = next_fn
+        self._sids = []
+        self._pending = start
+        self._limit = limit
+
+    def __getitem__(self, index):
+        sids = self._sids
+        while index >= len(sids):
+            sid = self._pending
+            if sid > _MAXREGSECT:
+                raise IndexError(index)
+            if len(sids) >= self._limit:
+                raise CFBError("chain loop at sector {s}".format(s=sid))
+            sids.append(sid)
+            self._pending = self._next(sid)
+        return sids[index]
+
+
+class CompoundFile:
+    """Read-only, memory-mapped compound file.
+
+    Parameters
+    ----------
+    path : str
+
+    Raises
+    ------
+    CFBError
+        When the header is not a compound-file header.
+    OSError
+        When the file cannot be opened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, "rb")
+        try:
+            size = os.fstat(self._fh.fileno()).st_size
+            if size < 512:
+                raise CFBError("file too small for a compound file")
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._fh.close()
+            raise
+        self._view = memoryview(self._mm)
+        try:
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+        self._fat_sectors = None   # DIFAT: sector ids of FAT sectors
+        self._minifat_chain = None    # _LazyChain of the MiniFAT sectors
+        self._ministream_chain = None  # _LazyChain of the mini stream (root entry)
+        self._minifat_tables = {}  # MiniFAT sector index -> tuple of next ids
+        self._dir_chain = None        # _LazyChain of the directory
+        self._entries = {}         # did -> DirEntry
+        self._children = {}        # storage did -> {name: DirEntry}
+
+    # ------------------------------------------------------------------
+    # Context manager
+    # ------------------------------------------------------------------
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Unmap the file.
+
+        Views returned by :meth:`open_stream` point into the map, so they
+        must be released first; while any is alive the map is left for
+        the garbage collector instead of raising.
+        """
+        view, self._view = self._view, None
+        if view is not None:
+            view.release()
+        mm, self._mm = self._mm, None
+        if mm is not None:
+            try:
+                mm.close()
+            except BufferError:
+                pass  # a stream view is still in use
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    # ------------------------------------------------------------------
+    # Header / allocation tables
+    # ------------------------------------------------------------------
+    def _read_header(self):
+        (sig, _clsid, _minor, major, byte_order, sector_shift, mini_shift, _res,
+         _ndir, self._nfat, self._first_dir, _txn, self._mini_cutoff,
+         self._first_minifat, self._nminifat, self._first_difat,
+         self._ndifat) = _HEADER.unpack_from(self._mm, 0)
+        if sig != SIGNATURE:
+            raise CFBError("not a compound file (bad signature)")
+        if byte_order != 0xFFFE:
+            raise CFBError("unsupported byte order")
+        if major not in (3, 4) or sector_shift not in (9, 12) or mini_shift != 6:
+            raise CFBError("unsupported version {v} / sector shift {s} / mini shift {m}".format(
+                v=major, s=sector_shift, m=mini_shift))
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_shift
+        self._ids_per_sector = self.sector_size // 4
+        # A short last sector still counts (files are not always padded)
+        self._sector_count = (len(self._mm) - 1) // self.sector_size
+
+    def _offset(self, sid):
+        return (sid + 1) * self.sector_size
+
+    def _sector_offset(self, sid, length, what):
+        """File offset of ``length`` bytes at the start of sector ``sid``,
+        checked against the end of the file (damaged headers and tables
+        point anywhere)."""
+        off = (sid + 1) * self.sector_size
+        if sid > _MAXREGSECT or off + length > len(self._mm):
+            raise CFBError("{w} sector {s} past the end of the file".format(w=what, s=sid))
+        return off
+
+    def _fat_sector_ids(self):
+        """Sector ids of the FAT, from the header DIFAT and the DIFAT chain."""
+        if self._fat_sectors is None:
+            ids = list(struct.unpack_from("<109I", self._mm, 76))
+            sid = self._first_difat
+            seen = 0
+            while sid <= _MAXREGSECT and seen < self._ndifat:
+                chunk = struct.unpack_from(
+                    "<{n}I".format(n=self._ids_per_sector), self._mm,
+                    self._sector_offset(sid, self.sector_size, "DIFAT"))
+                ids.extend(chunk[:-1])
+                sid = chunk[-1]
+                seen += 1
+            self._fat_sectors = [s for s in ids[:max(self._nfat, 0)] if s <= _MAXREGSECT]
+        return self._fat_sectors
+
+    def _next(self, sid):
+        """FAT lookup: the sector after ``sid`` in its chain."""
+        fat = self._fat_sector_ids()
+        index, slot = divmod(sid, self._ids_per_sector)
+        if index >= len(fat):
+            raise CFBError("sector {s} outside the FAT".format(s=sid))
+        off = self._sector_offset(fat[index], (slot + 1) * 4, "FAT")
+        return struct.unpack_from("<I", self._mm, off + slot * 4)[0]
+
+    def _chain(self, start):
+        """Return the list of sector ids of a regular chain."""
+        chain = []
+        sid = start
+        limit = self._sector_count + 1
+        while sid <= _MAXREGSECT:
+            if sid >= self._sector_count:
+                raise CFBError("sector {s} past the end of the file".format(s=sid))
+            chain.append(sid)
+            if len(chain) > limit:
+                raise CFBError("FAT chain loop at sector {s}".format(s=start))
+            sid = self._next(sid)
+        if sid not in (ENDOFCHAIN, FREESECT) and chain:
+            raise CFBError("bad sector id {s:#x} in chain".format(s=sid))
+        return chain
+
+    def _lazy_chain(self, start):
+        return _LazyChain(self._checked_next, start, self._sector_count + 1)
+
+    def _checked_next(self, sid):
+        if sid >= self._sector_count:
+            raise CFBError("sector {s} past the end of the file".format(s=sid))
+        return self._next(sid)
+
+    # ------------------------------------------------------------------
+    # Stream data
+    # ------------------------------------------------------------------
+    def _runs(self, offsets, unit, size):
+        """Merge (file offset) units into contiguous (start, length) runs."""
+        runs = []
+        remaining = size
+        for off in offsets:
+            length = min(unit, remaining)
+            if length <= 0:
+                break
+            if runs and runs[-1][0] + runs[-1][1] == off:
+                runs[-1][1] += length
+            else:
+                runs.append([off, length])
+            remaining -= length
+        if remaining > 0:
+            raise CFBError("stream shorter than its declared size")
+        return runs
+
+    def _regular_offsets(self, start):
+        return [self._offset(sid) for sid in self._chain(start)]
+
+    def _minifat_table(self, index):
+        """Entries of MiniFAT sector ``index``, unpacked on first use."""
+        table = self._minifat_tables.get(index)
+        if table is None:
+            try:
+                sid = self._minifat_chain[index]
+            except IndexError:
+                raise CFBError("mini sector outside the MiniFAT")
+            table = self._minifat_tables[index] = struct.unpack_from(
+                "<{n}I".format(n=self._ids_per_sector), self._mm,
+                self._sector_offset(sid, self.sector_size, "MiniFAT"))
+        return table
+
+    def _mini_offsets(self, start, count):
+        """File offsets of the first ``count`` mini sectors of a chain."""
+        if self._ministream_chain is None:
+            self._ministream_chain = self._lazy_chain(self.root.start)
+        if self._minifat_chain is None:
+            self._minifat_chain = self._lazy_chain(self._first_minifat)
+        stream_chain = self._ministream_chain
+        mini_size = self.mini_sector_size
+        sector_size = self.sector_size
+        per_sector = sector_size // mini_size
+        ids_per_sector = self._ids_per_sector
+        tables = self._minifat_tables
+        resolved = stream_chain._sids  # grows as the chain is indexed
+        offsets = []
+        mid = start
+        while mid <= _MAXREGSECT and len(offsets) < count:
+            index, slot = divmod(mid, per_sector)
+            if index < len(resolved):
+                sid = resolved[index]
+            else:
+                try:
+                    sid = stream_chain[index]
+                except IndexError:
+                    raise CFBError("mini sector {s} outside the mini stream".format(s=mid))
+            offsets.append((sid + 1) * sector_size + slot * mini_size)
+            index, slot = divmod(mid, ids_per_sector)
+            table = tables.get(index) or self._minifat_table(index)
+            mid = table[slot]
+        return offsets
+
+    def _data(self, start, size, mini):
+        if size == 0:
+            return memoryview(b"")
+        if mini:
+            unit = self.mini_sector_size
+            runs = self._runs(self._mini_offsets(start, -(-size // unit)), unit, size)
+        else:
+            runs = self._runs(self._regular_offsets(start), self.sector_size, size)
+        end = len(self._mm)
+        if any(off + length > end for off, length in runs):
+            raise CFBError("stream runs past the end of the file")
+        if len(runs) == 1:
+            off, length = runs[0]
+            return self._view[off:off + length]
+        return memoryview(b"".join(self._view[off:off + length] for off, length in runs))
+
+    # ------------------------------------------------------------------
+    # Directory
+    # ------------------------------------------------------------------
+    def entry(self, did):
+        """Return the :class:`DirEntry` with index ``did`` (decoded once)."""
+        entry = self._entries.get(did)
+        if entry is not None:
+            return entry
+        if self._dir_chain is None:
+            self._dir_chain = self._lazy_chain(self._first_dir)
+        index, slot = divmod(did, self.sector_size // _DIR_ENTRY_SIZE)
+        try:
+            sid = self._dir_chain[index]
+        except IndexError:
+            raise CFBError("directory entry {d} out of range".format(d=did))
+        off = self._sector_offset(sid, (slot + 1) * _DIR_ENTRY_SIZE, "directory")
+        raw_name, name_len, type_, left, right, child, start, size = _DIR_ENTRY.unpack_from(
+            self._mm, off + slot * _DIR_ENTRY_SIZE)
+        name = raw_name[:max(name_len - 2, 0)].decode("utf-16-le", "replace")
+        if self.sector_size == 512:
+            size &= 0xFFFFFFFF  # version 3: high dword is undefined
+        entry = DirEntry(did, name, type_, left, right, child, start, size)
+        self._entries[did] = entry
+        return entry
+
+    @property
+    def root(self):
+        return self.entry(0)
+
+    def children(self, storage):
+        """Return {name: DirEntry} of a storage (in directory order)."""
+        cached = self._children.get(storage.did)
+        if cached is not None:
+            return cached
+        result = {}
+        stack = []
+        did = storage.child
+        visited = 0
+        # In-order walk of the red-black tree of siblings
+        while stack or did != NOSTREAM:
+            while did != NOSTREAM:
+                visited += 1
+                if visited > 1000000:
+                    raise CFBError("directory tree loop")
+                entry = self.entry(did)
+                stack.append(entry)
+                did = entry.left
+            entry = stack.pop()
+            if entry.type != TYPE_EMPTY:
+                result[entry.name] = entry
+            did = entry.right
+        self._children[storage.did] = result
+        return result
+
+    def listdir(self, storage=None):
+        """Return the entries of ``storage`` (the root by default)."""
+        return list(self.children(storage or self.root).values())
+
+    def find(self, path):
+        """Return the entry at ``'Storage/Stream'`` or None.
+
+        Names are compared case-insensitively, as the format requires.
+        """
+        node = self.root
+        for part in path.strip("/").split("/"):
+            if not node.is_storage:
+                return None
+            children = self.children(node)
+            found = children.get(part)
+            if found is None:
+                lower = part.lower()
+                found = next((e for n, e in children.items() if n.lower() == lower), None)
+            if found is None:
+                return None
+            node = found
+        return node
+
+    def read(self, entry):
+        """Return the content of a stream entry as a ``memoryview``.
+
+        Zero-copy (a slice of the map) when the stream's sectors are
+        contiguous; otherwise the pieces are joined once.
+        """
+        if not entry.is_stream:
+            raise CFBError("{n!r} is not a stream".format(n=entry.name))
+        return self._data(entry.start, entry.size, entry.size < self._mini_cutoff)
+
+    def open_stream(self, path):
+        """Return the content of the stream at ``path``.
+
+        Raises
+        ------
+        KeyError
+            When there is no such stream.
+        """
+        entry = self.find(path)
+        if entry is None or not entry.is_stream:
+            raise KeyError(path)
+        return self.read(entry)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+``.kicad_sym`` generator (TZ.md 3.2.4) — core model → S-expression text.
+
+Output follows the layout KiCad 8 writes (format version 20231120, tab
+indentation, one item per line), so generated libraries open in KiCad
+8/9 and diff cleanly when re-imported. :func:`format_symbol` returns the
+text of one top-level ``(symbol ...)`` so callers can assemble, cache and
+reorder symbols without re-rendering them; :func:`format_library` wraps
+fragments into a library.
+"""
+
+from . import model
+
+FORMAT_VERSION = "20231120"
+GENERATOR = "altium_importer"
+GENERATOR_VERSION = "1.0"
+
+_FONT = "(effects\n{i}\t(font\n{i}\t\t(size 1.27 1.27)\n{i}\t)\n{hide}{i})"
+_TEXT_SIZE = 12700  # 1.27 mm
+_PIN_NAME_OFFSET = "1.016"
+
+
+def _mm(iu):
+    """Format KiCad units as millimetres without trailing zeros."""
+    text = "{v:.4f}".format(v=iu / float(model.IU_PER_MM)).rstrip("0").rstrip(".")
+    return "0" if text in ("-0", "") else text
+
+
+def quote(text):
+    """Quote a string for an S-expression."""
+    return '"' + (text.replace("\\", "\\\\").replace('"', '\\"')
+                  .replace("\n", "\\n").replace("\r", "")) + '"'
+
+
+def _effects(indent, hide=False):
+    return _FONT.format(i=indent, hide=indent + "\thide\n" if hide else "")
+
+
+def _stroke_fill(out, indent, width, fill):
+    out.append("{i}(stroke\n{i}\t(width {w})\n{i}\t(type default)\n{i})".format(
+        i=indent, w=_mm(width)))
+    out.append("{i}(fill\n{i}\t(type {f})\n{i})".format(i=indent, f=fill))
+
+
+def _bounds(symbol):
+    """Return (min_y, max_y) of all pins and primitives, or (0, 0)."""
+    ys = []
+    for unit in symbol.units:
+        if unit.pin_count():
+            ys.extend((min(unit.pins.y), max(unit.pins.y)))
+        if unit.graphic_count():
+            ys.extend((min(unit.graphics.ys), max(unit.graphics.ys)))
+    return (min(ys), max(ys)) if ys else (0, 0)
+
+
+def _property(out, name, value, x, y, hide):
+    out.append("\t\t(property {n} {v}\n\t\t\t(at {x} {y} 0)\n\t\t\t{e}\n\t\t)".format(
+        n=quote(name), v=quote(value), x=_mm(x), y=_mm(y), e=_effects("\t\t\t", hide)))
+
+
+def _graphic(out, shape):
+    i = "\t\t\t"
+    points = shape.points
+    if shape.kind == "polyline" or shape.kind == "bezier":
+        xy = " ".join("(xy {x} {y})".format(x=_mm(x), y=_mm(y)) for x, y in points)
+        out.append("{i}({k}\n{i}\t(pts {xy})".format(i=i, k=shape.kind, xy=xy))
+    elif shape.kind == "rectangle":
+        (x1, y1), (x2, y2) = points
+        out.append("{i}(rectangle\n{i}\t(start {a} {b})\n{i}\t(end {c} {d})".format(
+            i=i, a=_mm(x1), b=_mm(y1), c=_mm(x2), d=_mm(y2)))
+    elif shape.kind == "arc":
+        out.append("{i}(arc\n{i}\t(start {p})\n{i}\t(mid {m})\n{i}\t(end {e})".format(
+            i=i, p=" ".join(map(_mm, points[0])), m=" ".join(map(_mm, points[1])),
+            e=" ".join(map(_mm, points[2]))))
+    elif shape.kind == "circle":
+        (cx, cy), (px, _py) = points
+        out.append("{i}(circle\n{i}\t(center {x} {y})\n{i}\t(radius {r})".format(
+            i=i, x=_mm(cx), y=_mm(cy), r=_mm(px - cx)))
+    _stroke_fill(out, i + "\t", shape.width, shape.fill)
+    out.append(i + ")")
+
+
+def _pin(out, pin):
+    i = "\t\t\t"
+    out.append("{i}(pin {t} {s}\n{i}\t(at {x} {y} {a})\n{i}\t(length {l}){h}".format(
+        i=i, t=pin.type, s=pin.shape, x=_mm(pin.x), y=_mm(pin.y), a=pin.orientation,
+        l=_mm(pin.length), h="\n{i}\thide".format(i=i) if pin.hidden else ""))
+    out.append("{i}\t(name {n}\n{i}\t\t{e}\n{i}\t)".format(
+        i=i, n=quote(pin.name or "~"), e=_effects(i + "\t\t")))
+    out.append("{i}\t(number {n}\n{i}\t\t{e}\n{i}\t)".format(
+        i=i, n=quote(pin.number), e=_effects(i + "\t\t")))
+    out.append(i + ")")
+
+
+def format_symbol(symbol):
+    """Return the ``(symbol ...)`` S-expression of a symbol, tab-indented
+    for a library, without a trailing newline."""
+    meta = symbol.metadata or {}
+    out = ["\t(symbol {n}".format(n=quote(symbol.name))]
+    if meta.get("pin_numbers_hidden"):
+        out.append("\t\t(pin_numbers hide)")
+    out.append("\t\t(pin_names\n\t\t\t(offset {o}){h}\n\t\t)".format(
+        o=_PIN_NAME_OFFSET, h="\n\t\t\thide" if meta.get("pin_names_hidden") else ""))
+    out.append("\t\t(exclude_from_sim no)\n\t\t(in_bom yes)\n\t\t(on_board yes)")
+    low, high = _bounds(symbol)
+    _property(out, "Reference", symbol.reference, 0, high + _TEXT_SIZE, False)
+    for name, value in symbol.properties:
+        if name == "Value":
+            _property(out, name, value, 0, low - _TEXT_SIZE, False)
+        else:
+            _property(out, name, value, 0, 0, True)
+    for unit in symbol.units:
+        if unit.is_empty():
+            continue
+        out.append("\t\t(symbol {n}".format(n=quote("{s}_{u}_{b}".format(
+            s=symbol.name, u=unit.number, b=unit.body_style))))
+        if unit.graphic_count():
+            for shape in unit.graphics:
+                _graphic(out, shape)
+        if unit.pin_count():
+            for pin in unit.pins:
+                _pin(out, pin)
+        out.append("\t\t)")
+    out.append("\t)")
+    return "\n".join(out)
+
+
+def rename_symbol(fragment, old, new):
+    """Return a :func:`format_symbol` fragment with the symbol and its
+    unit sub-symbols renamed from ``old`` to ``new``."""
+    if old == new:
+        return fragment
+    old_q = quote(old)[:-1]
+    new_q = quote(new)[:-1]
+    top = "\t(symbol " + old_q + '"'
+    unit = "\t\t(symbol " + old_q + "_"
+    lines = fragment.split("\n")
+    for i, line in enumerate(lines):
+        if line.startswith(top):
+            lines[i] = "\t(symbol " + new_q + line[len(top) - 1:]
+        elif line.startswith(unit):
+            lines[i] = "\t\t(symbol " + new_q + line[len(unit) - 1:]
+    return "\n".join(lines)
+
+
+def format_library(fragments):
+    """Return the text of a ``.kicad_sym`` file from symbol fragments."""
+    head = "(kicad_symbol_lib\n\t(version {v})\n\t(generator {g})\n\t(generator_version {gv})".format(
+        v=FORMAT_VERSION, g=quote(GENERATOR), gv=quote(GENERATOR_VERSION))
+    return "\n".join([head] + list(fragments) + [")"]) + "\n"
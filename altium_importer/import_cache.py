@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Import cache — ``.kicad_sym`` fragments of converted components, keyed
+by the content of their Altium streams.
+
+The key is a SHA-1 of the component's raw ``Data`` and ``PinFrac``
+streams (PinFrac holds the pin coordinate fractions) and its
+``FileHeader`` entry (name, description, part count — the normalizer
+falls back to them), together with :data:`CACHE_VERSION`, the normalizer
+version and the generator format and version. The key therefore names
+the exact input and the code that converted it, and an entry never goes
+stale. When a vendor ships an updated library, only components whose
+streams changed are parsed again. Every other component
+is emitted from its cached fragment, with the normalizer's warnings
+replayed.
+
+Batch workers share the cache, so each entry is a small zlib-compressed
+JSON file (``<dir>/<key[:2]>/<key>.z``) written atomically — no locking
+or merging across processes. A hit touches the file's mtime, and
+:meth:`ImportCache.prune` deletes the least recently used entries until
+the cache fits its size limit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import zlib
+
+from . import generator, normalizer
+
+logger = logging.getLogger("altium_importer.import_cache")
+
+# Bump when entries change shape — old entries become unreachable
+CACHE_VERSION = 1
+ENTRY_SUFFIX = ".z"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_directory():
+    """``$XDG_CACHE_HOME/altium_importer`` (``~/.cache/...`` by default)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "altium_importer")
+
+
+class CacheEntry:
+    """One converted component.
+
+    Attributes
+    ----------
+    name : str
+        Symbol name the fragment was generated with.
+    warnings : list of str
+        Normalizer warnings, replayed on every hit.
+    fragment : str
+        ``(symbol ...)`` text from :func:`generator.format_symbol`.
+    """
+
+    __slots__ = ("name", "warnings", "fragment")
+
+    def __init__(self, name, warnings, fragment):
+        self.name = name
+        self.warnings = warnings
+        self.fragment = fragment
+
+    def as_row(self):
+        return [self.name, self.warnings, self.fragment]
+
+    @classmethod
+    def from_row(cls, row):
+        name, warnings, fragment = row
+        return cls(name, list(warnings), fragment)
+
+
+class CacheStats:
+    """Hit and miss counts of one or more :class:`ImportCache` users."""
+
+    __slots__ = ("hits", "misses", "stored", "evicted")
+
+    def __init__(self, hits=0, misses=0, stored=0, evicted=0):
+        self.hits = hits
+        self.misses = misses
+        self.stored = stored
+        self.evicted = evicted
+
+    def add(self, other):
+        self.hits += other.hits
+        self.misses += other.misses
+        self.stored += other.stored
+        self.evicted += other.evicted
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.0
+
+    def describe(self):
+        return ("Кэш импорта: попаданий {h} из {n} ({r:.0%}), записано {s}, "
+                "вытеснено {e}".format(h=self.hits, n=self.hits + self.misses,
+                                       r=self.hit_rate, s=self.stored, e=self.evicted))
+
+    def __repr__(self):
+        return "CacheStats(hits={h}, misses={m}, stored={s}, evicted={e})".format(
+            h=self.hits, m=self.misses, s=self.stored, e=self.evicted)
+
+
+class ImportCache:
+    """On-disk cache of converted components.
+
+    Parameters
+    ----------
+    directory : str
+    max_bytes : int
+        Size limit enforced by :meth:`prune`.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._salt = "{c}/{n}/{f}/{g}".format(
+            c=CACHE_VERSION, n=normalizer.NORMALIZER_VERSION,
+            f=generator.FORMAT_VERSION, g=generator.GENERATOR_VERSION).encode("ascii")
+
+    def key(self, component, data, pin_frac=b""):
+        """Return the key of a component from its header entry and raw
+        streams."""
+        h = hashlib.sha1(self._salt)
+        header = json.dumps([component.name, component.description, component.part_count])
+        # length prefixes keep the part boundaries unambiguous
+        for part in (header.encode("utf-8"), data, pin_frac):
+            h.update(b"%d:" % len(part))
+            h.update(part)
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Return the :class:`CacheEntry` for ``key`` or None; counts a hit
+        or a miss and marks the entry as recently used."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                blob = fh.read()
+        except OSError:
+            self.stats.misses += 1
+            return None
+        try:
+            entry = CacheEntry.from_row(json.loads(zlib.decompress(blob).decode("utf-8")))
+        except (ValueError, TypeError, zlib.error) as exc:
+            logger.warning("dropping damaged cache entry %s: %s", path, exc)
+            self._remove(path)
+            self.stats.misses += 1
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.stats.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        """Store an entry; failures only lose the cache, never the import."""
+        path = self._path(key)
+        tmp = "{p}.{pid}.tmp".format(p=path, pid=os.getpid())
+        blob = zlib.compress(json.dumps(entry.as_row(), ensure_ascii=False,
+                                        separators=(",", ":")).encode("utf-8"), 6)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as fh:
+                fh.write(blob)
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("cannot write cache entry %s: %s", path, exc)
+            self._remove(tmp)
+            return
+        self.stats.stored += 1
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        """Yield (mtime, size, path) of every entry."""
+        try:
+            shards = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            try:
+                files = list(os.scandir(shard.path))
+            except OSError:
+                continue
+            for item in files:
+                if not item.name.endswith(ENTRY_SUFFIX):
+                    continue
+                try:
+                    st = item.stat()
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, item.path
+
+    def size(self):
+        """Return (entries, bytes) on disk."""
+        count = total = 0
+        for _mtime, size, _path in self._entries():
+            count += 1
+            total += size
+        return count, total
+
+    def prune(self):
+        """Delete least recently used entries until the cache fits
+        ``max_bytes``; return the number deleted."""
+        entries = sorted(self._entries())
+        total = sum(size for _mtime, size, _path in entries)
+        evicted = 0
+        for _mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            evicted += 1
+        self.stats.evicted += evicted
+        return evicted
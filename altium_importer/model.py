@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Core symbol model (TZ.md 3.2.2) — what the normalizer produces and the
+``.kicad_sym`` generator consumes::
+
+    Symbol
+     ├─ name, reference
+     ├─ units[]          Unit(number, body_style)
+     │   ├─ pins         PinTable
+     │   └─ graphics     GraphicTable
+     ├─ properties[]     (name, value)
+     └─ metadata         {key: value}
+
+The model follows KiCad, not Altium: unit 0 holds items shared by all
+units, pin types and shapes are KiCad keywords, and coordinates are
+integers in KiCad schematic units (1 IU = 100 nm, 254 IU per mil) with
+the Y axis pointing up, as written in ``.kicad_sym``.
+
+A library of ten thousand components holds hundreds of thousands of pins
+and primitives, so they are not objects: :class:`PinTable` and
+:class:`GraphicTable` keep one ``array`` per column (strings in lists)
+and hand out :class:`Pin` / :class:`Shape` tuples only when iterated.
+Tables are created on first use, so a unit without pins carries no pin
+columns.
+"""
+
+import sys
+from array import array
+from collections import namedtuple
+
+IU_PER_MIL = 254
+IU_PER_MM = 10000
+
+PIN_TYPES = ("input", "output", "bidirectional", "tri_state", "passive", "free",
+             "unspecified", "power_in", "power_out", "open_collector", "open_emitter",
+             "no_connect")
+PIN_SHAPES = ("line", "inverted", "clock", "inverted_clock", "input_low", "clock_low",
+              "output_low", "edge_clock_high", "non_logic")
+FILL_TYPES = ("none", "outline", "background")
+
+# Graphic kinds and the points each one stores
+POLYLINE = 0   # 2+ points (Altium lines and polygons too)
+RECTANGLE = 1  # start, end
+ARC = 2        # start, mid, end
+CIRCLE = 3     # center, a point on the circle at angle 0
+BEZIER = 4     # start, two control points, end
+GRAPHIC_KINDS = ("polyline", "rectangle", "arc", "circle", "bezier")
+
+_PIN_TYPE_INDEX = {name: i for i, name in enumerate(PIN_TYPES)}
+_PIN_SHAPE_INDEX = {name: i for i, name in enumerate(PIN_SHAPES)}
+_FILL_INDEX = {name: i for i, name in enumerate(FILL_TYPES)}
+
+PIN_HIDDEN = 0x01
+
+Pin = namedtuple("Pin", "x y length orientation type shape name number hidden")
+Pin.__doc__ = """One pin; ``orientation`` in degrees (0, 90, 180, 270)."""
+
+Shape = namedtuple("Shape", "kind points width fill")
+Shape.__doc__ = """One primitive; ``kind`` is a name from ``GRAPHIC_KINDS``,
+``points`` a tuple of (x, y)."""
+
+
+def _index(table, value, what):
+    try:
+        return table[value]
+    except KeyError:
+        raise ValueError("unknown {w} {v!r}".format(w=what, v=value))
+
+
+class PinTable:
+    """Column store of the pins of one unit."""
+
+    __slots__ = ("x", "y", "length", "orientation", "type", "shape", "flags",
+                 "names", "numbers")
+
+    def __init__(self):
+        self.x = array("i")
+        self.y = array("i")
+        self.length = array("i")
+        self.orientation = array("B")  # degrees // 90
+        self.type = array("B")         # index into PIN_TYPES
+        self.shape = array("B")        # index into PIN_SHAPES
+        self.flags = array("B")        # PIN_HIDDEN
+        self.names = []
+        self.numbers = []
+
+    def append(self, x, y, length, orientation, type="passive", shape="line",
+               name="", number="", hidden=False):
+        """Add a pin.
+
+        Raises
+        ------
+        ValueError
+            For an unknown type or shape, or an orientation that is not a
+            multiple of 90 degrees.
+        """
+        if orientation % 90:
+            raise ValueError("pin orientation {o} is not a multiple of 90".format(o=orientation))
+        type_index = _index(_PIN_TYPE_INDEX, type, "pin type")
+        shape_index = _index(_PIN_SHAPE_INDEX, shape, "pin shape")
+        self.x.append(x)
+        self.y.append(y)
+        self.length.append(length)
+        self.orientation.append((orientation // 90) % 4)
+        self.type.append(type_index)
+        self.shape.append(shape_index)
+        self.flags.append(PIN_HIDDEN if hidden else 0)
+        self.names.append(name)
+        # pin numbers repeat across every symbol of a library
+        self.numbers.append(sys.intern(number))
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, i):
+        return Pin(self.x[i], self.y[i], self.length[i], self.orientation[i] * 90,
+                   PIN_TYPES[self.type[i]], PIN_SHAPES[self.shape[i]],
+                   self.names[i], self.numbers[i], bool(self.flags[i] & PIN_HIDDEN))
+
+    def __iter__(self):
+        for i in range(len(self.x)):
+            yield self[i]
+
+    def nbytes(self):
+        """Memory held by the columns (string objects not included)."""
+        return sum(sys.getsizeof(getattr(self, name)) for name in self.__slots__)
+
+
+class GraphicTable:
+    """Column store of the primitives of one unit.
+
+    Points of all primitives share the ``xs``/``ys`` columns; primitive
+    ``i`` owns points ``start[i]`` up to ``start[i + 1]`` (or the end).
+    """
+
+    __slots__ = ("kind", "width", "fill", "start", "xs", "ys")
+
+    def __init__(self):
+        self.kind = array("B")
+        self.width = array("i")   # stroke width, 0 = KiCad default
+        self.fill = array("B")    # index into FILL_TYPES
+        self.start = array("I")
+        self.xs = array("i")
+        self.ys = array("i")
+
+    def _add(self, kind, points, width, fill):
+        fill_index = _index(_FILL_INDEX, fill, "fill type")
+        self.kind.append(kind)
+        self.width.append(width)
+        self.fill.append(fill_index)
+        self.start.append(len(self.xs))
+        for x, y in points:
+            self.xs.append(x)
+            self.ys.append(y)
+
+    def add_polyline(self, points, width=0, fill="none"):
+        """Add a polyline; ``points`` is a sequence of at least two (x, y)."""
+        points = list(points)
+        if len(points) < 2:
+            raise ValueError("polyline needs at least two points")
+        self._add(POLYLINE, points, width, fill)
+
+    def add_rectangle(self, x1, y1, x2, y2, width=0, fill="none"):
+        self._add(RECTANGLE, ((x1, y1), (x2, y2)), width, fill)
+
+    def add_arc(self, start, mid, end, width=0, fill="none"):
+        self._add(ARC, (start, mid, end), width, fill)
+
+    def add_circle(self, cx, cy, radius, width=0, fill="none"):
+        self._add(CIRCLE, ((cx, cy), (cx + radius, cy)), width, fill)
+
+    def add_bezier(self, start, c1, c2, end, width=0, fill="none"):
+        self._add(BEZIER, (start, c1, c2, end), width, fill)
+
+    def __len__(self):
+        return len(self.kind)
+
+    def points(self, i):
+        """Return the points of primitive ``i`` as a tuple of (x, y)."""
+        lo = self.start[i]
+        hi = self.start[i + 1] if i + 1 < len(self.start) else len(self.xs)
+        return tuple(zip(self.xs[lo:hi], self.ys[lo:hi]))
+
+    def __getitem__(self, i):
+        return Shape(GRAPHIC_KINDS[self.kind[i]], self.points(i), self.width[i],
+                     FILL_TYPES[self.fill[i]])
+
+    def __iter__(self):
+        for i in range(len(self.kind)):
+            yield self[i]
+
+    def nbytes(self):
+        """Memory held by the columns."""
+        return sum(sys.getsizeof(getattr(self, name)) for name in self.__slots__)
+
+
+class Unit:
+    """One KiCad unit/body style of a symbol (``Name_<number>_<body_style>``).
+
+    Attributes
+    ----------
+    number : int
+        0 for items shared by all units, 1..N otherwise.
+    body_style : int
+        1 normal, 2 De Morgan.
+    """
+
+    __slots__ = ("number", "body_style", "_pins", "_graphics")
+
+    def __init__(self, number, body_style=1):
+        self.number = number
+        self.body_style = body_style
+        self._pins = None
+        self._graphics = None
+
+    @property
+    def pins(self):
+        """:class:`PinTable`, created on first access."""
+        if self._pins is None:
+            self._pins = PinTable()
+        return self._pins
+
+    @property
+    def graphics(self):
+        """:class:`GraphicTable`, created on first access."""
+        if self._graphics is None:
+            self._graphics = GraphicTable()
+        return self._graphics
+
+    def pin_count(self):
+        return len(self._pins) if self._pins is not None else 0
+
+    def graphic_count(self):
+        return len(self._graphics) if self._graphics is not None else 0
+
+    def is_empty(self):
+        return not self.pin_count() and not self.graphic_count()
+
+    def nbytes(self):
+        return (sys.getsizeof(self)
+                + (self._pins.nbytes() if self._pins is not None else 0)
+                + (self._graphics.nbytes() if self._graphics is not None else 0))
+
+    def __repr__(self):
+        return "Unit({n}, {b}, pins={p}, graphics={g})".format(
+            n=self.number, b=self.body_style, p=self.pin_count(), g=self.graphic_count())
+
+
+class Symbol:
+    """One KiCad symbol.
+
+    Attributes
+    ----------
+    name : str
+    reference : str
+        Designator prefix (``U``, ``R``...).
+    units : list of Unit
+        Sorted by (number, body_style) by :meth:`unit`.
+    properties : list of tuple(str, str)
+        KiCad properties in output order (``Value``, ``Footprint``...).
+    metadata : dict or None
+        Importer data that is not written as properties (source library,
+        Altium part count...); None until :meth:`set_meta` is called.
+    """
+
+    __slots__ = ("name", "reference", "units", "properties", "metadata")
+
+    def __init__(self, name, reference="U"):
+        self.name = name
+        self.reference = reference
+        self.units = []
+        self.properties = []
+        self.metadata = None
+
+    def unit(self, number, body_style=1):
+        """Return unit (number, body_style), adding it when missing."""
+        for unit in self.units:
+            if unit.number == number and unit.body_style == body_style:
+                return unit
+        unit = Unit(number, body_style)
+        self.units.append(unit)
+        self.units.sort(key=lambda u: (u.number, u.body_style))
+        return unit
+
+    @property
+    def unit_count(self):
+        """Number of real units (unit 0 is not counted, minimum 1)."""
+        return max([u.number for u in self.units] + [1])
+
+    def has_body_styles(self):
+        return any(u.body_style > 1 for u in self.units)
+
+    def get_property(self, name, default=None):
+        for key, value in self.properties:
+            if key == name:
+                return value
+        return default
+
+    def set_property(self, name, value):
+        """Set a property, keeping the position of an existing one."""
+        for i, (key, _old) in enumerate(self.properties):
+            if key == name:
+                self.properties[i] = (name, value)
+                return
+        self.properties.append((name, value))
+
+    def set_meta(self, key, value):
+        if self.metadata is None:
+            self.metadata = {}
+        self.metadata[key] = value
+
+    def pin_count(self):
+        return sum(u.pin_count() for u in self.units)
+
+    def nbytes(self):
+        """Approximate memory of the symbol, its units and columns."""
+        size = sys.getsizeof(self) + sys.getsizeof(self.units) + sys.getsizeof(self.properties)
+        size += sum(u.nbytes() for u in self.units)
+        if self.metadata is not None:
+            size += sys.getsizeof(self.metadata)
+        return size
+
+    def __repr__(self):
+        return "Symbol({n!r}, units={u}, pins={p})".format(
+            n=self.name, u=len(self.units), p=self.pin_count())
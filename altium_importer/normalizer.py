@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+"""
+Normalizer (TZ.md 3.2.3) — Altium records of one component → core model.
+
+- Altium parts become KiCad units (``OWNERPARTID`` ≤ 0 → unit 0, shared),
+  display mode 1 becomes the De Morgan body style; further modes are
+  dropped with a warning.
+- Coordinates are converted from Altium units (10 mil plus a ``_FRAC``
+  part in 1/100000) to KiCad units; pins get KiCad's connection point
+  and orientation, binary pins take their fractions from ``PinFrac``.
+- Altium-specific parameters (``Comment``, ``=expressions``, ``*``) are
+  dropped; Value/Footprint/Datasheet/Description are filled from the
+  component, its parameters and its current PCB model.
+- Duplicate pins are resolved: an exact duplicate (same number, name and
+  position) is dropped, a conflicting one is kept with a warning.
+
+Problems that only lose detail are reported through the ``warnings``
+list; :func:`normalize` raises :class:`records.RecordError` only when the
+component cannot be converted at all.
+"""
+
+import math
+import re
+
+from . import model
+from .records import (RECORD_ARC, RECORD_BEZIER, RECORD_COMPONENT, RECORD_DESIGNATOR,
+                      RECORD_ELLIPSE, RECORD_ELLIPTICAL_ARC, RECORD_IMPLEMENTATION,
+                      RECORD_LABEL, RECORD_LINE, RECORD_PARAMETER, RECORD_PIN,
+                      RECORD_POLYGON, RECORD_POLYLINE, RECORD_RECTANGLE,
+                      RECORD_ROUND_RECTANGLE, RECORD_TEXT_FRAME, RecordError)
+
+# Bump on any change of the output — cached conversions are dropped
+NORMALIZER_VERSION = 1
+
+# Altium coordinates are in 10 mil; ``_FRAC`` values in 1/100000 of that
+_IU_PER_UNIT = 10 * model.IU_PER_MIL
+_FRAC_PER_UNIT = 100000.0
+
+# ASCH_LINE_WIDTH: smallest, small, medium, large
+_LINE_WIDTHS = (1 * model.IU_PER_MIL, 10 * model.IU_PER_MIL, 30 * model.IU_PER_MIL,
+                50 * model.IU_PER_MIL)
+
+# ASCH_PIN_ELECTRICAL → KiCad pin type
+_PIN_TYPES = ("input", "bidirectional", "output", "open_collector", "passive",
+              "tri_state", "open_emitter", "power_in")
+
+# ASCH_PIN_SYMBOL values used for the KiCad pin shape
+_SYMBOL_NEGATED = 1
+_SYMBOL_CLOCK = 3
+_SYMBOL_LOW_INPUT = 4
+_SYMBOL_LOW_OUTPUT = 17
+
+# PINCONGLOMERATE bits
+_PIN_ORIENTATION_MASK = 0x03
+_PIN_HIDDEN = 0x04
+_PIN_SHOW_NAME = 0x08
+_PIN_SHOW_NUMBER = 0x10
+
+# Altium pin orientation (right, up, left, down) → offset of the
+# connection point from the body and KiCad pin angle
+_PIN_DIRECTIONS = ((1, 0, 180), (0, 1, 270), (-1, 0, 0), (0, -1, 90))
+
+# Parameters with their own KiCad field or with no meaning in KiCad
+_MAPPED_PARAMETERS = {"value", "footprint", "datasheet", "description", "reference",
+                      "designator", "comment"}
+_DATASHEET_PARAMETERS = ("datasheet", "datasheet url", "helpurl", "componentlink1url")
+_TEXT_RECORDS = (RECORD_LABEL, RECORD_TEXT_FRAME)  # not imported
+_ELLIPSE_SEGMENTS = 36
+
+_REFERENCE_SUFFIX_RE = re.compile(r"[?\d]+$")
+
+
+def to_iu(value, frac=0):
+    """Convert an Altium coordinate (10 mil + 1/100000 fraction) to KiCad
+    units, rounded to 10 IU as KiCad does."""
+    iu = value * _IU_PER_UNIT + frac * _IU_PER_UNIT / _FRAC_PER_UNIT
+    return int(math.floor(iu / 10.0 + 0.5)) * 10
+
+
+def _int(props, key, default=0):
+    try:
+        return int(props.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _float(props, key, default=0.0):
+    try:
+        return float(props.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _coord(props, key):
+    return to_iu(_int(props, key), _int(props, key + "_FRAC"))
+
+
+def _point(props, x_key, y_key):
+    return _coord(props, x_key), _coord(props, y_key)
+
+
+def _width(props):
+    index = _int(props, "LINEWIDTH")
+    return _LINE_WIDTHS[index] if 0 <= index < len(_LINE_WIDTHS) else _LINE_WIDTHS[1]
+
+
+def _fill(props):
+    if props.get("ISSOLID") != "T" or props.get("TRANSPARENT") == "T":
+        return "none"
+    if "AREACOLOR" in props and props.get("AREACOLOR") == props.get("COLOR"):
+        return "outline"
+    return "background"
+
+
+def pin_name(name):
+    """Convert Altium overbars (``R\\E\\S\\E\\T\\``) to KiCad ``~{RESET}``."""
+    if "\\" not in name:
+        return name
+    out = []
+    bar = []
+    i = 0
+    while i < len(name):
+        ch = name[i]
+        if i + 1 < len(name) and name[i + 1] == "\\" and ch != "\\":
+            bar.append(ch)
+            i += 2
+            continue
+        if bar:
+            out.append("~{" + "".join(bar) + "}")
+            bar = []
+        if ch != "\\":
+            out.append(ch)
+        i += 1
+    if bar:
+        out.append("~{" + "".join(bar) + "}")
+    return "".join(out)
+
+
+def _pin_shape(inner, outer):
+    clock = inner == _SYMBOL_CLOCK
+    if outer == _SYMBOL_NEGATED:
+        return "inverted_clock" if clock else "inverted"
+    if outer == _SYMBOL_LOW_INPUT:
+        return "clock_low" if clock else "input_low"
+    if outer == _SYMBOL_LOW_OUTPUT:
+        return "output_low"
+    return "clock" if clock else "line"
+
+
+def _polar(cx, cy, rx, ry, degrees):
+    a = math.radians(degrees)
+    return int(round(cx + rx * math.cos(a))), int(round(cy + ry * math.sin(a)))
+
+
+def _ellipse_points(cx, cy, rx, ry, start, sweep):
+    steps = max(2, int(math.ceil(_ELLIPSE_SEGMENTS * abs(sweep) / 360.0)))
+    return [_polar(cx, cy, rx, ry, start + sweep * k / steps) for k in range(steps + 1)]
+
+
+class _Builder:
+    """State of one component while its records are converted."""
+
+    def __init__(self, component, fracs, warnings):
+        self.component = component
+        self.fracs = fracs
+        self.warnings = warnings
+        self.symbol = None
+        self.part_count = max(1, component.part_count)
+        self.pin_index = 0
+        self.pins_seen = {}       # (unit, body, number) -> {(name, x, y)}
+        self.names_shown = False
+        self.numbers_shown = False
+        self.skipped_modes = 0
+        self.skipped_text = 0
+        self.parameters = []
+        self.footprint = ""
+        self.reference = ""
+
+    def warn(self, message):
+        self.warnings.append(message)
+
+    def unit(self, props):
+        """Unit for the record's owner part and display mode; None to skip."""
+        part = _int(props, "OWNERPARTID", -1)
+        mode = _int(props, "OWNERPARTDISPLAYMODE")
+        if mode > 1:
+            self.skipped_modes += 1
+            return None
+        return self.symbol.unit(max(0, part), mode + 1)
+
+    # -- records ---------------------------------------------------------
+    def component_record(self, props):
+        name = props.get("LIBREFERENCE") or self.component.name
+        self.symbol = model.Symbol(name)
+        self.part_count = max(1, _int(props, "PARTCOUNT", self.component.part_count))
+        description = props.get("COMPONENTDESCRIPTION") or self.component.description
+        self.symbol.set_meta("altium_libref", self.component.name)
+        self.symbol.set_meta("altium_part_count", self.part_count)
+        if description:
+            self.symbol.set_meta("description", description)
+        if _int(props, "DISPLAYMODECOUNT", 1) > 2:
+            self.warn("{n} режимов отображения: импортированы только первые два "
+                      "(обычный и De Morgan)".format(n=props.get("DISPLAYMODECOUNT")))
+
+    def pin(self, record):
+        props = record.properties
+        index = self.pin_index
+        self.pin_index += 1
+        unit = self.unit(props)
+        if unit is None:
+            return
+        if record.is_binary:
+            # binary pins keep their fractions in the PinFrac stream
+            x_frac, y_frac, len_frac = self.fracs.get(index, (0, 0, 0))
+        else:
+            x_frac = _int(props, "LOCATION.X_FRAC")
+            y_frac = _int(props, "LOCATION.Y_FRAC")
+            len_frac = _int(props, "PINLENGTH_FRAC")
+        x = to_iu(_int(props, "LOCATION.X"), x_frac)
+        y = to_iu(_int(props, "LOCATION.Y"), y_frac)
+        length = to_iu(_int(props, "PINLENGTH"), len_frac)
+        flags = _int(props, "PINCONGLOMERATE")
+        dx, dy, angle = _PIN_DIRECTIONS[flags & _PIN_ORIENTATION_MASK]
+        x += dx * length
+        y += dy * length
+        electrical = _int(props, "ELECTRICAL", 4)
+        if 0 <= electrical < len(_PIN_TYPES):
+            pin_type = _PIN_TYPES[electrical]
+        else:
+            pin_type = "unspecified"
+            self.warn("пин {d}: неизвестный электрический тип {e}".format(
+                d=props.get("DESIGNATOR", ""), e=electrical))
+        shape = _pin_shape(_int(props, "SYMBOL_INNEREDGE"), _int(props, "SYMBOL_OUTEREDGE"))
+        name = pin_name(props.get("NAME", ""))
+        number = props.get("DESIGNATOR", "")
+        if not number:
+            self.warn("пин «{n}» без номера".format(n=name))
+        if number:
+            seen = self.pins_seen.setdefault((unit.number, unit.body_style, number), set())
+            if (name, x, y) in seen:
+                return  # exact duplicate
+            if seen:
+                self.warn("повторяющийся номер пина {d} в секции {u}".format(
+                    d=number, u=unit.number))
+            seen.add((name, x, y))
+        hidden = bool(flags & _PIN_HIDDEN)
+        if not hidden:
+            self.names_shown = self.names_shown or bool(flags & _PIN_SHOW_NAME)
+            self.numbers_shown = self.numbers_shown or bool(flags & _PIN_SHOW_NUMBER)
+        unit.pins.append(x, y, length, angle, pin_type, shape, name, number, hidden)
+
+    def graphic(self, rtype, props):
+        unit = self.unit(props)
+        if unit is None:
+            return
+        shapes = unit.graphics
+        width = _width(props)
+        fill = _fill(props)
+        if rtype in (RECORD_RECTANGLE, RECORD_ROUND_RECTANGLE):
+            x1, y1 = _point(props, "LOCATION.X", "LOCATION.Y")
+            x2, y2 = _point(props, "CORNER.X", "CORNER.Y")
+            shapes.add_rectangle(x1, y1, x2, y2, width, fill)
+        elif rtype == RECORD_LINE:
+            shapes.add_polyline((_point(props, "LOCATION.X", "LOCATION.Y"),
+                                 _point(props, "CORNER.X", "CORNER.Y")), width)
+        elif rtype in (RECORD_POLYLINE, RECORD_POLYGON, RECORD_BEZIER):
+            count = _int(props, "LOCATIONCOUNT")
+            points = [_point(props, "X{i}".format(i=i), "Y{i}".format(i=i))
+                      for i in range(1, count + 1)]
+            if len(points) < 2:
+                self.warn("запись {t} с {n} точками пропущена".format(t=rtype, n=len(points)))
+            elif rtype == RECORD_POLYGON:
+                shapes.add_polyline(points + points[:1], width, fill)
+            elif rtype == RECORD_BEZIER and len(points) >= 4:
+                for i in range(0, len(points) - 3, 3):
+                    shapes.add_bezier(*points[i:i + 4], width=width)
+            else:
+                shapes.add_polyline(points, width)
+        elif rtype in (RECORD_ARC, RECORD_ELLIPTICAL_ARC, RECORD_ELLIPSE):
+            self.curve(rtype, props, shapes, width, fill)
+
+    def curve(self, rtype, props, shapes, width, fill):
+        cx, cy = _point(props, "LOCATION.X", "LOCATION.Y")
+        rx = _coord(props, "RADIUS")
+        ry = _coord(props, "SECONDARYRADIUS") if rtype != RECORD_ARC else rx
+        if rtype == RECORD_ELLIPSE:
+            start, sweep = 0.0, 360.0
+        else:
+            start = _float(props, "STARTANGLE")
+            sweep = (_float(props, "ENDANGLE", 360.0) - start) % 360.0 or 360.0
+        if rx <= 0 or ry <= 0:
+            self.warn("дуга нулевого радиуса пропущена")
+            return
+        if rx != ry:
+            # KiCad has no ellipses: approximate with segments
+            points = _ellipse_points(cx, cy, rx, ry, start, sweep)
+            shapes.add_polyline(points, width, fill if sweep == 360.0 else "none")
+        elif sweep == 360.0:
+            shapes.add_circle(cx, cy, rx, width, fill)
+        else:
+            shapes.add_arc(_polar(cx, cy, rx, rx, start), _polar(cx, cy, rx, rx, start + sweep / 2),
+                           _polar(cx, cy, rx, rx, start + sweep), width)
+
+    def finish(self):
+        symbol = self.symbol
+        reference = _REFERENCE_SUFFIX_RE.sub("", self.reference) or "U"
+        symbol.reference = reference
+        value = ""
+        datasheet = ""
+        extra = []
+        for name, text in self.parameters:
+            lower = name.lower()
+            if lower == "value":
+                value = text
+            elif lower in _DATASHEET_PARAMETERS and not datasheet:
+                datasheet = text
+            elif lower in _MAPPED_PARAMETERS or lower.startswith("ki_"):
+                continue
+            else:
+                extra.append((name, text))
+        symbol.set_property("Value", value or symbol.name)
+        symbol.set_property("Footprint", self.footprint)
+        symbol.set_property("Datasheet", datasheet)
+        symbol.set_property("Description", (symbol.metadata or {}).get("description", ""))
+        seen = {"reference", "value", "footprint", "datasheet", "description"}
+        for name, text in extra:
+            if name.lower() not in seen:
+                seen.add(name.lower())
+                symbol.set_property(name, text)
+        if not self.names_shown:
+            symbol.set_meta("pin_names_hidden", True)
+        if not self.numbers_shown:
+            symbol.set_meta("pin_numbers_hidden", True)
+        if self.skipped_modes:
+            self.warn("{n} элементов дополнительных режимов отображения пропущено".format(
+                n=self.skipped_modes))
+        if self.skipped_text:
+            self.warn("{n} текстовых элементов не импортировано".format(n=self.skipped_text))
+        if all(u.is_empty() for u in symbol.units):
+            self.warn("символ без пинов и графики")
+        return symbol
+
+
+def _parameter_text(props):
+    """Value of a parameter record, or None for Altium-only values."""
+    text = props.get("TEXT", "")
+    if not text or text in ("*", "?") or text.startswith("="):
+        return None
+    return text
+
+
+def normalize(component, records, fracs, warnings):
+    """Build a :class:`model.Symbol` from the records of one component.
+
+    Parameters
+    ----------
+    component : schlib.ComponentInfo
+    records : iterable of records.Record
+        The component's ``Data`` stream, first record ``RECORD=1``.
+    fracs : dict
+        :func:`records.pin_fracs` of the component (may be empty).
+    warnings : list
+        Receives messages about detail lost in the conversion.
+
+    Raises
+    ------
+    records.RecordError
+        When the stream has no component record or is damaged.
+    """
+    builder = _Builder(component, fracs, warnings)
+    for record in records:
+        rtype = record.record_type
+        if builder.symbol is None:
+            if rtype != RECORD_COMPONENT:
+                raise RecordError("the first record is not a component record")
+            builder.component_record(record.properties)
+            continue
+        if rtype == RECORD_PIN:
+            builder.pin(record)
+        elif rtype in (RECORD_RECTANGLE, RECORD_ROUND_RECTANGLE, RECORD_LINE,
+                       RECORD_POLYLINE, RECORD_POLYGON, RECORD_BEZIER, RECORD_ARC,
+                       RECORD_ELLIPTICAL_ARC, RECORD_ELLIPSE):
+            builder.graphic(rtype, record.properties)
+        elif rtype == RECORD_PARAMETER:
+            props = record.properties
+            text = _parameter_text(props)
+            if text is not None and props.get("NAME"):
+                builder.parameters.append((props["NAME"], text))
+        elif rtype == RECORD_DESIGNATOR:
+            builder.reference = record.properties.get("TEXT", "")
+        elif rtype == RECORD_IMPLEMENTATION:
+            props = record.properties
+            if props.get("MODELTYPE", "").upper() == "PCBLIB" and props.get("MODELNAME"):
+                if props.get("ISCURRENT") == "T" or not builder.footprint:
+                    builder.footprint = props["MODELNAME"]
+        elif rtype in _TEXT_RECORDS:
+            builder.skipped_text += 1
+    if builder.symbol is None:
+        raise RecordError("empty Data stream")
+    return builder.finish()
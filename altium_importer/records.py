@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Record parser for the streams of an Altium library component.
+
+Every stream (``Data``, ``PinFrac``, ``PinTextData``, ``FileHeader``) is
+a sequence of records, each prefixed by a 32-bit little-endian header:
+the low 24 bits are the payload length, the high byte is a type flag
+(0 = text ``|KEY=VALUE|...`` terminated by NUL, 1 = binary).
+
+:func:`iter_records` walks a ``memoryview`` and yields :class:`Record`
+objects that hold slices of it — nothing is copied or decoded until a
+property is read. Binary payloads are kept whole: a trailing ``0x00`` of
+a binary record is data (often the last byte of a zlib stream), never a
+terminator. Stripping it is the KiCad import bug described in
+``docs/KICAD_BUG_REPORT.md``.
+"""
+
+import re
+import struct
+import zlib
+
+_HEADER = struct.Struct("<I")
+_PIN_FRAC = struct.Struct("<iii")
+_INT32 = struct.Struct("<i")
+# Binary pin: record id, unknown byte, owner part, display mode, symbols;
+# then (after the TEXT string) unknown byte, electrical type,
+# conglomerate flags, length, x, y (10-mil units) and colour
+_PIN_HEAD = struct.Struct("<iBhBBBBB")
+_PIN_BODY = struct.Struct("<BBBhhhi")
+
+FLAG_TEXT = 0
+FLAG_BINARY = 1
+# Leading byte of compressed binary records (PinFrac, PinTextData)
+COMPRESSED_MARKER = 0xD0
+
+# Record types used by the importer (RECORD=<n>)
+RECORD_COMPONENT = 1
+RECORD_PIN = 2
+RECORD_LABEL = 4
+RECORD_BEZIER = 5
+RECORD_POLYLINE = 6
+RECORD_POLYGON = 7
+RECORD_ELLIPSE = 8
+RECORD_ROUND_RECTANGLE = 10
+RECORD_ELLIPTICAL_ARC = 11
+RECORD_ARC = 12
+RECORD_LINE = 13
+RECORD_RECTANGLE = 14
+RECORD_TEXT_FRAME = 28
+RECORD_DESIGNATOR = 34
+RECORD_PARAMETER = 41
+RECORD_IMPLEMENTATION_LIST = 44
+RECORD_IMPLEMENTATION = 45
+
+_RECORD_RE = re.compile(rb"\|RECORD=(-?\d+)")
+_HIGH_BYTES_RE = re.compile(u"[\x80-\xff]")
+
+
+class RecordError(ValueError):
+    """Raised when a stream is truncated or a binary record is malformed."""
+
+
+def parse_properties(payload):
+    """Parse a text record payload into a dict with upper-case keys.
+
+    Text is Windows-1252; ``%UTF8%KEY`` entries, which Altium writes for
+    non-Latin text, replace their plain twin.
+    """
+    # latin-1 maps bytes 1:1, so one decode of the whole record is enough;
+    # only values with high bytes are re-decoded
+    text = bytes(payload).rstrip(b"\0").decode("latin-1")
+    ascii_only = not _HIGH_BYTES_RE.search(text)
+    props = {}
+    utf8 = {}
+    for field in text.split("|"):
+        key, sep, value = field.partition("=")
+        if not sep:
+            continue
+        if key.startswith("%UTF8%"):
+            utf8[key[6:].upper()] = value.encode("latin-1").decode("utf-8", "replace")
+        elif ascii_only or not _HIGH_BYTES_RE.search(value):
+            props[key.upper()] = value
+        else:
+            props[key.upper()] = value.encode("latin-1").decode("cp1252", "replace")
+    props.update(utf8)
+    return props
+
+
+class _BinaryReader:
+    """Sequential reader of little-endian fields from a buffer."""
+
+    __slots__ = ("buf", "pos")
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.pos = 0
+
+    def _take(self, n):
+        if self.pos + n > len(self.buf):
+            raise RecordError("binary record truncated at byte {p}".format(p=self.pos))
+        start = self.pos
+        self.pos += n
+        return start
+
+    def byte(self):
+        return self.buf[self._take(1)]
+
+    def int32(self):
+        return _INT32.unpack_from(self.buf, self._take(4))[0]
+
+    def short_string(self):
+        """One length byte, then Windows-1252 text."""
+        n = self.byte()
+        start = self._take(n)
+        return bytes(self.buf[start:start + n]).decode("cp1252", "replace")
+
+    def full_bytes(self):
+        """32-bit length, then raw bytes (a view, not a copy)."""
+        n = self.int32()
+        if n < 0:
+            raise RecordError("negative length in binary record")
+        start = self._take(n)
+        return self.buf[start:start + n]
+
+
+def _short_strings(buf, pos, count):
+    """Read ``count`` short strings from ``pos``; return (strings, new pos)."""
+    result = []
+    end = len(buf)
+    for _ in range(count):
+        if pos >= end:
+            raise RecordError("binary record truncated at byte {p}".format(p=pos))
+        n = buf[pos]
+        pos += 1
+        if pos + n > end:
+            raise RecordError("binary record truncated at byte {p}".format(p=pos))
+        result.append(bytes(buf[pos:pos + n]).decode("cp1252", "replace"))
+        pos += n
+    return result, pos
+
+
+def _decode_binary_pin(buf):
+    """Decode a binary RECORD=2 (library pin) into text-style properties."""
+    try:
+        (record, _unknown, owner_part, display_mode, inner_edge, outer_edge,
+         inner, outer) = _PIN_HEAD.unpack_from(buf, 0)
+        (text,), pos = _short_strings(buf, _PIN_HEAD.size, 1)
+        (_unknown, electrical, conglomerate, length, x, y,
+         color) = _PIN_BODY.unpack_from(buf, pos)
+    except struct.error:
+        raise RecordError("binary pin record truncated")
+    if record != RECORD_PIN:
+        raise RecordError("binary record {n} is not a pin".format(n=record))
+    (name, designator, swap_group, part_sequence,
+     default_value), _pos = _short_strings(buf, pos + _PIN_BODY.size, 5)
+    return {
+        "RECORD": str(record),
+        "OWNERPARTID": str(owner_part),
+        "OWNERPARTDISPLAYMODE": str(display_mode),
+        "SYMBOL_INNEREDGE": str(inner_edge),
+        "SYMBOL_OUTEREDGE": str(outer_edge),
+        "SYMBOL_INNER": str(inner),
+        "SYMBOL_OUTER": str(outer),
+        "TEXT": text,
+        "ELECTRICAL": str(electrical),
+        "PINCONGLOMERATE": str(conglomerate),
+        "PINLENGTH": str(length),
+        "LOCATION.X": str(x),
+        "LOCATION.Y": str(y),
+        "COLOR": str(color),
+        "NAME": name,
+        "DESIGNATOR": designator,
+        "SWAPIDGROUP": swap_group,
+        "PARTANDSEQUENCE": part_sequence,
+        "DEFAULTVALUE": default_value,
+    }
+
+
+class Record:
+    """One record of a stream; a view into the stream, decoded on demand.
+
+    Attributes
+    ----------
+    index : int
+        Position in the stream (0-based).
+    offset : int
+        Byte offset of the record header in the stream.
+    flag : int
+        ``FLAG_TEXT`` or ``FLAG_BINARY``.
+    payload : memoryview
+        The record body exactly as stored (the NUL of text records
+        included, binary records untouched).
+    """
+
+    __slots__ = ("index", "offset", "flag", "payload", "_props")
+
+    def __init__(self, index, offset, flag, payload):
+        self.index = index
+        self.offset = offset
+        self.flag = flag
+        self.payload = payload
+        self._props = None
+
+    @property
+    def is_binary(self):
+        return self.flag == FLAG_BINARY
+
+    @property
+    def record_type(self):
+        """``RECORD=<n>`` of a text record or the id of a binary one; None
+        when the record has neither (stream headers, compressed records).
+
+        Read without decoding the rest of the record.
+        """
+        if self._props is not None:
+            value = self._props.get("RECORD")
+            return int(value) if value is not None and value.lstrip("-").isdigit() else None
+        if self.is_binary:
+            if len(self.payload) >= 4 and self.payload[0] != COMPRESSED_MARKER:
+                return _INT32.unpack_from(self.payload, 0)[0]
+            return None
+        m = _RECORD_RE.match(self.payload)
+        return int(m.group(1)) if m else None
+
+    @property
+    def properties(self):
+        """Properties with upper-case keys, decoded on first access.
+
+        Binary pin records are decoded into the same keys as text pins;
+        other binary records have no properties (see :func:`decompress`).
+        """
+        if self._props is None:
+            if not self.is_binary:
+                self._props = parse_properties(self.payload)
+            elif self.record_type == RECORD_PIN:
+                self._props = _decode_binary_pin(self.payload)
+            else:
+                self._props = {}
+        return self._props
+
+    def get(self, key, default=None):
+        return self.properties.get(key, default)
+
+    def __repr__(self):
+        return "Record(#{i}, type={t}, {n} bytes{b})".format(
+            i=self.index, t=self.record_type, n=len(self.payload),
+            b=", binary" if self.is_binary else "")
+
+
+def iter_records(buf):
+    """Yield the :class:`Record` objects of a stream.
+
+    Parameters
+    ----------
+    buf : memoryview or bytes
+        A whole stream, e.g. from :meth:`schlib.SchLib.data`.
+
+    Raises
+    ------
+    RecordError
+        When a record runs past the end of the stream.
+    """
+    view = buf if isinstance(buf, memoryview) else memoryview(buf)
+    end = len(view)
+    pos = 0
+    index = 0
+    unpack = _HEADER.unpack_from
+    while pos + 4 <= end:
+        (header,) = unpack(view, pos)
+        length = header & 0xFFFFFF
+        start = pos + 4
+        if start + length > end:
+            raise RecordError("record {i} at byte {p} runs past the end of the stream".format(
+                i=index, p=pos))
+        yield Record(index, pos, header >> 24, view[start:start + length])
+        pos = start + length
+        index += 1
+    if pos != end and any(view[pos:end]):
+        raise RecordError("{n} stray bytes at the end of the stream".format(n=end - pos))
+
+
+def decompress(record):
+    """Unpack a compressed binary record (``PinFrac``, ``PinTextData``).
+
+    Layout: marker byte ``0xD0``, the key as a short string (the pin
+    index), then a 32-bit length and that many bytes of zlib data.
+
+    Returns
+    -------
+    tuple(str, bytes)
+        Key and decompressed data.
+
+    Raises
+    ------
+    RecordError
+        When the record is not compressed or the zlib data is damaged.
+    """
+    r = _BinaryReader(record.payload)
+    if not record.is_binary or r.byte() != COMPRESSED_MARKER:
+        raise RecordError("record {i} is not a compressed record".format(i=record.index))
+    key = r.short_string()
+    data = r.full_bytes()
+    try:
+        return key, zlib.decompress(data)
+    except zlib.error as exc:
+        raise RecordError("record {i}: {e}".format(i=record.index, e=exc))
+
+
+def pin_fracs(buf):
+    """Return {pin index: (x_frac, y_frac, length_frac)} from a PinFrac stream.
+
+    Fractions are in 1/100000 of the pin's 10-mil coordinate unit.
+    """
+    result = {}
+    for record in iter_records(buf):
+        if not record.is_binary:
+            continue  # |HEADER=PinFrac|Weight=N|
+        key, data = decompress(record)
+        if len(data) < _PIN_FRAC.size:
+            raise RecordError("PinFrac record {i} too short".format(i=record.index))
+        try:
+            result[int(key)] = _PIN_FRAC.unpack_from(data, 0)
+        except ValueError:
+            raise RecordError("PinFrac record {i}: bad pin index {k!r}".format(
+                i=record.index, k=key))
+    return result
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Altium ``.SchLib`` container — the component list and the raw ``Data``
+stream of each component.
+
+The library's ``FileHeader`` stream lists every component
+(``CompCount``, ``LibRef<i>``, ``CompDescr<i>``, ``PartCount<i>``), so
+:meth:`SchLib.components` needs the header and the root directory only —
+no component payload is touched until :meth:`SchLib.data` is called.
+"""
+
+import logging
+
+from .cfb import CFBError, CompoundFile
+from .records import RecordError, iter_records, pin_fracs
+
+logger = logging.getLogger("altium_importer.schlib")
+
+HEADER_STREAM = "FileHeader"
+DATA_STREAM = "Data"
+PIN_FRAC_STREAM = "PinFrac"
+# Altium limits storage names to 31 characters and replaces characters
+# the compound file format does not allow
+_STORAGE_NAME_MAX = 31
+_STORAGE_NAME_MAP = {ord(c): "_" for c in "/\\:!"}
+
+
+class ComponentInfo:
+    """One component as listed in ``FileHeader``.
+
+    Attributes
+    ----------
+    name : str
+        ``LibRef`` — the component name.
+    description : str
+    part_count : int
+        Altium part count (``PartCount`` includes the shared part 0).
+    storage : str
+        Name of the component's storage in the compound file, '' when
+        it could not be matched.
+    """
+
+    __slots__ = ("name", "description", "part_count", "storage")
+
+    def __init__(self, name, description="", part_count=1, storage=""):
+        self.name = name
+        self.description = description
+        self.part_count = part_count
+        self.storage = storage
+
+    def __repr__(self):
+        return "ComponentInfo({n!r}, parts={p})".format(n=self.name, p=self.part_count)
+
+
+def storage_name(libref):
+    """Return the storage name Altium uses for component ``libref``."""
+    return libref.translate(_STORAGE_NAME_MAP)[:_STORAGE_NAME_MAX]
+
+
+def header_properties(buf):
+    """Parse the first ``|KEY=VALUE|`` record of a stream into a dict.
+
+    Keys are upper-cased, see :func:`records.parse_properties`.
+    """
+    try:
+        first = next(iter_records(buf))
+    except StopIteration:
+        raise CFBError("empty stream")
+    except RecordError as exc:
+        raise CFBError(str(exc))
+    return first.properties
+
+
+class SchLib:
+    """An opened ``.SchLib`` file.
+
+    Parameters
+    ----------
+    path : str
+
+    Raises
+    ------
+    cfb.CFBError
+        When the file is not a compound file or has no ``FileHeader``.
+    OSError
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.cf = CompoundFile(path)
+        self._header = None
+        self._components = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.cf.close()
+
+    @property
+    def header(self):
+        """Properties of the ``FileHeader`` record (upper-case keys)."""
+        if self._header is None:
+            try:
+                buf = self.cf.open_stream(HEADER_STREAM)
+            except KeyError:
+                raise CFBError("no FileHeader stream — not an Altium library")
+            self._header = header_properties(buf)
+        return self._header
+
+    def components(self):
+        """Return the list of :class:`ComponentInfo` in library order.
+
+        Storages that hold a ``Data`` stream but are missing from the
+        header are appended, so no component is lost to a stale header.
+        """
+        if self._components is not None:
+            return self._components
+        header = self.header
+        storages = {e.name: e for e in self.cf.listdir() if e.is_storage}
+        by_lower = {name.lower(): name for name in storages}
+        result = []
+        used = set()
+        try:
+            count = int(header.get("COMPCOUNT", "0"))
+        except ValueError:
+            count = 0
+        for i in range(count):
+            name = header.get("LIBREF{i}".format(i=i))
+            if name is None:
+                continue
+            try:
+                parts = int(header.get("PARTCOUNT{i}".format(i=i), "1"))
+            except ValueError:
+                parts = 1
+            storage = by_lower.get(storage_name(name).lower(), "")
+            if storage in used:
+                storage = ""  # two names truncated to the same storage
+            if storage:
+                used.add(storage)
+            else:
+                logger.warning("%s: no storage for component %r", self.path, name)
+            result.append(ComponentInfo(name, header.get("COMPDESCR{i}".format(i=i), ""),
+                                        parts, storage))
+        for name, entry in storages.items():
+            if name not in used and DATA_STREAM in self.cf.children(entry):
+                logger.warning("%s: component storage %r not listed in FileHeader",
+                               self.path, name)
+                result.append(ComponentInfo(name, storage=name))
+        self._components = result
+        return result
+
+    def stream(self, component, name):
+        """Return stream ``name`` of a component as a ``memoryview``.
+
+        Raises
+        ------
+        KeyError
+            When the component has no storage or no such stream.
+        """
+        if not component.storage:
+            raise KeyError(component.name)
+        return self.cf.open_stream(component.storage + "/" + name)
+
+    def data(self, component):
+        """Return the ``Data`` stream of a component as a ``memoryview``."""
+        return self.stream(component, DATA_STREAM)
+
+    def records(self, component):
+        """Iterate the records of a component's ``Data`` stream.
+
+        Records are views into the mapped file, so they are valid until
+        the library is closed.
+        """
+        return iter_records(self.data(component))
+
+    def pin_fracs(self, component):
+        """Return {pin index: (x_frac, y_frac, length_frac)}; empty when the
+        component has no ``PinFrac`` stream (older libraries)."""
+        try:
+            buf = self.stream(component, PIN_FRAC_STREAM)
+        except KeyError:
+            return {}
+        return pin_fracs(buf)